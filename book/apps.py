@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "book"
+
+    def ready(self):
+        """
+        Imports the signals module to register
+        the signal handlers for the Book app.
+        """
+        import book.signals
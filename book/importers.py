@@ -0,0 +1,130 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from django.db import transaction
+from rest_framework import serializers
+
+from book.models import Book, CatalogVersion
+from book.serializers import BookSerializer
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportReport:
+    """Outcome of a bulk import: created rows and per-row errors."""
+
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row: int, errors) -> None:
+        """Records a rejected row, keeping at most MAX_REPORTED_ERRORS."""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    Yields ``(row number, row, error)`` for a CSV document
+    with a header line. Row numbers start at 1 after the header.
+    """
+    reader = csv.DictReader(lines)
+    for number, row in enumerate(reader, 1):
+        if None in row:
+            yield number, None, "Row has more values than the header."
+        else:
+            yield number, row, None
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    Yields ``(row number, row, error)`` for a newline delimited JSON
+    document with one book object per line. Blank lines are skipped.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, None, f"Invalid JSON: {exc.msg}."
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object."
+        else:
+            yield number, row, None
+
+
+PARSERS = {CSV: parse_csv, NDJSON: parse_ndjson}
+
+
+def import_books(
+        lines: Iterable[str],
+        data_format: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ImportReport:
+    """
+    Streams books from CSV or NDJSON lines into the catalog.
+
+    Every row is validated with the ``BookSerializer`` rules, valid rows
+    are written with ``bulk_create`` in batches of ``batch_size``,
+    invalid rows are reported and skipped. A document that cannot be
+    read any further (not UTF-8, or not CSV) is reported at the row
+    where reading failed, the rows before it are kept.
+    """
+    serializer = BookSerializer()
+    report = ImportReport()
+    batch = []
+    number = 0
+
+    try:
+        for number, row, error in PARSERS[data_format](lines):
+            if error:
+                report.add_error(number, [error])
+                continue
+            try:
+                validated_data = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                report.add_error(number, exc.detail)
+                continue
+
+            batch.append(Book(**validated_data))
+            if len(batch) >= batch_size:
+                report.created += _write_batch(batch)
+                batch = []
+    except UnicodeDecodeError:
+        report.add_error(
+            number + 1, ["Invalid UTF-8 text, the import stopped here."]
+        )
+    except csv.Error as exc:
+        report.add_error(
+            number + 1, [f"Invalid CSV: {exc}, the import stopped here."]
+        )
+
+    if batch:
+        report.created += _write_batch(batch)
+    if report.created:
+        CatalogVersion.bump()
+    return report
+
+
+def _write_batch(batch: list) -> int:
+    with transaction.atomic():
+        Book.objects.bulk_create(batch)
+    return len(batch)
@@ -0,0 +1,125 @@
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from book.models import Book, InventoryShard
+
+
+def _lock_book(book_id: int) -> Book:
+    """Locks the book row and its shards for the current transaction."""
+    book = Book.objects.select_for_update().get(pk=book_id)
+    list(
+        InventoryShard.objects.select_for_update()
+        .filter(book=book)
+        .values_list("id", flat=True)
+    )
+    return book
+
+
+def _shard_total(book: Book) -> int:
+    return (
+        book.inventory_shards.aggregate(total=Sum("inventory"))["total"]
+        or 0
+    )
+
+
+def _shard_count(book: Book) -> int:
+    return book.inventory_shards.count() or settings.BOOK_INVENTORY_SHARDS
+
+
+def _distribute(book: Book, total: int, shards: int) -> None:
+    """
+    Spreads ``total`` copies evenly over ``shards`` shards of the book,
+    creating or deleting shard rows as needed. Must run in a transaction
+    holding the locks taken by ``_lock_book``.
+    """
+    base, extra = divmod(total, shards)
+    existing = {shard.shard: shard for shard in book.inventory_shards.all()}
+    changed = []
+    for number in range(shards):
+        inventory = base + (1 if number < extra else 0)
+        shard = existing.pop(number, None)
+        if shard is None:
+            InventoryShard.objects.create(
+                book=book, shard=number, inventory=inventory
+            )
+        elif shard.inventory != inventory:
+            shard.inventory = inventory
+            shard.updated_at = timezone.now()
+            changed.append(shard)
+    InventoryShard.objects.bulk_update(changed, ["inventory", "updated_at"])
+    InventoryShard.objects.filter(
+        id__in=[shard.id for shard in existing.values()]
+    ).delete()
+
+
+def enable_sharding(book: Book, shards: Optional[int] = None) -> Book:
+    """
+    Moves the copies of a book from its ``inventory`` column
+    into ``shards`` inventory shards.
+    """
+    shards = shards or settings.BOOK_INVENTORY_SHARDS
+    if shards < 1:
+        raise ValueError("A book needs at least one inventory shard.")
+    with transaction.atomic():
+        book = _lock_book(book.pk)
+        total = book.inventory + _shard_total(book)
+        _distribute(book, total, shards)
+        book.inventory = 0
+        book.sharded_inventory = True
+        book.save(update_fields=["inventory", "sharded_inventory"])
+    return book
+
+
+def disable_sharding(book: Book) -> Book:
+    """Moves the copies of a book back into its ``inventory`` column."""
+    with transaction.atomic():
+        book = _lock_book(book.pk)
+        book.inventory += _shard_total(book)
+        book.sharded_inventory = False
+        book.save(update_fields=["inventory", "sharded_inventory"])
+        book.inventory_shards.all().delete()
+    return book
+
+
+def set_inventory(book: Book, total: int) -> Book:
+    """
+    Sets the number of available copies of a book with sharded inventory,
+    spreading them over its existing shards.
+    """
+    with transaction.atomic():
+        book = _lock_book(book.pk)
+        _distribute(book, total, _shard_count(book))
+        book.inventory = 0
+        book.save(update_fields=["inventory"])
+    return book
+
+
+def rebalance_book(book_id: int) -> bool:
+    """
+    Evens out the shards of a book, so that random shard picks
+    keep finding stock while copies remain.
+
+    Returns False if the book has no sharded inventory.
+    """
+    with transaction.atomic():
+        book = _lock_book(book_id)
+        if not book.sharded_inventory:
+            return False
+        _distribute(
+            book, book.inventory + _shard_total(book), _shard_count(book)
+        )
+        if book.inventory:
+            Book.objects.filter(pk=book.pk).update(inventory=0)
+    return True
+
+
+def rebalance_inventory_shards() -> int:
+    """Rebalances the shards of every book with sharded inventory."""
+    book_ids = Book.objects.filter(sharded_inventory=True).values_list(
+        "id", flat=True
+    )
+    return sum(rebalance_book(book_id) for book_id in book_ids)
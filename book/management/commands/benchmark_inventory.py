@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.core.management import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from book.inventory import enable_sharding
+from book.models import Book
+
+
+class Command(BaseCommand):
+    """
+    Django command to measure borrow/return throughput on a single book
+    with and without sharded inventory
+    """
+
+    help = (
+        "Run concurrent borrow/return cycles on one book, first with the "
+        "inventory column, then with sharded inventory, and print the "
+        "throughput. Run it against PostgreSQL: SQLite serializes all "
+        "writers whatever the inventory layout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument(
+            "--cycles",
+            type=int,
+            default=200,
+            help="Borrow/return cycles per thread.",
+        )
+        parser.add_argument(
+            "--hold-ms",
+            type=float,
+            default=5.0,
+            help=(
+                "Time a borrow transaction keeps running after taking "
+                "the copy, standing in for the rest of the borrowing."
+            ),
+        )
+        parser.add_argument("--shards", type=int, default=None)
+
+    def handle(self, *args, **options):
+        book = Book.objects.create(
+            title="Inventory benchmark",
+            author="Benchmark",
+            cover=Book.Covers.SOFT,
+            inventory=options["threads"] * 4,
+            daily_fee=1,
+        )
+        try:
+            baseline = self.run(book, options)
+            enable_sharding(book, options["shards"])
+            sharded = self.run(book, options)
+        finally:
+            book.delete()
+
+        self.stdout.write(self.format_result("inventory column", baseline))
+        self.stdout.write(self.format_result("sharded inventory", sharded))
+        if baseline["throughput"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Speedup: "
+                    f"{sharded['throughput'] / baseline['throughput']:.2f}x"
+                )
+            )
+
+    def run(self, book: Book, options: dict) -> dict:
+        hold = options["hold_ms"] / 1000
+        result = {"cycles": 0, "failed": 0}
+        lock = threading.Lock()
+
+        def worker():
+            cycles = failed = 0
+            try:
+                for _ in range(options["cycles"]):
+                    try:
+                        with transaction.atomic():
+                            taken = Book.objects.filter(pk=book.pk).take_copy()
+                            time.sleep(hold)
+                        if taken:
+                            Book.objects.filter(pk=book.pk).return_copy()
+                            cycles += 1
+                        else:
+                            failed += 1
+                    except OperationalError:
+                        failed += 1
+            finally:
+                connection.close()
+                with lock:
+                    result["cycles"] += cycles
+                    result["failed"] += failed
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options["threads"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result["seconds"] = time.perf_counter() - started
+        result["throughput"] = result["cycles"] / result["seconds"]
+        return result
+
+    @staticmethod
+    def format_result(label: str, result: dict) -> str:
+        return (
+            f"{label}: {result['cycles']} cycles in "
+            f"{result['seconds']:.2f}s ({result['throughput']:.1f}/s), "
+            f"{result['failed']} failed"
+        )
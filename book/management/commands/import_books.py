@@ -0,0 +1,71 @@
+import codecs
+import sys
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+
+from book.importers import (
+    CSV,
+    DEFAULT_BATCH_SIZE,
+    FORMATS,
+    NDJSON,
+    import_books,
+)
+
+
+class Command(BaseCommand):
+    """Django command to bulk import books from a CSV or NDJSON file"""
+
+    help = "Import books from a CSV or NDJSON file ('-' reads stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        data_format = options["format"] or self.guess_format(path)
+
+        if path == "-":
+            report = import_books(
+                codecs.iterdecode(sys.stdin.buffer, "utf-8-sig"),
+                data_format,
+                options["batch_size"],
+            )
+        else:
+            try:
+                # Decoded line by line, so invalid text is reported
+                # at its row instead of at the first buffered read.
+                with open(path, "rb") as file:
+                    report = import_books(
+                        codecs.iterdecode(file, "utf-8-sig"),
+                        data_format,
+                        options["batch_size"],
+                    )
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc}")
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.created} books, "
+                f"rejected {report.failed} rows."
+            )
+        )
+
+    @staticmethod
+    def guess_format(path: str) -> str:
+        suffix = Path(path).suffix.lower()
+        if suffix == ".csv":
+            return CSV
+        if suffix in (".ndjson", ".jsonl"):
+            return NDJSON
+        raise CommandError("Cannot guess the file format, use --format.")
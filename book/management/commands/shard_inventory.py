@@ -0,0 +1,50 @@
+from django.core.management import BaseCommand, CommandError
+
+from book.inventory import disable_sharding, enable_sharding
+from book.models import Book
+
+
+class Command(BaseCommand):
+    """Django command to switch books to or from sharded inventory"""
+
+    help = (
+        "Keep the copies of hot books in inventory shards "
+        "or move them back into the book row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("book_ids", nargs="+", type=int)
+        parser.add_argument(
+            "--shards",
+            type=int,
+            help="Number of shards, BOOK_INVENTORY_SHARDS by default.",
+        )
+        parser.add_argument(
+            "--disable",
+            action="store_true",
+            help="Move the copies back into the book row.",
+        )
+
+    def handle(self, *args, **options):
+        books = Book.objects.filter(pk__in=options["book_ids"])
+        missing = set(options["book_ids"]) - {book.pk for book in books}
+        if missing:
+            raise CommandError(
+                f"Books not found: {', '.join(map(str, sorted(missing)))}"
+            )
+
+        for book in books:
+            if options["disable"]:
+                book = disable_sharding(book)
+                self.stdout.write(
+                    f"{book}: {book.inventory} copies in the book row."
+                )
+            else:
+                try:
+                    book = enable_sharding(book, options["shards"])
+                except ValueError as exc:
+                    raise CommandError(exc)
+                self.stdout.write(
+                    f"{book}: {book.available_inventory} copies in "
+                    f"{book.inventory_shards.count()} shards."
+                )
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from book.search import drop_search_index, sync_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_search_index, drop_search_index),
+    ]
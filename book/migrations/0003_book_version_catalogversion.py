@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from book.search import sync_search_index
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model("book", "CatalogVersion")
+    CatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0002_book_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(
+            create_catalog_version, migrations.RunPython.noop
+        ),
+        # SQLite rebuilds book_book for the new columns,
+        # which drops the search index triggers.
+        migrations.RunPython(sync_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+from book.search import sync_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0003_book_version_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.CheckConstraint(
+                check=models.Q(("inventory__gte", 0)),
+                name="book_inventory_non_negative",
+            ),
+        ),
+        # SQLite rebuilds book_book to add the constraint,
+        # which drops the search index triggers.
+        migrations.RunPython(sync_search_index, migrations.RunPython.noop),
+    ]
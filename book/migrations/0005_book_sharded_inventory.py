@@ -0,0 +1,68 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from book.search import sync_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0004_book_inventory_non_negative"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="sharded_inventory",
+            field=models.BooleanField(
+                default=False,
+                help_text="Keep the copies in InventoryShard rows so that concurrent borrowings do not lock the book row.",
+            ),
+        ),
+        migrations.CreateModel(
+            name="InventoryShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("inventory", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory_shards",
+                        to="book.book",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["book", "shard"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="inventoryshard",
+            constraint=models.UniqueConstraint(
+                fields=("book", "shard"), name="inventory_shard_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="inventoryshard",
+            constraint=models.CheckConstraint(
+                check=models.Q(("inventory__gte", 0)),
+                name="inventory_shard_non_negative",
+            ),
+        ),
+        # SQLite rebuilds book_book to add the column,
+        # which drops the search index triggers.
+        migrations.RunPython(sync_search_index, migrations.RunPython.noop),
+    ]
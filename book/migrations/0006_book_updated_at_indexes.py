@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0005_book_sharded_inventory"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["updated_at"], name="book_updated_at_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventoryshard",
+            index=models.Index(
+                fields=["updated_at"], name="inventory_shard_updated_at_idx"
+            ),
+        ),
+    ]
@@ -1,7 +1,72 @@
-from django.db import models
+import random
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
 
+class BookQuerySet(models.QuerySet):
+    """Queryset with atomic inventory updates."""
+
+    def take_copy(self) -> bool:
+        """
+        Takes one copy of the selected book out of the inventory with
+        a single ``UPDATE ... SET inventory = inventory - 1
+        WHERE ... AND inventory > 0``.
+
+        Books with sharded inventory take the copy from one of their
+        shards and leave the book row untouched.
+
+        Returns False if no copy was available.
+        """
+        taken = self.filter(sharded_inventory=False, inventory__gt=0).update(
+            inventory=F("inventory") - 1,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        if taken:
+            return True
+        return InventoryShard.objects.filter(
+            book__in=self.filter(sharded_inventory=True)
+        ).take_copy()
+
+    def return_copy(self) -> bool:
+        """
+        Puts one copy of the selected book back into the inventory with
+        a single ``UPDATE ... SET inventory = inventory + 1``.
+
+        Books with sharded inventory put the copy into a random shard.
+        """
+        if InventoryShard.objects.filter(
+            book__in=self.filter(sharded_inventory=True)
+        ).return_copy():
+            return True
+        returned = self.update(
+            inventory=F("inventory") + 1,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        return bool(returned)
+
+    def with_available_inventory(self) -> "BookQuerySet":
+        """
+        Annotates ``shard_inventory``, the copies held by the inventory
+        shards of each book, read by ``Book.available_inventory``.
+        """
+        shard_inventory = (
+            InventoryShard.objects.filter(book=OuterRef("pk"))
+            .order_by()
+            .values("book")
+            .annotate(total=Sum("inventory"))
+            .values("total")
+        )
+        return self.annotate(
+            shard_inventory=Coalesce(Subquery(shard_inventory), 0)
+        )
+
+
 class Book(models.Model):
     """Book model."""
 
@@ -15,12 +80,51 @@ class Book(models.Model):
     author = models.CharField(max_length=255)
     cover = models.CharField(max_length=255, choices=Covers.choices)
     inventory = models.PositiveIntegerField()
+    sharded_inventory = models.BooleanField(
+        default=False,
+        help_text=(
+            "Keep the copies in InventoryShard rows "
+            "so that concurrent borrowings do not lock the book row."
+        ),
+    )
     daily_fee = models.DecimalField(max_digits=5, decimal_places=2)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self) -> str:
         """Returns the title of the book."""
         return self.title
 
+    def save(self, *args, **kwargs) -> None:
+        """Saves the book, bumping its version on every update."""
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "version", "updated_at"}
+        self.version = F("version") + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["version"])
+
+    @property
+    def available_inventory(self) -> int:
+        """
+        Returns the number of available copies, including the copies
+        held by the inventory shards of the book.
+        """
+        if not self.sharded_inventory:
+            return self.inventory
+        shard_inventory = getattr(self, "shard_inventory", None)
+        if shard_inventory is None:
+            shard_inventory = self.inventory_shards.aggregate(
+                total=Coalesce(Sum("inventory"), 0)
+            )["total"]
+        return self.inventory + shard_inventory
+
     def can_be_deleted(self) -> bool:
         """
         Checks if the book can be deleted.
@@ -46,3 +150,116 @@ class Book(models.Model):
 
     class Meta:
         ordering = ["-id"]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(inventory__gte=0),
+                name="book_inventory_non_negative",
+            ),
+        ]
+        indexes = [
+            # Latest inventory move, part of the book list ETag.
+            models.Index(fields=["updated_at"], name="book_updated_at_idx"),
+        ]
+
+
+class InventoryShardQuerySet(models.QuerySet):
+    """Queryset with atomic inventory updates on the selected shards."""
+
+    def take_copy(self) -> bool:
+        """
+        Takes one copy out of a random shard that has stock.
+
+        Shards are tried in random order with a conditional
+        ``UPDATE ... WHERE inventory > 0``, so concurrent borrowers
+        of the same book are spread over different rows.
+        """
+        shard_ids = list(
+            self.filter(inventory__gt=0).values_list("id", flat=True)
+        )
+        random.shuffle(shard_ids)
+        for shard_id in shard_ids:
+            if self.filter(id=shard_id, inventory__gt=0).update(
+                inventory=F("inventory") - 1, updated_at=timezone.now()
+            ):
+                return True
+        return False
+
+    def return_copy(self) -> bool:
+        """Puts one copy back into a random shard."""
+        shard_ids = list(self.values_list("id", flat=True))
+        if not shard_ids:
+            return False
+        self.filter(id=random.choice(shard_ids)).update(
+            inventory=F("inventory") + 1, updated_at=timezone.now()
+        )
+        return True
+
+
+class InventoryShard(models.Model):
+    """
+    One of the counters holding the copies of a book
+    with sharded inventory.
+    """
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="inventory_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    inventory = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = InventoryShardQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.book_id}/{self.shard}: {self.inventory}"
+
+    class Meta:
+        ordering = ["book", "shard"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "shard"], name="inventory_shard_unique"
+            ),
+            models.CheckConstraint(
+                check=models.Q(inventory__gte=0),
+                name="inventory_shard_non_negative",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["updated_at"], name="inventory_shard_updated_at_idx"
+            ),
+        ]
+
+
+class CatalogVersion(models.Model):
+    """
+    Catalog-wide change counter.
+
+    A single row, bumped whenever a book is created, changed or deleted.
+    Inventory moves (borrows and returns) do not bump it, they only
+    touch the ``updated_at`` of the book or inventory shard.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls) -> "CatalogVersion":
+        """Returns the catalog version row, creating it if missing."""
+        return cls.objects.get_or_create(pk=1)[0]
+
+    @classmethod
+    def bump(cls) -> None:
+        """
+        Increments the catalog version once the current transaction commits,
+        so the row is never locked for the rest of a write transaction.
+        """
+        transaction.on_commit(cls._increment)
+
+    @classmethod
+    def _increment(cls) -> None:
+        updated = cls.objects.filter(pk=1).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(pk=1, defaults={"version": 1})
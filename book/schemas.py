@@ -11,6 +11,13 @@ from book.serializers import BookSerializer
 book_list_view_schema = extend_schema_view(
     get=extend_schema(
         parameters=[
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                description="Full-text search by title and author, "
+                            "results are ordered by relevance. "
+                            "Not available with cursor pagination."
+            ),
             OpenApiParameter(
                 "title",
                 OpenApiTypes.STR,
@@ -23,7 +30,7 @@ book_list_view_schema = extend_schema_view(
             ),
         ],
         description="Retrieve a list of books with optional "
-                    "filtering by title and author."
+                    "full-text search and filtering by title and author."
     ),
     post=extend_schema(
         request=BookSerializer,
@@ -83,3 +90,17 @@ book_detail_view_schema = extend_schema_view(
         responses={204: None},
     ),
 )
+book_import_view_schema = extend_schema_view(
+    post=extend_schema(
+        request={
+            "text/csv": OpenApiTypes.STR,
+            "application/x-ndjson": OpenApiTypes.STR,
+        },
+        responses={200: OpenApiTypes.OBJECT},
+        description="Bulk import books from a CSV document with a "
+                    "title,author,cover,inventory,daily_fee header or from "
+                    "newline delimited JSON objects (admin only). "
+                    "Returns the number of created books and "
+                    "the errors of rejected rows."
+    ),
+)
@@ -0,0 +1,199 @@
+import re
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+FTS_TABLE = "book_book_fts"
+
+# Weights of the ``title`` and ``author`` columns in the SQLite bm25 rank.
+FTS_TITLE_WEIGHT = 10.0
+FTS_AUTHOR_WEIGHT = 5.0
+
+# The trigram tokenizer cannot match terms shorter than three characters.
+TRIGRAM_MIN_LENGTH = 3
+
+# Must stay identical to the expression of the ``book_book_search_idx``
+# index, otherwise Postgres will not use the index for ``q`` searches.
+PG_DOCUMENT = (
+    "to_tsvector('simple', "
+    "coalesce(\"title\", '') || ' ' || coalesce(\"author\", ''))"
+)
+PG_QUERY = "websearch_to_tsquery('simple', %s)"
+
+SQLITE_SEARCH_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, author, content='book_book', content_rowid='id', "
+    "tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    "AFTER INSERT ON book_book BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    "AFTER DELETE ON book_book BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF title, author ON book_book BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_DROP_SEARCH_INDEX_SQL = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+POSTGRES_SEARCH_INDEX_SQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS book_book_search_idx "
+    f"ON book_book USING gin (({PG_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS book_book_title_trgm_idx "
+    "ON book_book USING gin ((upper(\"title\"::text)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS book_book_author_trgm_idx "
+    "ON book_book USING gin ((upper(\"author\"::text)) gin_trgm_ops)",
+)
+POSTGRES_DROP_SEARCH_INDEX_SQL = (
+    "DROP INDEX IF EXISTS book_book_search_idx",
+    "DROP INDEX IF EXISTS book_book_title_trgm_idx",
+    "DROP INDEX IF EXISTS book_book_author_trgm_idx",
+)
+
+
+def sync_search_index(apps, schema_editor) -> None:
+    """
+    Create the search index for the current database backend
+    and rebuild its content from ``book_book``.
+
+    Safe to run repeatedly: migrations that make SQLite rebuild
+    the ``book_book`` table (which drops its triggers) run it again.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        statements = SQLITE_SEARCH_INDEX_SQL
+    elif vendor == "postgresql":
+        statements = POSTGRES_SEARCH_INDEX_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor) -> None:
+    """Remove the search index created by ``sync_search_index``."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        statements = SQLITE_DROP_SEARCH_INDEX_SQL
+    elif vendor == "postgresql":
+        statements = POSTGRES_DROP_SEARCH_INDEX_SQL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def search_books(
+        queryset: QuerySet,
+        q: str = None,
+        title: str = None,
+        author: str = None,
+) -> QuerySet:
+    """
+    Filter books through the full-text index of the database backend.
+
+    ``q`` is a ranked search over title and author, results are ordered
+    by ``search_rank`` (best first). ``title`` and ``author`` keep the
+    case-insensitive substring semantics of ``icontains``.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        return _search_postgres(queryset, q, title, author)
+    if vendor == "sqlite":
+        return _search_sqlite(queryset, q, title, author)
+    return _search_fallback(queryset, q, title, author)
+
+
+def _search_postgres(
+        queryset: QuerySet, q: str, title: str, author: str
+) -> QuerySet:
+    """Use the GIN tsvector index for ``q`` and trigram indexes otherwise."""
+    if title:
+        queryset = queryset.filter(title__icontains=title)
+    if author:
+        queryset = queryset.filter(author__icontains=author)
+    if q:
+        queryset = queryset.extra(
+            select={"search_rank": f"ts_rank({PG_DOCUMENT}, {PG_QUERY})"},
+            select_params=(q,),
+            where=[f"{PG_DOCUMENT} @@ {PG_QUERY}"],
+            params=(q,),
+        ).order_by("-search_rank", "-id")
+    return queryset
+
+
+def _search_sqlite(
+        queryset: QuerySet, q: str, title: str, author: str
+) -> QuerySet:
+    """Join the FTS5 table and filter it with MATCH / indexed LIKE."""
+    where = []
+    params = []
+
+    terms, short_terms = _split_terms(q)
+    if terms:
+        where.append(f"{FTS_TABLE} MATCH %s")
+        params.append(" ".join(f'"{term}"' for term in terms))
+    if short_terms:
+        queryset = _search_fallback(queryset, " ".join(short_terms))
+
+    for column, value in (("title", title), ("author", author)):
+        if not value:
+            continue
+        if "%" in value or "_" in value:
+            queryset = queryset.filter(**{f"{column}__icontains": value})
+        else:
+            where.append(f"{FTS_TABLE}.{column} LIKE %s")
+            params.append(f"%{value}%")
+
+    if not where:
+        return queryset
+
+    where.insert(0, f"{FTS_TABLE}.rowid = book_book.id")
+    queryset = queryset.extra(tables=[FTS_TABLE], where=where, params=params)
+    if terms:
+        rank = (
+            f"-bm25({FTS_TABLE}, {FTS_TITLE_WEIGHT}, {FTS_AUTHOR_WEIGHT})"
+        )
+        queryset = queryset.extra(select={"search_rank": rank}).order_by(
+            "-search_rank", "-id"
+        )
+    return queryset
+
+
+def _search_fallback(
+        queryset: QuerySet, q: str, title: str = None, author: str = None
+) -> QuerySet:
+    """Unindexed ``icontains`` search for other backends and short terms."""
+    if title:
+        queryset = queryset.filter(title__icontains=title)
+    if author:
+        queryset = queryset.filter(author__icontains=author)
+    for term in (q or "").split():
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(author__icontains=term)
+        )
+    return queryset
+
+
+def _split_terms(q: str) -> tuple:
+    """
+    Split ``q`` into terms the trigram tokenizer is able to match
+    and terms too short for it.
+    """
+    terms = re.findall(r"\w+", q or "")
+    return (
+        [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH],
+        [term for term in terms if len(term) < TRIGRAM_MIN_LENGTH],
+    )
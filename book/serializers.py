@@ -2,6 +2,7 @@ import re
 
 from rest_framework import serializers
 
+from book.inventory import set_inventory
 from book.models import Book
 
 
@@ -19,6 +20,26 @@ class BookSerializer(serializers.ModelSerializer):
             "daily_fee",
         )
 
+    def to_representation(self, instance: Book) -> dict:
+        """Reports the available copies of books with sharded inventory."""
+        data = super().to_representation(instance)
+        if "inventory" in data:
+            data["inventory"] = instance.available_inventory
+        return data
+
+    def update(self, instance: Book, validated_data: dict) -> Book:
+        """
+        Updates a book, spreading a new inventory of a book
+        with sharded inventory over its shards.
+        """
+        inventory = None
+        if instance.sharded_inventory and "inventory" in validated_data:
+            inventory = validated_data.pop("inventory")
+        instance = super().update(instance, validated_data)
+        if inventory is not None:
+            instance = set_inventory(instance, inventory)
+        return instance
+
     def validate_daily_fee(self, value: float) -> float:
         """Validate that the daily fee is not negative."""
         if value < 0:
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from book.models import Book, CatalogVersion
+
+
+@receiver(
+    post_save,
+    sender=Book,
+    dispatch_uid="bump_catalog_version_on_book_save",
+)
+def bump_catalog_version_on_book_save(sender, instance, **kwargs):
+    """
+    Bumps the catalog version when a book is created or updated.
+    """
+    CatalogVersion.bump()
+
+
+@receiver(
+    post_delete,
+    sender=Book,
+    dispatch_uid="bump_catalog_version_on_book_delete",
+)
+def bump_catalog_version_on_book_delete(sender, instance, **kwargs):
+    """
+    Bumps the catalog version when a book is deleted.
+    """
+    CatalogVersion.bump()
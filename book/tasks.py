@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from book.inventory import rebalance_inventory_shards
+
+
+@shared_task
+def rebalance_book_inventory_shards():
+    """
+    Evens out the inventory shards of the books with sharded inventory.
+    """
+    rebalance_inventory_shards()
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.inventory import enable_sharding
+from book.models import Book, CatalogVersion
+from user.models import User
+
+
+class BookConditionalGetTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book = Book.objects.create(
+                title="Test Book",
+                author="Author",
+                cover="SOFT",
+                inventory=5,
+                daily_fee=1,
+            )
+        self.list_url = reverse("book:book-list-create")
+        self.detail_url = reverse(
+            "book:book-detail", kwargs={"pk": self.book.pk}
+        )
+
+    def test_detail_returns_etag_and_last_modified(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["ETag"].startswith('"book-'))
+        self.assertIn("Last-Modified", response)
+
+    def test_detail_not_modified_skips_serializer(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        with patch("book.views.BookSerializer") as serializer:
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        serializer.assert_not_called()
+
+    def test_detail_etag_changes_on_update(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.patch(self.detail_url, {"inventory": 4})
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_not_modified(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_depends_on_query(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        response = self.client.get(
+            self.list_url, {"title": "Test"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_on_catalog_change(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.delete()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    def test_inventory_moves_do_not_bump_catalog_version(self):
+        version = CatalogVersion.current().version
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Book.objects.filter(pk=self.book.pk).take_copy()
+            Book.objects.filter(pk=self.book.pk).return_copy()
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CatalogVersion.current().version, version)
+
+    def test_list_etag_changes_on_borrow(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        Book.objects.filter(pk=self.book.pk).take_copy()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["inventory"], 4)
+
+    def test_list_etag_changes_on_sharded_borrow(self):
+        enable_sharding(self.book, shards=2)
+        etag = self.client.get(self.list_url)["ETag"]
+        Book.objects.filter(pk=self.book.pk).take_copy()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["inventory"], 4)
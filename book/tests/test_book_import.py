@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from user.models import User
+
+CSV_BOOKS = (
+    "title,author,cover,inventory,daily_fee\n"
+    "Dune,Frank Herbert,HARD,3,1.50\n"
+    "\"Bad, Book\",R2-D2,SOFT,1,1\n"
+    "Emma,Jane Austen,SOFT,2,-1\n"
+    "Persuasion,Jane Austen,SOFT,2,0.99\n"
+)
+
+
+class BookImportViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse("book:book-import")
+
+    def test_import_csv(self):
+        response = self.client.generic(
+            "POST", self.url, CSV_BOOKS, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(
+            [(error["row"], set(error["errors"]))
+             for error in response.data["errors"]],
+            [(2, {"author"}), (3, {"daily_fee"})],
+        )
+        self.assertEqual(
+            set(Book.objects.values_list("title", flat=True)),
+            {"Dune", "Persuasion"},
+        )
+
+    def test_import_ndjson(self):
+        body = "\n".join([
+            json.dumps({
+                "title": "Dune",
+                "author": "Frank Herbert",
+                "cover": "HARD",
+                "inventory": 3,
+                "daily_fee": "1.50",
+            }),
+            "",
+            "{not json",
+            json.dumps({"title": "No Author"}),
+        ])
+        response = self.client.generic(
+            "POST", self.url, body, content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            [error["row"] for error in response.data["errors"]], [3, 4]
+        )
+
+    def test_import_non_utf8_csv(self):
+        body = (
+            "title,author,cover,inventory,daily_fee\n"
+            "Dune,Frank Herbert,HARD,3,1.50\n"
+        ).encode() + "Émile,Rousseau,SOFT,1,1\n".encode("latin-1")
+        response = self.client.generic(
+            "POST", self.url, body, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            response.data["errors"],
+            [{"row": 2,
+              "errors": ["Invalid UTF-8 text, the import stopped here."]}],
+        )
+
+    def test_import_csv_with_nul_byte(self):
+        body = CSV_BOOKS.replace("Persuasion", "Persua\0sion")
+        response = self.client.generic(
+            "POST", self.url, body, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            [error["row"] for error in response.data["errors"]], [2, 3, 4]
+        )
+        self.assertEqual(
+            list(Book.objects.values_list("title", flat=True)), ["Dune"]
+        )
+
+    def test_import_csv_with_oversized_field(self):
+        body = CSV_BOOKS + "x" * (csv.field_size_limit() + 1) + "\n"
+        response = self.client.generic(
+            "POST", self.url, body, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["errors"][-1]["row"], 5)
+        self.assertIn("Invalid CSV", response.data["errors"][-1]["errors"][0])
+
+    def test_import_unsupported_content_type(self):
+        response = self.client.post(self.url, {}, format="json")
+        self.assertEqual(
+            response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    def test_import_as_non_admin(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.generic(
+            "POST", self.url, CSV_BOOKS, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Book.objects.exists())
+
+
+class ImportBooksCommandTestCase(APITestCase):
+
+    def test_import_books_command(self):
+        with tempfile.NamedTemporaryFile(
+                "w", suffix=".csv", delete=False
+        ) as file:
+            file.write(CSV_BOOKS)
+        self.addCleanup(os.unlink, file.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_books", file.name, batch_size=1,
+            stdout=stdout, stderr=stderr,
+        )
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertIn("Imported 2 books, rejected 2 rows.", stdout.getvalue())
+        self.assertIn("Row 2:", stderr.getvalue())
+
+    def test_import_non_utf8_file(self):
+        with tempfile.NamedTemporaryFile(
+                "wb", suffix=".csv", delete=False
+        ) as file:
+            file.write(CSV_BOOKS.encode() + "Émile\n".encode("latin-1"))
+        self.addCleanup(os.unlink, file.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_books", file.name, stdout=stdout, stderr=stderr
+        )
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertIn("Imported 2 books, rejected 3 rows.", stdout.getvalue())
+        self.assertIn("Row 5: ['Invalid UTF-8", stderr.getvalue())
@@ -0,0 +1,103 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.inventory import (
+    disable_sharding,
+    enable_sharding,
+    rebalance_inventory_shards,
+)
+from book.models import Book, InventoryShard
+from user.models import User
+
+
+class InventoryShardTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.book = Book.objects.create(
+            title="Bestseller",
+            author="Author",
+            cover="SOFT",
+            inventory=10,
+            daily_fee=1,
+        )
+        self.detail_url = reverse(
+            "book:book-detail", kwargs={"pk": self.book.pk}
+        )
+
+    def shard_inventories(self) -> list:
+        return list(
+            self.book.inventory_shards.values_list("inventory", flat=True)
+        )
+
+    def test_enable_sharding_spreads_copies(self):
+        book = enable_sharding(self.book, shards=4)
+        self.assertTrue(book.sharded_inventory)
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(self.shard_inventories(), [3, 3, 2, 2])
+        self.assertEqual(book.available_inventory, 10)
+
+    def test_take_and_return_use_shards(self):
+        enable_sharding(self.book, shards=4)
+        version = Book.objects.get(pk=self.book.pk).version
+        books = Book.objects.filter(pk=self.book.pk)
+
+        for _ in range(10):
+            self.assertTrue(books.take_copy())
+        self.assertFalse(books.take_copy())
+        self.assertEqual(sum(self.shard_inventories()), 0)
+
+        self.assertTrue(books.return_copy())
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.available_inventory, 1)
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(book.version, version)
+
+    def test_rebalance_evens_out_shards(self):
+        enable_sharding(self.book, shards=2)
+        InventoryShard.objects.filter(book=self.book, shard=0).update(
+            inventory=0
+        )
+        InventoryShard.objects.filter(book=self.book, shard=1).update(
+            inventory=6
+        )
+
+        self.assertEqual(rebalance_inventory_shards(), 1)
+        self.assertEqual(self.shard_inventories(), [3, 3])
+
+    def test_disable_sharding_restores_column(self):
+        enable_sharding(self.book, shards=3)
+        Book.objects.filter(pk=self.book.pk).take_copy()
+
+        book = disable_sharding(self.book)
+        self.assertFalse(book.sharded_inventory)
+        self.assertEqual(book.inventory, 9)
+        self.assertFalse(InventoryShard.objects.exists())
+
+    def test_api_reports_and_updates_sharded_inventory(self):
+        enable_sharding(self.book, shards=4)
+        Book.objects.filter(pk=self.book.pk).take_copy()
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data["inventory"], 9)
+        response = self.client.get(reverse("book:book-list-create"))
+        self.assertEqual(response.data["results"][0]["inventory"], 9)
+
+        self.client.force_authenticate(self.admin_user)
+        response = self.client.patch(self.detail_url, {"inventory": 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["inventory"], 20)
+        self.assertEqual(self.shard_inventories(), [5, 5, 5, 5])
+
+    def test_detail_etag_follows_shard_changes(self):
+        enable_sharding(self.book, shards=4)
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        Book.objects.filter(pk=self.book.pk).take_copy()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["inventory"], 9)
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from library_service.pagination import KeysetCursorPagination
+
+
+class BookCursorPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        self.books = [
+            Book.objects.create(
+                title=f"Book {i}",
+                author="Author",
+                cover="SOFT",
+                inventory=1,
+                daily_fee=1,
+            )
+            for i in range(12)
+        ]
+        self.list_url = reverse("book:book-list-create")
+
+    def test_cursor_page_has_no_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.list_url, {"pagination": "cursor"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            [query for query in queries if "COUNT(" in query["sql"]]
+        )
+        self.assertNotIn("count", response.data)
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]],
+            [book.id for book in self.books[::-1][:5]],
+        )
+
+    def test_cursor_pages_cover_catalog(self):
+        seen = []
+        url = self.list_url + "?pagination=cursor&page_size=4"
+        while url:
+            response = self.client.get(url)
+            seen += [book["id"] for book in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, [book.id for book in self.books[::-1]])
+
+    def test_cursor_is_stable_while_inserting(self):
+        response = self.client.get(
+            self.list_url, {"pagination": "cursor", "page_size": 6}
+        )
+        first_page = [book["id"] for book in response.data["results"]]
+        Book.objects.create(
+            title="New Book",
+            author="Author",
+            cover="SOFT",
+            inventory=1,
+            daily_fee=1,
+        )
+
+        response = self.client.get(response.data["next"])
+        second_page = [book["id"] for book in response.data["results"]]
+
+        self.assertEqual(
+            first_page + second_page, [book.id for book in self.books[::-1]]
+        )
+
+    def test_page_size_is_bounded(self):
+        with patch.object(KeysetCursorPagination, "max_page_size", 3):
+            response = self.client.get(
+                self.list_url, {"pagination": "cursor", "page_size": 1000}
+            )
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_search_is_rejected_in_cursor_mode(self):
+        response = self.client.get(
+            self.list_url, {"pagination": "cursor", "q": "Book"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("q", response.data)
+
+    def test_search_keeps_page_number_mode(self):
+        response = self.client.get(self.list_url, {"q": "Book"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 12)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(len(response.data["results"]), 5)
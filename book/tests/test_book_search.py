@@ -0,0 +1,66 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.models import Book
+
+
+class BookSearchTestCase(APITestCase):
+
+    def setUp(self):
+        self.dune = Book.objects.create(
+            title="Dune",
+            author="Frank Herbert",
+            cover="HARD",
+            inventory=3,
+            daily_fee=1,
+        )
+        self.messiah = Book.objects.create(
+            title="Dune Messiah",
+            author="Frank Herbert",
+            cover="SOFT",
+            inventory=2,
+            daily_fee=1,
+        )
+        self.dune_fan = Book.objects.create(
+            title="Sand and Spice",
+            author="Dune Fan",
+            cover="SOFT",
+            inventory=1,
+            daily_fee=1,
+        )
+        self.list_url = reverse("book:book-list-create")
+
+    def search(self, **params) -> list:
+        response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_search_ranks_title_matches_first(self):
+        ids = self.search(q="dune")
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[-1], self.dune_fan.id)
+
+    def test_search_requires_all_terms(self):
+        self.assertEqual(self.search(q="dune messiah"), [self.messiah.id])
+
+    def test_search_with_short_terms(self):
+        self.assertEqual(self.search(q="spice an"), [self.dune_fan.id])
+
+    def test_title_filter_matches_substring(self):
+        self.assertEqual(
+            self.search(title="une mess"), [self.messiah.id]
+        )
+
+    def test_author_filter_is_case_insensitive(self):
+        self.assertEqual(
+            self.search(author="HERBERT"), [self.messiah.id, self.dune.id]
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.dune.title = "Children of Dune"
+        self.dune.save()
+        self.messiah.delete()
+
+        self.assertEqual(self.search(title="children"), [self.dune.id])
+        self.assertEqual(self.search(title="messiah"), [])
@@ -1,5 +1,5 @@
 from django.urls import path
-from book.views import BookListView, BookDetailView
+from book.views import BookListView, BookDetailView, BookImportView
 
 
 app_name = "book"
@@ -7,4 +7,5 @@ app_name = "book"
 urlpatterns = [
     path("", BookListView.as_view(), name="book-list-create"),
     path("<int:pk>/", BookDetailView.as_view(), name="book-detail"),
+    path("import/", BookImportView.as_view(), name="book-import"),
 ]
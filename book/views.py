@@ -1,14 +1,145 @@
-from rest_framework import generics, mixins
+import codecs
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Max, Sum
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import generics, mixins, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from book.schemas import book_list_view_schema, book_detail_view_schema
-from book.models import Book
+from book.importers import CSV, NDJSON, import_books
+from book.schemas import (
+    book_list_view_schema,
+    book_detail_view_schema,
+    book_import_view_schema,
+)
+from book.models import Book, CatalogVersion, InventoryShard
 from book.permissions import IsAdminOrReadOnly
+from book.search import search_books
 
 from book.serializers import BookSerializer
 
 
+def _catalog_state(request: Request) -> dict:
+    """
+    Returns the catalog version and the time of the last inventory move
+    of a book or inventory shard, fetched once per request.
+
+    Inventory moves do not bump the catalog version, so borrows never
+    write to one shared row. The latest move is read from the indexed
+    ``updated_at`` columns instead.
+    """
+    if not hasattr(request, "_catalog_state"):
+        catalog = CatalogVersion.current()
+        moved_at = [
+            moved_at
+            for moved_at in (
+                Book.objects.aggregate(last=Max("updated_at"))["last"],
+                InventoryShard.objects.aggregate(
+                    last=Max("updated_at")
+                )["last"],
+            )
+            if moved_at is not None
+        ]
+        request._catalog_state = {
+            "version": catalog.version,
+            "moved_at": moved_at,
+            "updated_at": max([catalog.updated_at, *moved_at]),
+        }
+    return request._catalog_state
+
+
+def book_list_etag(request: Request, *args, **kwargs) -> str:
+    """
+    Strong ETag of a book list page: the catalog version and the last
+    inventory move plus everything that selects or renders the page
+    (query string and Accept header).
+    """
+    catalog = _catalog_state(request)
+    representation = hashlib.sha256(
+        "|".join(
+            [
+                request.GET.urlencode(),
+                request.META.get("HTTP_ACCEPT", ""),
+                *(moved_at.isoformat() for moved_at in catalog["moved_at"]),
+            ]
+        ).encode()
+    ).hexdigest()[:16]
+    return f"catalog-{catalog['version']}-{representation}"
+
+
+def book_list_last_modified(request: Request, *args, **kwargs) -> datetime:
+    """
+    Last-Modified of the book list: the last catalog change
+    or inventory move.
+    """
+    return _catalog_state(request)["updated_at"]
+
+
+def _book_version(request: Request, pk: int) -> Optional[dict]:
+    """Returns the version and modification time of a book, if it exists."""
+    if not hasattr(request, "_book_version"):
+        request._book_version = (
+            Book.objects.filter(pk=pk)
+            .annotate(
+                shard_inventory=Sum("inventory_shards__inventory"),
+                shards_updated_at=Max("inventory_shards__updated_at"),
+            )
+            .values(
+                "version",
+                "updated_at",
+                "shard_inventory",
+                "shards_updated_at",
+            )
+            .first()
+        )
+    return request._book_version
+
+
+def book_detail_etag(request: Request, pk: int, *args, **kwargs):
+    """
+    Strong ETag of a book: its id and version plus the Accept header.
+    Books with sharded inventory add the copies held by their shards,
+    which change without bumping the book version.
+    """
+    book = _book_version(request, pk)
+    if book is None:
+        return None
+    representation = hashlib.sha256(
+        request.META.get("HTTP_ACCEPT", "").encode()
+    ).hexdigest()[:16]
+    version = book["version"]
+    if book["shard_inventory"] is not None:
+        version = f"{version}.{book['shard_inventory']}"
+    return f"book-{pk}-{version}-{representation}"
+
+
+def book_detail_last_modified(request: Request, pk: int, *args, **kwargs):
+    """
+    Last-Modified of a book: the time of its last update
+    or of the last update of its inventory shards.
+    """
+    book = _book_version(request, pk)
+    if book is None:
+        return None
+    return max(
+        filter(None, (book["updated_at"], book["shards_updated_at"]))
+    )
+
+
 @book_list_view_schema
+@method_decorator(
+    condition(
+        etag_func=book_list_etag,
+        last_modified_func=book_list_last_modified,
+    ),
+    name="get",
+)
 class BookListView(
     generics.GenericAPIView,
     mixins.ListModelMixin,
@@ -16,27 +147,25 @@ class BookListView(
 ):
     """View for listing and creating books."""
 
-    queryset = Book.objects.all()
+    queryset = Book.objects.with_available_inventory()
     serializer_class = BookSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    # Relevance ranked results cannot be paged by id.
+    cursor_incompatible_query_params = ("q",)
 
     def get(self, request, *args, **kwargs) -> Response:
         """
         Handle GET request.
 
-        Returns a list of all books
-        with optional filtering by title and author.
+        Returns a list of all books with optional ranked full-text
+        search and filtering by title and author.
         """
-        title = request.query_params.get("title")
-        author = request.query_params.get("author")
-
-        queryset = self.get_queryset()
-
-        if title:
-            queryset = queryset.filter(title__icontains=title)
-
-        if author:
-            queryset = queryset.filter(author__icontains=author)
+        queryset = search_books(
+            self.get_queryset(),
+            q=request.query_params.get("q"),
+            title=request.query_params.get("title"),
+            author=request.query_params.get("author"),
+        )
 
         page = self.paginate_queryset(queryset)
         serializer = self.get_serializer(
@@ -57,6 +186,13 @@ class BookListView(
 
 
 @book_detail_view_schema
+@method_decorator(
+    condition(
+        etag_func=book_detail_etag,
+        last_modified_func=book_detail_last_modified,
+    ),
+    name="get",
+)
 class BookDetailView(
     generics.GenericAPIView,
     mixins.RetrieveModelMixin,
@@ -65,7 +201,7 @@ class BookDetailView(
 ):
     """View for retrieving, updating, and deleting a book."""
 
-    queryset = Book.objects.all()
+    queryset = Book.objects.with_available_inventory()
     serializer_class = BookSerializer
     permission_classes = (IsAdminOrReadOnly,)
 
@@ -100,3 +236,37 @@ class BookDetailView(
         Deletes a book.
         """
         return self.destroy(request, *args, **kwargs)
+
+
+@book_import_view_schema
+class BookImportView(APIView):
+    """View for bulk importing books from a CSV or NDJSON stream."""
+
+    permission_classes = (IsAdminUser,)
+    content_types = {
+        "text/csv": CSV,
+        "application/x-ndjson": NDJSON,
+        "application/jsonl": NDJSON,
+    }
+
+    def post(self, request, *args, **kwargs) -> Response:
+        """
+        Handle POST request.
+
+        Streams the request body into the catalog and returns
+        the number of created books and the rejected rows.
+        """
+        media_type = request.content_type.split(";")[0].strip().lower()
+        data_format = self.content_types.get(media_type)
+        if data_format is None:
+            return Response(
+                {
+                    "error": "Unsupported content type. "
+                    f"Use one of: {', '.join(self.content_types)}."
+                },
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        lines = codecs.iterdecode(request.stream or (), "utf-8-sig")
+        report = import_books(lines, data_format)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from borrowing.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request: Request, scope: str) -> str:
+    """Hash of everything that makes two requests the same operation."""
+    body = json.dumps(
+        request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str
+    )
+    return hashlib.sha256(
+        f"{scope}|{request.method}|{request.path}|{body}".encode()
+    ).hexdigest()
+
+
+def _claim_key(request: Request, key: str, scope: str, request_hash: str):
+    """
+    Stores a new key for the request, returning ``(key, None)``,
+    or returns ``(None, existing key)`` if the key was already used.
+
+    Expired keys and keys abandoned by a crashed request are replaced,
+    and so are keys deleted (e.g. purged) after the conflict.
+    """
+    now = timezone.now()
+    existing = None
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    scope=scope,
+                    request_hash=request_hash,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                ), None
+        except IntegrityError:
+            pass
+        with transaction.atomic():
+            # Checked and replaced under the row lock, so the key cannot
+            # be purged or taken over by another request meanwhile.
+            existing = (
+                IdempotencyKey.objects.select_for_update()
+                .filter(user=request.user, key=key, scope=scope)
+                .first()
+            )
+            if existing is None:
+                continue
+            abandoned = existing.status_code is None and (
+                existing.created_at
+                < now - settings.IDEMPOTENCY_KEY_LOCK_TIMEOUT
+            )
+            if existing.expires_at > now and not abandoned:
+                return None, existing
+            existing.delete()
+            existing = None
+    return None, existing
+
+
+def _replay(stored: IdempotencyKey) -> HttpResponse:
+    if stored.location:
+        response = HttpResponse(status=stored.status_code)
+        response["Location"] = stored.location
+    else:
+        response = Response(stored.response_data, status=stored.status_code)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _store(stored: IdempotencyKey, response: HttpResponse) -> None:
+    """
+    Keeps successful and redirect responses, forgets the others.
+
+    The key row is only updated while it is still the claim of this
+    request: a key taken over meanwhile (see ``_claim_key``) was
+    replaced by a new row and is left alone.
+    """
+    if not status.is_success(response.status_code) and not (
+        status.is_redirect(response.status_code)
+    ):
+        stored.delete()
+        return
+    IdempotencyKey.objects.filter(
+        pk=stored.pk, status_code__isnull=True
+    ).update(
+        status_code=response.status_code,
+        response_data=getattr(response, "data", None),
+        location=response.get("Location", ""),
+    )
+
+
+def idempotent(scope: str):
+    """
+    Makes a view safe to retry with an ``Idempotency-Key`` header.
+
+    The first successful or redirect response is stored and replayed
+    to retries with the same key, user and body without running the
+    view again. A retry while the first request is still running gets
+    409, reusing a key for a different request gets 422. Requests
+    without the header or from anonymous users run as usual.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or not request.user.is_authenticated:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {
+                        "error": f"{IDEMPOTENCY_HEADER} must be at most "
+                        f"{MAX_KEY_LENGTH} characters long"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            request_hash = request_fingerprint(request, scope)
+            stored, existing = _claim_key(request, key, scope, request_hash)
+            if stored is None:
+                return _existing_key_response(existing, request_hash)
+
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                stored.delete()
+                raise
+            _store(stored, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _existing_key_response(
+        existing: Optional[IdempotencyKey], request_hash: str
+) -> HttpResponse:
+    if existing is not None and existing.request_hash != request_hash:
+        return Response(
+            {
+                "error": f"This {IDEMPOTENCY_HEADER} was used "
+                "with a different request"
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if existing is None or existing.status_code is None:
+        return Response(
+            {
+                "error": "A request with this "
+                f"{IDEMPOTENCY_HEADER} is in progress"
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+    return _replay(existing)
+
+
+def purge_expired_keys() -> int:
+    """Deletes the idempotency keys past their expiry time."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        expires_at__lt=timezone.now()
+    ).delete()
+    return deleted
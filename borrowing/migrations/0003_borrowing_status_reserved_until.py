@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrowing",
+            name="reserved_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="borrowing",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("AWAITING_PAYMENT", "Awaiting payment"),
+                    ("ACTIVE", "Active"),
+                    ("CANCELLED", "Cancelled"),
+                ],
+                default="ACTIVE",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Cast, Round
+
+FINE_MULTIPLIER = 2
+
+
+def snapshot_fees(apps, schema_editor):
+    # One UPDATE, rows never go through Python. The book fee is still
+    # a decimal here, rounded half up to cents.
+    Book = apps.get_model("book", "Book")
+    Borrowing = apps.get_model("borrowing", "Borrowing")
+    Borrowing.objects.update(
+        daily_fee_cents=Subquery(
+            Book.objects.filter(pk=OuterRef("book_id")).values(
+                cents=Cast(
+                    Round(F("daily_fee") * 100), models.IntegerField()
+                )
+            )[:1]
+        ),
+        fine_multiplier=FINE_MULTIPLIER,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("book", "0005_book_sharded_inventory"),
+        ("borrowing", "0005_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrowing",
+            name="daily_fee_cents",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="borrowing",
+            name="fine_multiplier",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(snapshot_fees, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="borrowing",
+            name="daily_fee_cents",
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="borrowing",
+            name="fine_multiplier",
+            field=models.PositiveSmallIntegerField(),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_states(apps, schema_editor):
+    Borrowing = apps.get_model("borrowing", "Borrowing")
+    Payment = apps.get_model("payment", "Payment")
+    UserBorrowingState = apps.get_model("borrowing", "UserBorrowingState")
+    states = {}
+    active = (
+        Borrowing.objects.filter(actual_return_date__isnull=True)
+        .exclude(status="CANCELLED")
+        .values("user_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in active:
+        states[row["user_id"]] = UserBorrowingState(
+            user_id=row["user_id"], active_borrowings=row["count"]
+        )
+    outstanding = (
+        Payment.objects.filter(Q(status="PENDING") | Q(status="EXPIRED"))
+        .exclude(borrowing_id__status="CANCELLED")
+        .values("borrowing_id__user_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in outstanding:
+        user_id = row["borrowing_id__user_id"]
+        state = states.setdefault(
+            user_id, UserBorrowingState(user_id=user_id)
+        )
+        state.outstanding_payments = row["count"]
+    UserBorrowingState.objects.bulk_create(states.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0006_borrowing_fee_snapshot"),
+        ("payment", "0004_money_in_cents"),
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserBorrowingState",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="borrowing_state",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("outstanding_payments", models.PositiveIntegerField(default=0)),
+                ("active_borrowings", models.PositiveIntegerField(default=0)),
+                ("blocked", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_states, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,25 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from book.models import Book
-from library_service import settings
+from payment.money import to_cents
 
 User = settings.AUTH_USER_MODEL
 
+# Fields of a borrowing counted in the borrowing state of its user.
+STATE_FIELDS = ("user_id", "status", "actual_return_date")
+
 
 class Borrowing(models.Model):
+
+    class BorrowingStatus(models.TextChoices):
+        AWAITING_PAYMENT = "AWAITING_PAYMENT", "Awaiting payment"
+        ACTIVE = "ACTIVE", "Active"
+        CANCELLED = "CANCELLED", "Cancelled"
+
     borrow_date = models.DateField(auto_now_add=True)
     expected_return_date = models.DateField()
     actual_return_date = models.DateField(null=True, blank=True)
@@ -20,6 +33,121 @@ class Borrowing(models.Model):
         on_delete=models.CASCADE,
         related_name="borrowing"
     )
+    status = models.CharField(
+        max_length=16,
+        choices=BorrowingStatus.choices,
+        default=BorrowingStatus.ACTIVE
+    )
+    reserved_until = models.DateTimeField(null=True, blank=True)
+    daily_fee_cents = models.PositiveIntegerField()
+    fine_multiplier = models.PositiveSmallIntegerField()
+
+    def save(self, *args, **kwargs):
+        if not self.id:
+            # Later changes of the book fee or the fine multiplier
+            # do not apply to existing borrowings.
+            if self.daily_fee_cents is None:
+                self.daily_fee_cents = to_cents(self.book.daily_fee)
+            if self.fine_multiplier is None:
+                self.fine_multiplier = settings.BORROWING_FINE_MULTIPLIER
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        borrowing = super().from_db(db, field_names, values)
+        borrowing.loaded_state_values = borrowing.state_values()
+        return borrowing
+
+    def state_values(self) -> Optional[dict]:
+        """
+        The values of STATE_FIELDS, or None if some are not loaded.
+        Compared on save to refresh the borrowing state of the user.
+        """
+        if self.get_deferred_fields().intersection(STATE_FIELDS):
+            return None
+        return {field: getattr(self, field) for field in STATE_FIELDS}
 
     def __str__(self):
         return f"{self.user} borrowed {self.book} ({self.borrow_date})"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "actual_return_date"],
+                name="borrowing_user_returned_idx",
+            ),
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_due_idx",
+            ),
+            models.Index(
+                fields=["status", "reserved_until"],
+                name="borrowing_status_reserved_idx",
+            ),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a request sent with an ``Idempotency-Key`` header,
+    replayed to retries of the same request until it expires.
+
+    A key without a ``status_code`` belongs to a request in progress.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_data = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder
+    )
+    location = models.CharField(max_length=2048, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status_code})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "scope", "key"],
+                name="idempotency_key_unique",
+            ),
+        ]
+
+
+class UserBorrowingState(models.Model):
+    """
+    Whether a user may borrow books, kept up to date in the transactions
+    that change the borrowings and payments of the user.
+
+    ``outstanding_payments`` counts pending and expired payments of
+    borrowings that were not cancelled, ``active_borrowings`` the
+    borrowings not returned or cancelled. ``blocked`` is set by staff.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="borrowing_state",
+    )
+    outstanding_payments = models.PositiveIntegerField(default=0)
+    active_borrowings = models.PositiveIntegerField(default=0)
+    blocked = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (
+            f"{self.user}: {self.active_borrowings} active, "
+            f"{self.outstanding_payments} outstanding"
+            f"{', blocked' if self.blocked else ''}"
+        )
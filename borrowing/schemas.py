@@ -11,6 +11,21 @@ from borrowing.serializers import (
 )
 from rest_framework import status
 
+idempotency_key_parameter = OpenApiParameter(
+    name="Idempotency-Key",
+    description="Unique key of the operation. Retries with the same key replay the first successful response.",
+    required=False,
+    type=str,
+    location=OpenApiParameter.HEADER
+)
+idempotency_key_responses = {
+    status.HTTP_409_CONFLICT: OpenApiResponse(
+        description="A request with the same Idempotency-Key is in progress."
+    ),
+    status.HTTP_422_UNPROCESSABLE_ENTITY: OpenApiResponse(
+        description="The Idempotency-Key was used with a different request."
+    ),
+}
 
 borrowing_list_create_view_schema = extend_schema_view(
     get=extend_schema(
@@ -54,6 +69,7 @@ borrowing_list_create_view_schema = extend_schema_view(
                 type=str,
                 location="query"
             ),
+            idempotency_key_parameter,
         ],
         responses={
             status.HTTP_201_CREATED: OpenApiResponse(
@@ -66,6 +82,7 @@ borrowing_list_create_view_schema = extend_schema_view(
             status.HTTP_404_NOT_FOUND: OpenApiResponse(
                 description="Book not found or not available."
             ),
+            **idempotency_key_responses,
         },
     )
 )
@@ -95,6 +112,7 @@ return_borrowing_schema = extend_schema(
             type=str,
             location="query"
         ),
+        idempotency_key_parameter,
     ],
     responses={
         status.HTTP_200_OK: OpenApiResponse(
@@ -104,11 +122,19 @@ return_borrowing_schema = extend_schema(
             description="Redirect to Stripe session for fine payment."
         ),
         status.HTTP_400_BAD_REQUEST: OpenApiResponse(
-            description="Bad request or borrowing already returned."
+            description="Bad request, borrowing already returned, or the "
+                        "fine was recorded but its payment session could "
+                        "not be created (retry at fine_session_url)."
         ),
         status.HTTP_404_NOT_FOUND: OpenApiResponse(
             description="Borrowing not found."
         ),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(
+            description="Book returned and fine recorded, but payments are "
+                        "temporarily unavailable (retry at "
+                        "fine_session_url)."
+        ),
+        **idempotency_key_responses,
     },
 )
 
@@ -8,7 +8,7 @@ from user.serializers import UserSerializer
 
 
 class BorrowingSerializer(serializers.ModelSerializer):
-    book = serializers.StringRelatedField()
+    book = serializers.CharField(source="book.title", read_only=True)
     user_email = serializers.CharField(source="user.email", read_only=True)
 
     class Meta:
@@ -20,6 +20,7 @@ class BorrowingSerializer(serializers.ModelSerializer):
             "borrow_date",
             "expected_return_date",
             "actual_return_date",
+            "status",
         )
 
 
@@ -50,5 +51,6 @@ class BorrowingDetailSerializer(BorrowingSerializer):
             "borrow_date",
             "expected_return_date",
             "actual_return_date",
+            "status",
             "payments"
         )
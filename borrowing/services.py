@@ -0,0 +1,189 @@
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+from book.models import Book
+from borrowing.models import Borrowing, UserBorrowingState
+from payment.models import Payment
+
+
+def lock_borrowing_state(user_id: int) -> UserBorrowingState:
+    """
+    Returns the borrowing state of a user, locked until the end
+    of the current transaction.
+    """
+    state, _ = UserBorrowingState.objects.select_for_update().get_or_create(
+        user_id=user_id
+    )
+    return state
+
+
+def refresh_borrowing_state(
+        user_id: int, create: bool = True
+) -> Optional[UserBorrowingState]:
+    """
+    Recounts the outstanding payments and active borrowings of a user.
+    Call it in the transaction that changes them.
+
+    With ``create=False`` a user without a borrowing state is skipped,
+    e.g. while the user itself is being deleted.
+    """
+    with transaction.atomic():
+        if create:
+            state = lock_borrowing_state(user_id)
+        else:
+            state = (
+                UserBorrowingState.objects.select_for_update()
+                .filter(pk=user_id)
+                .first()
+            )
+            if state is None:
+                return None
+        state.outstanding_payments = (
+            Payment.objects.filter(
+                user_id=user_id,
+                status__in=(
+                    Payment.PaymentStatus.PENDING,
+                    Payment.PaymentStatus.EXPIRED,
+                ),
+            )
+            .exclude(borrowing_id__status=Borrowing.BorrowingStatus.CANCELLED)
+            .count()
+        )
+        state.active_borrowings = (
+            Borrowing.objects.filter(
+                user_id=user_id, actual_return_date__isnull=True
+            )
+            .exclude(status=Borrowing.BorrowingStatus.CANCELLED)
+            .count()
+        )
+        state.save(
+            update_fields=[
+                "outstanding_payments", "active_borrowings", "updated_at"
+            ]
+        )
+    return state
+
+
+def check_borrowing_allowed(state: UserBorrowingState) -> None:
+    """
+    Raises ValidationError if the user of the state may not borrow.
+    """
+    if state.blocked:
+        raise ValidationError("User is blocked from borrowing books.")
+    if state.outstanding_payments:
+        raise ValidationError(
+            "User has pending payments and cannot borrow new books."
+        )
+    limit = settings.MAX_ACTIVE_BORROWINGS_PER_USER
+    if limit and state.active_borrowings >= limit:
+        raise ValidationError(
+            f"User already has {state.active_borrowings} active "
+            f"borrowings, the limit is {limit}."
+        )
+
+
+def reserve_borrowing(
+        serializer: BaseSerializer, user
+) -> Optional[Borrowing]:
+    """
+    Take a copy of the book and save the borrowing in the
+    "awaiting payment" state in one short transaction.
+
+    The borrowing state of the user is locked first, so concurrent
+    requests of one user cannot exceed the limits it enforces.
+    Raises ValidationError if the user may not borrow and returns None
+    if no copy of the book is available.
+    """
+    book = serializer.validated_data["book"]
+    with transaction.atomic():
+        check_borrowing_allowed(lock_borrowing_state(user.id))
+        if not Book.objects.filter(id=book.id).take_copy():
+            return None
+        return serializer.save(
+            user=user,
+            status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+            reserved_until=(
+                timezone.now() + settings.BORROWING_RESERVATION_TIME
+            ),
+        )
+
+
+def confirm_borrowing(borrowing_id: int) -> bool:
+    """
+    Mark a reserved borrowing as active once its payment is completed.
+    """
+    return bool(
+        Borrowing.objects.filter(
+            pk=borrowing_id,
+            status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+        ).update(
+            status=Borrowing.BorrowingStatus.ACTIVE,
+            reserved_until=None,
+        )
+    )
+
+
+def reinstate_borrowing(borrowing_id: int) -> bool:
+    """
+    Make a borrowing cancelled for lack of payment active again once
+    its payment arrived late, if a copy of the book is still available.
+
+    Call it in the transaction marking the payment as paid, after
+    locking the borrowing state of the user.
+    """
+    with transaction.atomic():
+        borrowing = (
+            Borrowing.objects.select_for_update()
+            .filter(
+                pk=borrowing_id, status=Borrowing.BorrowingStatus.CANCELLED
+            )
+            .first()
+        )
+        if borrowing is None:
+            return False
+        if not Book.objects.filter(id=borrowing.book_id).take_copy():
+            return False
+        Borrowing.objects.filter(pk=borrowing_id).update(
+            status=Borrowing.BorrowingStatus.ACTIVE,
+            actual_return_date=None,
+            reserved_until=None,
+        )
+    return True
+
+
+def release_reservation(borrowing: Borrowing) -> bool:
+    """
+    Cancel a borrowing that is still awaiting payment
+    and put its copy back into the inventory.
+    """
+    with transaction.atomic():
+        released = Borrowing.objects.filter(
+            pk=borrowing.pk,
+            status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+            actual_return_date__isnull=True,
+        ).update(
+            status=Borrowing.BorrowingStatus.CANCELLED,
+            actual_return_date=timezone.now().date(),
+            reserved_until=None,
+        )
+        if released:
+            refresh_borrowing_state(borrowing.user_id)
+            Book.objects.filter(id=borrowing.book_id).return_copy()
+    return bool(released)
+
+
+def release_expired_reservations() -> int:
+    """
+    Release the reservations whose checkout session was never completed.
+    """
+    expired = Borrowing.objects.filter(
+        status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+        actual_return_date__isnull=True,
+        reserved_until__lt=timezone.now(),
+    ).only("id", "book_id", "user_id")
+    return sum(release_reservation(borrowing) for borrowing in expired)
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import Borrowing
-from botSend import send_message
+from .services import refresh_borrowing_state, release_reservation
+from notification.dispatcher import notify
+from payment.models import Payment
+from payment.signals import payment_expired
 
 
 @receiver(
@@ -13,7 +16,7 @@ def send_telegram_message_on_borrowing_creation(
         sender, instance, created, **kwargs
 ):
     """
-    Sends a Telegram message when a new Borrowing instance is created.
+    Sends a Telegram message once a new Borrowing instance is committed.
     """
     if created:
         message = (f"✅ Created new borrowing:\n"
@@ -21,4 +24,58 @@ def send_telegram_message_on_borrowing_creation(
                    f"User {instance.user}:\n"
                    f"Book: {instance.book}\n"
                    f"({instance.borrow_date})")
-        send_message(message)
+        notify(message, event="New borrowings", item=instance.book)
+
+
+@receiver(
+    payment_expired,
+    dispatch_uid="release_reservation_on_payment_expiry",
+)
+def release_reservation_on_payment_expiry(sender, payment, **kwargs):
+    """
+    Puts the reserved copy back into the inventory as soon as
+    the checkout session of a borrowing expires unpaid.
+    """
+    if payment.payment_type == sender.PaymentType.PAYMENT:
+        release_reservation(payment.borrowing_id)
+
+
+@receiver(
+    post_save, sender=Borrowing, dispatch_uid="count_new_borrowing"
+)
+@receiver(
+    post_save, sender=Payment, dispatch_uid="count_new_payment"
+)
+def count_saved_borrowing_or_payment(
+        sender, instance, created, raw=False, **kwargs
+):
+    """
+    Refreshes the borrowing state of the user in the transaction that
+    creates a borrowing or a payment, or saves a change of the fields
+    the state counts (e.g. in the admin). Changes made with
+    ``QuerySet.update()`` are refreshed by the services making them.
+    """
+    if raw:
+        return
+    old_values = getattr(instance, "loaded_state_values", None)
+    new_values = instance.state_values()
+    instance.loaded_state_values = new_values
+    if not created and old_values is not None and old_values == new_values:
+        return
+    refresh_borrowing_state(instance.user_id)
+    if old_values is not None and old_values["user_id"] != instance.user_id:
+        refresh_borrowing_state(old_values["user_id"])
+
+
+@receiver(
+    post_delete, sender=Borrowing, dispatch_uid="uncount_borrowing"
+)
+@receiver(
+    post_delete, sender=Payment, dispatch_uid="uncount_payment"
+)
+def uncount_borrowing_or_payment(sender, instance, **kwargs):
+    """
+    Refreshes the borrowing state of the user once a borrowing
+    or a payment is deleted.
+    """
+    refresh_borrowing_state(instance.user_id, create=False)
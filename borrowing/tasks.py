@@ -1,9 +1,79 @@
-from datetime import datetime
+from datetime import date, timedelta
+from itertools import chain
+from typing import Iterable, Iterator
 
 from celery import shared_task
+from django.utils import timezone
 
+from borrowing.idempotency import purge_expired_keys
 from borrowing.models import Borrowing
-from botSend import send_report, send_message
+from borrowing.services import release_expired_reservations
+from botSend import send_report
+from notification.dispatcher import notify, notify_document
+
+REPORT_CHUNK_SIZE = 2000
+REPORT_FIELDS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "book__title",
+    "user__email",
+)
+
+
+def _active_borrowings(**filters) -> Iterator[tuple]:
+    """
+    Streams the report columns of active borrowings matching ``filters``
+    with a single joined query.
+    """
+    return (
+        Borrowing.objects.filter(actual_return_date__isnull=True, **filters)
+        .order_by("expected_return_date", "id")
+        .values_list(*REPORT_FIELDS)
+        .iterator(chunk_size=REPORT_CHUNK_SIZE)
+    )
+
+
+def _format_borrowing(
+        borrowing_id: int,
+        borrow_date: date,
+        expected_return_date: date,
+        book_title: str,
+        email: str,
+) -> str:
+    return (
+        f"Book: {book_title}"
+        f"\n    Borrowed on: {borrow_date.strftime('%Y-%m-%d')}"
+        f"\n    Due: {expected_return_date.strftime('%Y-%m-%d')}"
+        f"\n    Borrowing ID: {borrowing_id}"
+        f"\n    From: {email}"
+    )
+
+
+def _report_section(
+        title: str, borrowings: Iterable[tuple], indent: str = ""
+) -> Iterator[str]:
+    """Yields the title and numbered items of a non-empty section."""
+    for number, borrowing in enumerate(borrowings, 1):
+        if number == 1:
+            yield title
+        yield f"{indent}{number}. {_format_borrowing(*borrowing)}"
+
+
+def build_borrowing_report(today: date) -> Iterator[str]:
+    """
+    Yields the report lines of borrowings that are already overdue
+    and of those that are due tomorrow.
+    """
+    yield from _report_section(
+        "❌ Already expired:",
+        _active_borrowings(expected_return_date__lte=today),
+    )
+    yield from _report_section(
+        "📅 Will be expired soon:",
+        _active_borrowings(expected_return_date=today + timedelta(days=1)),
+        indent="\t",
+    )
 
 
 @shared_task
@@ -13,48 +83,34 @@ def get_borrowing_report():
     already expired.
     Sends a formatted message with the report details via Telegram.
     """
-    borrowings = Borrowing.objects.filter(actual_return_date=None)
-    will_be_expired_soon = []
-    already_expired = []
-
-    now = datetime.now().date()
-    for borrowing in borrowings:
-        book_title = borrowing.book.title
-        borrowing_date = borrowing.borrow_date.strftime("%Y-%m-%d")
-        expected_return_date = borrowing.expected_return_date.strftime(
-            "%Y-%m-%d")
-        borrowing_id = str(borrowing.id)
-        email = borrowing.user.email
-
-        days_until_due = (borrowing.expected_return_date - now).days
-
-        string = (
-            f"Book: {book_title}"
-            f"\n    Borrowed on: {borrowing_date}"
-            f"\n    Due: {expected_return_date}"
-            f"\n    Borrowing ID: {borrowing_id}"
-            f"\n    From: {email}"
+    today = timezone.localdate()
+    report_lines = build_borrowing_report(today)
+    first_line = next(report_lines, None)
+
+    if first_line is not None:
+        send_report(
+            chain([first_line], report_lines),
+            filename=f"borrowing_report_{today}.txt",
+            caption="Borrowing report",
+            send=notify,
+            send_file=notify_document,
         )
-        if days_until_due == 1:
-            will_be_expired_soon.append(string)
-        elif days_until_due <= 0:
-            already_expired.append(string)
-
-    report_lines = []
-
-    if already_expired:
-        if report_lines:
-            report_lines.append("")
-        report_lines.append("❌ Already expired:")
-        for i, item in enumerate(already_expired, 1):
-            report_lines.append(f"{i}. {item}")
-
-    if will_be_expired_soon:
-        report_lines.append("📅 Will be expired soon:")
-        for i, item in enumerate(will_be_expired_soon, 1):
-            report_lines.append(f"\t{i}. {item}")
-
-    if report_lines:
-        send_report(report_lines)
     else:
-        send_message("No borrowings are due soon or already expired.")
+        notify("No borrowings are due soon or already expired.")
+
+
+@shared_task
+def release_expired_borrowing_reservations():
+    """
+    Cancels borrowings whose checkout session was never completed
+    and puts their copies back into the inventory.
+    """
+    release_expired_reservations()
+
+
+@shared_task
+def purge_expired_idempotency_keys():
+    """
+    Deletes the stored responses of idempotency keys that have expired.
+    """
+    purge_expired_keys()
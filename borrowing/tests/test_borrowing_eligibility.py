@@ -0,0 +1,150 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from borrowing.models import Borrowing, UserBorrowingState
+from borrowing.tests.test_base import BaseBorrowingTest
+from payment.models import Payment
+from payment.services import expire_payment, mark_payment_paid
+
+
+class BorrowingEligibilityTests(BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("borrowing-list-create")
+        notify = patch("payment.services.notify")
+        notify.start()
+        self.addCleanup(notify.stop)
+
+    def borrow(self):
+        return self.client.post(
+            self.url,
+            {
+                "book": self.book.id,
+                "expected_return_date": (
+                    timezone.now() + timedelta(days=7)
+                ).date(),
+            },
+            format="json",
+        )
+
+    def assertState(self, outstanding_payments, active_borrowings):
+        state = UserBorrowingState.objects.get(pk=self.user.pk)
+        self.assertEqual(
+            (state.outstanding_payments, state.active_borrowings),
+            (outstanding_payments, active_borrowings),
+        )
+
+    def test_unpaid_borrowing_blocks_the_next_one(self):
+        self.assertEqual(self.borrow().status_code, status.HTTP_302_FOUND)
+        self.assertState(1, 1)
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pending payments", str(response.data))
+
+    def test_payment_allows_the_next_borrowing(self):
+        self.borrow()
+        mark_payment_paid(Payment.objects.get().session_id)
+        self.assertState(0, 1)
+
+        self.assertEqual(self.borrow().status_code, status.HTTP_302_FOUND)
+
+    def test_return_and_expiry_are_counted(self):
+        self.borrow()
+        payment = Payment.objects.get()
+        mark_payment_paid(payment.session_id)
+        borrowing = Borrowing.objects.get()
+
+        self.client.post(reverse("return-borrowing", args=[borrowing.pk]))
+        self.assertState(0, 0)
+
+        self.borrow()
+        Payment.objects.filter(status=Payment.PaymentStatus.PENDING).update(
+            session_expiry=timezone.now() - timedelta(minutes=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_payment(Payment.objects.latest("id").id)
+        # The reservation is released, which cancels the borrowing.
+        self.assertState(0, 0)
+
+    @override_settings(MAX_ACTIVE_BORROWINGS_PER_USER=1)
+    def test_active_borrowing_limit(self):
+        self.borrow()
+        mark_payment_paid(Payment.objects.get().session_id)
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("the limit is 1", str(response.data))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_blocked_user_cannot_borrow(self):
+        UserBorrowingState.objects.create(user=self.user, blocked=True)
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_payment_saved_as_paid_is_uncounted(self):
+        self.borrow()
+        payment = Payment.objects.get()
+
+        payment.status = Payment.PaymentStatus.PAID
+        payment.save()
+
+        self.assertState(0, 1)
+        self.assertEqual(self.borrow().status_code, status.HTTP_302_FOUND)
+
+    def test_borrowing_saved_as_returned_is_uncounted(self):
+        self.borrow()
+        mark_payment_paid(Payment.objects.get().session_id)
+        borrowing = Borrowing.objects.get()
+
+        borrowing.actual_return_date = timezone.now().date()
+        borrowing.save()
+
+        self.assertState(0, 0)
+
+    def test_unchanged_save_keeps_the_state(self):
+        self.borrow()
+        payment = Payment.objects.get()
+        UserBorrowingState.objects.update(outstanding_payments=5)
+
+        payment.session_url = "https://checkout.test/2"
+        payment.save()
+
+        self.assertState(5, 1)
+
+    def test_payment_moved_to_another_user_is_recounted(self):
+        self.borrow()
+        payment = Payment.objects.get()
+
+        payment.user = self.admin
+        payment.save()
+
+        self.assertState(0, 1)
+        state = UserBorrowingState.objects.get(pk=self.admin.pk)
+        self.assertEqual(state.outstanding_payments, 1)
+
+    def test_deleted_payment_is_uncounted(self):
+        self.borrow()
+
+        Payment.objects.get().delete()
+
+        self.assertState(0, 1)
+
+    def test_deleting_user_keeps_no_state(self):
+        self.borrow()
+
+        self.user.delete()
+
+        self.assertFalse(UserBorrowingState.objects.exists())
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from book.inventory import enable_sharding
+from borrowing.models import Borrowing
+from borrowing.tests.test_base import BaseBorrowingTest
+from library_service.testing import QueryCountTestMixin
+from payment.models import Payment
+
+
+class BorrowingQueryCountTests(QueryCountTestMixin, BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.borrowings = [
+            Borrowing.objects.create(
+                book=self.book,
+                user=self.user,
+                expected_return_date=(
+                    timezone.now() + timedelta(days=days)
+                ).date(),
+            )
+            for days in range(1, 7)
+        ]
+        for borrowing in self.borrowings:
+            for payment_type in Payment.PaymentType.values:
+                Payment.objects.create(
+                    payment_type=payment_type,
+                    borrowing_id=borrowing,
+                    money_to_pay_cents=100,
+                )
+        self.list_url = reverse("borrowing-list-create")
+
+    def test_list_as_user(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryCountIndependentOfPageSize(self.list_url)
+
+    def test_list_as_admin(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryCountIndependentOfPageSize(
+            self.list_url, params={"is_active": "true"}
+        )
+
+    def test_list_shows_book_title(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data["results"][0]["book"], "Test Book")
+
+    def test_detail_fetches_book_and_payments_in_one_query_each(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("borrowing-detail", args=[self.borrowings[0].id])
+            )
+        self.assertEqual(len(response.data["payments"]), 2)
+        self.assertEqual(response.data["book"]["title"], "Test Book")
+        self.assertEqual(response.data["user"]["email"], "user@user.com")
+
+    def test_detail_reads_sharded_inventory_with_the_book(self):
+        enable_sharding(self.book, shards=2)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("borrowing-detail", args=[self.borrowings[0].id])
+            )
+        self.assertEqual(response.data["book"]["inventory"], 3)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from borrowing.models import Borrowing
+from borrowing.tasks import get_borrowing_report
+from borrowing.tests.test_base import BaseBorrowingTest
+
+
+class BorrowingReportTests(BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def create_borrowing(self, days: int, **kwargs) -> Borrowing:
+        return Borrowing.objects.create(
+            book=self.book,
+            user=self.user,
+            expected_return_date=self.today + timedelta(days=days),
+            **kwargs
+        )
+
+    def run_report(self) -> list:
+        sent = []
+        with patch(
+            "borrowing.tasks.send_report",
+            side_effect=lambda lines, **kwargs: sent.extend(lines),
+        ), patch("borrowing.tasks.notify") as notify:
+            get_borrowing_report()
+        if notify.called:
+            sent.append(notify.call_args.args[0])
+        return sent
+
+    def test_report_sections(self):
+        overdue = self.create_borrowing(-2)
+        due_today = self.create_borrowing(0)
+        due_tomorrow = self.create_borrowing(1)
+        self.create_borrowing(2)
+        self.create_borrowing(-1, actual_return_date=self.today)
+
+        lines = self.run_report()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0], "❌ Already expired:")
+        self.assertTrue(lines[1].startswith("1. Book: Test Book"))
+        self.assertIn(f"Borrowing ID: {overdue.id}", lines[1])
+        self.assertIn("From: user@user.com", lines[1])
+        self.assertIn(f"Borrowing ID: {due_today.id}", lines[2])
+        self.assertEqual(lines[3], "📅 Will be expired soon:")
+        self.assertTrue(lines[4].startswith("\t1. Book: Test Book"))
+        self.assertIn(f"Borrowing ID: {due_tomorrow.id}", lines[4])
+
+    def test_report_omits_empty_section(self):
+        self.create_borrowing(1)
+        lines = self.run_report()
+        self.assertEqual(lines[0], "📅 Will be expired soon:")
+        self.assertEqual(len(lines), 2)
+
+    def test_empty_report(self):
+        self.create_borrowing(5)
+        self.assertEqual(
+            self.run_report(),
+            ["No borrowings are due soon or already expired."],
+        )
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for days in (-3, -2, -1, 0, 1, 1, 1):
+            self.create_borrowing(days)
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.run_report()
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(len(queries), 2)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from borrowing.models import Borrowing
+from borrowing.services import confirm_borrowing, release_expired_reservations
+from borrowing.tests.test_base import BaseBorrowingTest
+
+
+class BorrowingReservationTests(BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.data = {
+            "book": self.book.id,
+            "expected_return_date": (timezone.now() + timedelta(days=7)).date()
+        }
+
+    def create_borrowing(self, session):
+        with patch(
+            "borrowing.views.create_stripe_session_for_borrowing",
+            return_value=session,
+        ):
+            return self.client.post(
+                reverse("borrowing-list-create"), self.data, format="json"
+            )
+
+    def test_borrowing_awaits_payment(self):
+        self.create_borrowing(SimpleNamespace(url="https://checkout.test/1"))
+        borrowing = Borrowing.objects.get()
+        self.assertEqual(
+            borrowing.status, Borrowing.BorrowingStatus.AWAITING_PAYMENT
+        )
+        self.assertGreater(borrowing.reserved_until, timezone.now())
+
+    def test_failed_session_releases_reservation(self):
+        response = self.create_borrowing(None)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            Borrowing.objects.get().status,
+            Borrowing.BorrowingStatus.CANCELLED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 3)
+
+    def test_expired_reservation_is_released(self):
+        self.create_borrowing(SimpleNamespace(url="https://checkout.test/1"))
+        Borrowing.objects.update(
+            reserved_until=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(release_expired_reservations(), 0)
+
+        borrowing = Borrowing.objects.get()
+        self.assertEqual(borrowing.status, Borrowing.BorrowingStatus.CANCELLED)
+        self.assertIsNotNone(borrowing.actual_return_date)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 3)
+
+    def test_confirmed_borrowing_is_not_released(self):
+        self.create_borrowing(SimpleNamespace(url="https://checkout.test/1"))
+        borrowing = Borrowing.objects.get()
+        confirm_borrowing(borrowing.id)
+        Borrowing.objects.update(
+            reserved_until=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(release_expired_reservations(), 0)
+        borrowing.refresh_from_db()
+        self.assertEqual(borrowing.status, Borrowing.BorrowingStatus.ACTIVE)
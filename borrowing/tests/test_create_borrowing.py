@@ -1,9 +1,13 @@
 from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
 
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
+from book.models import Book
 from borrowing.tests.test_base import BaseBorrowingTest
 
 
@@ -35,3 +39,44 @@ class CreateBorrowingTests(BaseBorrowingTest):
         }
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_borrowing_takes_one_copy(self):
+        data = {
+            "book": self.book.id,
+            "expected_return_date": (timezone.now() + timedelta(days=7)).date()
+        }
+        with patch(
+            "borrowing.views.create_stripe_session_for_borrowing",
+            return_value=SimpleNamespace(url="https://checkout.test/1"),
+        ):
+            self.client.post(self.url, data, format="json")
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_create_borrowing_restores_copy_on_payment_error(self):
+        data = {
+            "book": self.book.id,
+            "expected_return_date": (timezone.now() + timedelta(days=7)).date()
+        }
+        with patch(
+            "borrowing.views.create_stripe_session_for_borrowing",
+            return_value=None,
+        ):
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 3)
+
+
+class BookInventoryTests(BaseBorrowingTest):
+    def test_take_copy_stops_at_zero(self):
+        books = Book.objects.filter(id=self.book.id)
+        self.assertEqual(
+            [books.take_copy() for _ in range(4)], [True, True, True, False]
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_inventory_cannot_be_negative(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Book.objects.filter(id=self.book.id).update(inventory=-1)
@@ -0,0 +1,182 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from borrowing.idempotency import purge_expired_keys
+from borrowing.models import Borrowing, IdempotencyKey
+from borrowing.tests.test_base import BaseBorrowingTest
+
+
+class IdempotencyKeyTests(BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.data = {
+            "book": self.book.id,
+            "expected_return_date": (timezone.now() + timedelta(days=7)).date()
+        }
+        session = patch(
+            "borrowing.views.create_stripe_session_for_borrowing",
+            return_value=SimpleNamespace(url="https://checkout.test/1"),
+        )
+        self.create_session = session.start()
+        self.addCleanup(session.stop)
+
+    def create_borrowing(self, key="key-1", data=None):
+        return self.client.post(
+            reverse("borrowing-list-create"),
+            data or self.data,
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.create_borrowing()
+        retry = self.create_borrowing()
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry["Location"], "https://checkout.test/1")
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.assertEqual(self.create_session.call_count, 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_different_keys_are_separate_requests(self):
+        self.create_borrowing("key-1")
+        self.create_borrowing("key-2")
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+    def test_key_reused_with_different_body(self):
+        self.create_borrowing()
+        response = self.create_borrowing(
+            data={**self.data, "expected_return_date": "2999-01-01"}
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    def test_retry_while_in_progress(self):
+        IdempotencyKey.objects.create(
+            user=self.user,
+            key="key-1",
+            scope="borrowing-create",
+            request_hash="",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with patch(
+            "borrowing.idempotency.request_fingerprint", return_value=""
+        ):
+            response = self.create_borrowing()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_abandoned_key_is_taken_over(self):
+        IdempotencyKey.objects.create(
+            user=self.user,
+            key="key-1",
+            scope="borrowing-create",
+            request_hash="",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        response = self.create_borrowing()
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_lock_timeout_outlasts_a_retried_checkout(self):
+        checkout = settings.PAYMENT_RETRY_ATTEMPTS * (
+            settings.STRIPE_CONNECT_TIMEOUT
+            + settings.STRIPE_READ_TIMEOUT
+            + settings.PAYMENT_RETRY_MAX_DELAY
+        )
+        self.assertGreater(
+            settings.IDEMPOTENCY_KEY_LOCK_TIMEOUT.total_seconds(),
+            2 * checkout,
+        )
+
+    def test_slow_request_whose_key_was_taken_over_completes(self):
+        def take_over_key(*args, **kwargs):
+            # The key is replaced by a retry while the checkout runs.
+            IdempotencyKey.objects.all().delete()
+            IdempotencyKey.objects.create(
+                user=self.user,
+                key="key-1",
+                scope="borrowing-create",
+                request_hash="",
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+            return SimpleNamespace(url="https://checkout.test/1")
+
+        self.create_session.side_effect = take_over_key
+        response = self.create_borrowing()
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.assertIsNone(IdempotencyKey.objects.get().status_code)
+
+    def test_key_purged_after_conflict_is_claimed_again(self):
+        create = IdempotencyKey.objects.create
+        calls = []
+
+        def create_after_purge(**kwargs):
+            # The first insert conflicts with a key that is purged
+            # before it can be read back.
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise IntegrityError("duplicate key")
+            return create(**kwargs)
+
+        with patch.object(
+            IdempotencyKey.objects, "create", side_effect=create_after_purge
+        ):
+            response = self.create_borrowing()
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(IdempotencyKey.objects.get().key, "key-1")
+
+    def test_failed_response_is_not_stored(self):
+        self.create_session.return_value = None
+        response = self.create_borrowing()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.create_session.return_value = SimpleNamespace(
+            url="https://checkout.test/2"
+        )
+        response = self.create_borrowing()
+        self.assertEqual(response["Location"], "https://checkout.test/2")
+
+    def test_return_is_replayed(self):
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=self.data["expected_return_date"],
+        )
+        url = reverse("return-borrowing", kwargs={"pk": borrowing.pk})
+
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY="return-1")
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY="return-1")
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 4)
+
+    def test_expired_keys_are_purged(self):
+        self.create_borrowing()
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(purge_expired_keys(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
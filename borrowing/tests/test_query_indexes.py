@@ -0,0 +1,34 @@
+from django.utils import timezone
+
+from borrowing.models import Borrowing
+from borrowing.tests.test_base import BaseBorrowingTest
+from library_service.testing import QueryPlanTestMixin
+
+
+class BorrowingQueryIndexTests(QueryPlanTestMixin, BaseBorrowingTest):
+    def test_active_borrowings_of_user(self):
+        self.assertIndexUsed(
+            Borrowing.objects.filter(
+                user=self.user, actual_return_date__isnull=True
+            ),
+            "borrowing_user_returned_idx",
+        )
+
+    def test_overdue_borrowings(self):
+        self.assertIndexUsed(
+            Borrowing.objects.filter(
+                actual_return_date__isnull=True,
+                expected_return_date__lte=timezone.now().date(),
+            ),
+            "borrowing_active_due_idx",
+        )
+
+    def test_expired_reservations(self):
+        self.assertIndexUsed(
+            Borrowing.objects.filter(
+                status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+                actual_return_date__isnull=True,
+                reserved_until__lt=timezone.now(),
+            ),
+            "borrowing_status_reserved_idx",
+        )
@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+import botSend
+from botSend import chunk_report, message_length, send_report
+
+
+class ReportDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        sleep = patch("botSend.time.sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_chunks_fit_limit_and_keep_items_whole(self):
+        lines = [f"{i}. " + "x" * 50 for i in range(300)]
+        chunks = list(chunk_report(lines))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(message_length(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual("\n".join(chunks).split("\n"), lines)
+
+    def test_long_item_is_split_on_line_breaks(self):
+        line = "\n".join(["y" * 100] * 100)
+        chunks = list(chunk_report(["header", line], limit=1000))
+
+        self.assertTrue(all(message_length(chunk) <= 1000 for chunk in chunks))
+        self.assertEqual("\n".join(chunks), f"header\n{line}")
+
+    def test_limit_counts_utf16_units(self):
+        chunks = list(chunk_report(["📅" * 3000]))
+        self.assertEqual(
+            [message_length(chunk) for chunk in chunks], [4096, 1904]
+        )
+
+    def test_messages_are_sent_in_order_with_pacing(self):
+        lines = [f"{i}. " + "x" * 100 for i in range(100)]
+        with patch("botSend.send_message") as send_message:
+            send_report(iter(lines))
+
+        messages = [call.args[0] for call in send_message.call_args_list]
+        self.assertEqual(len(messages), 3)
+        self.assertEqual("\n".join(messages).split("\n"), lines)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_messages_can_be_handed_to_a_queue(self):
+        lines = [f"{i}. " + "x" * 100 for i in range(100)]
+        queued = []
+        with patch("botSend.send_message") as send_message:
+            send_report(iter(lines), send=queued.append)
+
+        send_message.assert_not_called()
+        self.sleep.assert_not_called()
+        self.assertEqual(len(queued), 3)
+        self.assertEqual("\n".join(queued).split("\n"), lines)
+
+    def test_large_report_is_sent_as_document(self):
+        lines = [f"{i}. " + "x" * 100 for i in range(1000)]
+        documents = []
+
+        def read_document(document, filename, caption):
+            documents.append((document.read().decode(), filename, caption))
+
+        with patch("botSend.send_message") as send_message, patch(
+            "botSend.send_document", side_effect=read_document
+        ), patch.object(botSend, "TG_REPORT_DOCUMENT_THRESHOLD", 10000):
+            send_report(iter(lines), filename="report.txt", caption="Report")
+
+        send_message.assert_not_called()
+        self.assertEqual(
+            documents, [("\n".join(lines), "report.txt", "Report")]
+        )
+
+    def test_report_larger_than_a_document_is_split_into_parts(self):
+        lines = [f"{i}. " + "x" * 100 for i in range(1000)]
+        documents = []
+
+        def read_document(document, filename, caption):
+            documents.append((document.read().decode(), filename, caption))
+
+        with patch(
+            "botSend.send_document", side_effect=read_document
+        ), patch.object(
+            botSend, "TG_REPORT_DOCUMENT_THRESHOLD", 10000
+        ), patch.object(botSend, "TG_DOCUMENT_LIMIT", 50000):
+            send_report(iter(lines), filename="report.txt", caption="Report")
+
+        self.assertEqual(
+            [filename for _, filename, _ in documents],
+            ["report_part1.txt", "report_part2.txt", "report_part3.txt"],
+        )
+        self.assertTrue(
+            all(len(content.encode()) <= 50000 for content, _, _ in documents)
+        )
+        self.assertEqual(
+            "\n".join(content for content, _, _ in documents).split("\n"),
+            lines,
+        )
+
+    def test_large_report_can_be_handed_to_a_queue(self):
+        lines = [f"{i}. " + "x" * 100 for i in range(1000)]
+        documents = []
+
+        def read_document(document, filename, caption):
+            documents.append((document.read().decode(), filename, caption))
+
+        with patch("botSend.send_document") as send_document, patch.object(
+            botSend, "TG_REPORT_DOCUMENT_THRESHOLD", 10000
+        ):
+            send_report(
+                iter(lines),
+                filename="report.txt",
+                caption="Report",
+                send=lambda message: None,
+                send_file=read_document,
+            )
+
+        send_document.assert_not_called()
+        self.assertEqual(
+            documents, [("\n".join(lines), "report.txt", "Report")]
+        )
@@ -1,11 +1,13 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
-from borrowing.models import Borrowing
+from borrowing.models import Borrowing, UserBorrowingState
 from borrowing.tests.test_base import BaseBorrowingTest
+from payment.models import Payment
 
 
 class ReturnBorrowingTests(BaseBorrowingTest):
@@ -39,3 +41,98 @@ class ReturnBorrowingTests(BaseBorrowingTest):
             response.status_code,
             status.HTTP_400_BAD_REQUEST
         )
+
+    def test_double_return_is_noop(self):
+        url = reverse("return-borrowing", kwargs={"pk": self.borrowing.pk})
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 4)
+
+
+class LateReturnTests(BaseBorrowingTest):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        today = timezone.now().date()
+        self.borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book,
+            borrow_date=today - timedelta(days=10),
+            expected_return_date=today - timedelta(days=2),
+        )
+        self.url = reverse(
+            "return-borrowing", kwargs={"pk": self.borrowing.pk}
+        )
+
+    def test_fine_is_paid_through_checkout(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        fine = Payment.objects.get(borrowing_id=self.borrowing)
+        self.assertEqual(fine.payment_type, Payment.PaymentType.FINE)
+        self.assertEqual(fine.session_url, response["Location"])
+
+    def test_fine_is_kept_when_no_session_can_be_created(self):
+        with patch(
+            "borrowing.views.start_payment_session", return_value=None
+        ):
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        fine = Payment.objects.get(borrowing_id=self.borrowing)
+        self.assertEqual(fine.status, Payment.PaymentStatus.PENDING)
+        self.assertIsNone(fine.session_id)
+        self.assertGreater(fine.money_to_pay_cents, 0)
+        self.assertEqual(
+            response.data["fine_session_url"],
+            reverse("payment:payment-session", args=[fine.pk]),
+        )
+        state = UserBorrowingState.objects.get(user=self.user)
+        self.assertEqual(state.outstanding_payments, 1)
+
+        response = self.client.post(response.data["fine_session_url"])
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        fine.refresh_from_db()
+        self.assertEqual(fine.session_url, response["Location"])
+
+    def test_expired_fine_gets_a_new_session(self):
+        self.client.post(self.url)
+        fine = Payment.objects.get(borrowing_id=self.borrowing)
+        Payment.objects.filter(pk=fine.pk).update(
+            status=Payment.PaymentStatus.EXPIRED
+        )
+
+        response = self.client.post(
+            reverse("payment:payment-session", args=[fine.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        fine.refresh_from_db()
+        self.assertEqual(fine.status, Payment.PaymentStatus.PENDING)
+        self.assertEqual(fine.session_url, response["Location"])
+
+    def test_open_session_is_not_replaced(self):
+        self.client.post(self.url)
+        fine = Payment.objects.get(borrowing_id=self.borrowing)
+
+        response = self.client.post(
+            reverse("payment:payment-session", args=[fine.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_fine_is_not_found(self):
+        with patch(
+            "borrowing.views.start_payment_session", return_value=None
+        ):
+            response = self.client.post(self.url)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(response.data["fine_session_url"])
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,14 +1,15 @@
-from django.db import transaction, IntegrityError
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import redirect
+from django.urls import reverse
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
-from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from borrowing.idempotency import idempotent
 from borrowing.models import Borrowing, Book
 from borrowing.permissions import IsAdminOrOwner
 from borrowing.schemas import (
@@ -21,9 +22,19 @@ from borrowing.serializers import (
     BorrowingCreateSerializer,
     BorrowingDetailSerializer,
 )
+from borrowing.services import (
+    refresh_borrowing_state,
+    release_reservation,
+    reserve_borrowing,
+)
+from payment.exceptions import PaymentsUnavailable
 from payment.models import Payment
 from payment.payment_calculator import calculate_total_price, calculate_fine
-from payment.services import create_stripe_session_for_borrowing
+from payment.services import (
+    create_stripe_session_for_borrowing,
+    record_fine,
+    start_payment_session,
+)
 
 
 @borrowing_list_create_view_schema
@@ -68,74 +79,66 @@ class BorrowingListCreateAPIView(generics.ListCreateAPIView):
             return BorrowingCreateSerializer
         return self.serializer_class
 
+    @idempotent("borrowing-create")
     def create(self, request: Request, *args, **kwargs) -> Response:
         """
         Handle the creation of a new borrowing record.
         """
-        if Payment.objects.filter(
-            Q(status=Payment.PaymentStatus.PENDING)
-            | Q(status=Payment.PaymentStatus.EXPIRED),
-            borrowing_id__user=request.user,
-        ).exists():
-            raise ValidationError(
-                "User has pending payments and cannot borrow new books."
-            )
-
         book_id = request.data.get("book")
-        try:
-            book = Book.objects.get(id=book_id)
-        except Book.DoesNotExist:
+        if not Book.objects.filter(id=book_id).exists():
             return Response(
                 {"error": "Book not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if book.inventory < 1:
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        borrowing = reserve_borrowing(serializer, request.user)
+        if borrowing is None:
             return Response(
                 {"error": "Book is not available"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        try:
-            with transaction.atomic():
-                book.inventory -= 1
-                book.save()
-
-                serializer = self.get_serializer(data=request.data)
-                serializer.is_valid(raise_exception=True)
-                borrowing = serializer.save(user=request.user)
-
-                total_price = calculate_total_price(borrowing)
-                payment_type = Payment.PaymentType.PAYMENT
-
-                session = create_stripe_session_for_borrowing(
-                    borrowing, request, total_price, payment_type
-                )
-
-                if not session:
-                    raise IntegrityError("Error creating payment session")
+        total_price_cents = calculate_total_price(borrowing)
+        payment_type = Payment.PaymentType.PAYMENT
 
-                return redirect(session.url, code=303)
+        try:
+            session = create_stripe_session_for_borrowing(
+                borrowing, request, total_price_cents, payment_type
+            )
+        except PaymentsUnavailable:
+            release_reservation(borrowing)
+            raise
 
-        except IntegrityError as e:
+        if not session:
+            release_reservation(borrowing)
             return Response(
-                {"error": str(e)},
+                {"error": "Error creating payment session"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        return redirect(session.url, code=303)
+
 
 @borrowing_detail_view_schema
 class BorrowingDetailAPIView(generics.RetrieveAPIView):
     """
     API view to retrieve details of a specific borrowing.
     """
-    queryset = Borrowing.objects.select_related("user", "book")
+    queryset = Borrowing.objects.select_related("user").prefetch_related(
+        # The book with its shard inventory, as in the book list.
+        Prefetch("book", queryset=Book.objects.with_available_inventory()),
+        "payments",
+    )
     serializer_class = BorrowingDetailSerializer
     permission_classes = (IsAuthenticated, IsAdminOrOwner)
 
 
 @api_view(["POST", "GET"])
 @return_borrowing_schema
+@idempotent("borrowing-return")
 def return_borrowing(request: Request, pk: int) -> Response:
     """
     Handle the return of a borrowed book.
@@ -148,36 +151,51 @@ def return_borrowing(request: Request, pk: int) -> Response:
             status=status.HTTP_404_NOT_FOUND
         )
 
-    if borrowing.actual_return_date is not None:
-        return Response(
-            {"error": "Borrowing already returned"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    with transaction.atomic():
+        return_date = timezone.now().date()
+        returned = Borrowing.objects.filter(
+            pk=pk, actual_return_date__isnull=True
+        ).update(actual_return_date=return_date)
+        if not returned:
+            return Response(
+                {"error": "Borrowing already returned"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    try:
-        with transaction.atomic():
-            borrowing.actual_return_date = timezone.now().date()
-            borrowing.save()
-
-            book = borrowing.book
-            book.inventory += 1
-            book.save()
-
-            if borrowing.expected_return_date < borrowing.actual_return_date:
-                fine_amount = calculate_fine(borrowing)
-                payment_type = Payment.PaymentType.FINE
-                session = create_stripe_session_for_borrowing(
-                    borrowing, request, fine_amount, payment_type
-                )
-                if session:
-                    return redirect(session.url, code=303)
-                raise IntegrityError("Error creating payment session for fine")
-        return Response(
-            {"status": "Return date set and inventory updated"},
-            status=status.HTTP_200_OK,
-        )
-    except IntegrityError as e:
+        borrowing.actual_return_date = return_date
+        fine = None
+        if borrowing.expected_return_date < return_date:
+            # Owed from now on, even if no checkout session
+            # can be created for it below.
+            fine = record_fine(borrowing, calculate_fine(borrowing))
+        refresh_borrowing_state(borrowing.user_id)
+        Book.objects.filter(id=borrowing.book_id).return_copy()
+
+    if fine is not None:
+        retry_url = reverse("payment:payment-session", args=[fine.pk])
+        try:
+            session = start_payment_session(fine, request)
+        except PaymentsUnavailable:
+            return Response(
+                {
+                    "error": "Book returned, but payments are "
+                             "temporarily unavailable to pay the fine",
+                    "fine_session_url": retry_url,
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if session:
+            return redirect(session.url, code=303)
         return Response(
-            {"error": str(e)},
+            {
+                "error": "Book returned, but error creating "
+                         "payment session for fine",
+                "fine_session_url": retry_url,
+            },
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    return Response(
+        {"status": "Return date set and inventory updated"},
+        status=status.HTTP_200_OK,
+    )
@@ -1,23 +1,261 @@
+import os
+import time
+from functools import lru_cache
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Iterable, Iterator
+
 import requests
 from decouple import config
+from requests.adapters import HTTPAdapter
 
 TG_BOT_TOKEN = config("TG_TOKEN")
+TG_CHAT_ID = config("YOUR_CHAT_ID", cast=int)
+TG_API_URL = f"https://api.telegram.org/bot{TG_BOT_TOKEN}"
+# Seconds to wait for a connection to and a response from Telegram.
+TG_CONNECT_TIMEOUT = config("TG_CONNECT_TIMEOUT", default=3.0, cast=float)
+TG_READ_TIMEOUT = config("TG_READ_TIMEOUT", default=10.0, cast=float)
+
+# Telegram rejects text messages longer than 4096 characters,
+# counted in UTF-16 code units.
+TG_MESSAGE_LIMIT = 4096
+# Reports longer than this are sent as a text document.
+TG_REPORT_DOCUMENT_THRESHOLD = config(
+    "TG_REPORT_DOCUMENT_THRESHOLD", default=5 * TG_MESSAGE_LIMIT, cast=int
+)
+# Bots may upload documents of up to 50 MB, larger reports are sent
+# as several numbered documents.
+TG_DOCUMENT_LIMIT = 50 * 1000 * 1000
+# Pause between the messages of a report, Telegram allows
+# about one message per second in a chat.
+TG_SEND_INTERVAL = config("TG_SEND_INTERVAL", default=1.0, cast=float)
+
+
+class TelegramError(Exception):
+    """
+    A Telegram API call failed. ``retryable`` errors (network errors,
+    rate limits and server errors) may succeed later, after
+    ``retry_after`` seconds when Telegram says so.
+
+    The message never contains the request URL, which holds the token.
+    """
+
+    def __init__(
+            self,
+            message: str,
+            retryable: bool = False,
+            retry_after: float = None,
+    ):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+@lru_cache(maxsize=None)
+def get_session() -> requests.Session:
+    """
+    One pooled HTTP session per process, created on first use so that
+    forked worker processes do not share connections.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=4))
+    return session
+
+
+def _call(method: str, data: dict, files: dict = None) -> dict:
+    """Calls a Bot API method and returns its result."""
+    try:
+        response = get_session().post(
+            f"{TG_API_URL}/{method}",
+            data=data,
+            files=files,
+            timeout=(TG_CONNECT_TIMEOUT, TG_READ_TIMEOUT),
+        )
+    except requests.RequestException as exc:
+        raise TelegramError(
+            f"Telegram {method} failed: {type(exc).__name__}",
+            retryable=True,
+        ) from None
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if response.ok and body.get("ok", True):
+        return body.get("result")
+    retry_after = (body.get("parameters") or {}).get("retry_after")
+    raise TelegramError(
+        f"Telegram {method} failed with {response.status_code}: "
+        f"{body.get('description', response.reason)}",
+        retryable=response.status_code == 429 or response.status_code >= 500,
+        retry_after=retry_after,
+    )
+
+
+def send_message(message: str, chat_id: int = TG_CHAT_ID):
+    """
+    Sends a message to a Telegram chat, the staff chat by default.
+
+    Raises TelegramError if the message could not be sent.
+    """
+    return _call("sendMessage", {"chat_id": chat_id, "text": message})
+
+
+def send_document(
+        document, filename: str, caption: str = "", chat_id: int = TG_CHAT_ID
+):
+    """
+    Sends a file object as a document to a Telegram chat,
+    the staff chat by default.
+    """
+    return _call(
+        "sendDocument",
+        {"chat_id": chat_id, "caption": caption},
+        files={"document": (filename, document)},
+    )
+
+
+def message_length(text: str) -> int:
+    """Length of the text as counted by Telegram."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def split_text(text: str, limit: int = TG_MESSAGE_LIMIT) -> Iterator[str]:
+    """
+    Splits a text that does not fit into one message,
+    preferring line breaks as split points.
+    """
+    while message_length(text) > limit:
+        end = limit
+        while message_length(text[:end]) > limit:
+            end -= 1
+        split_at = text.rfind("\n", 0, end)
+        if split_at <= 0:
+            split_at = end
+        yield text[:split_at]
+        text = text[split_at:].lstrip("\n")
+    if text:
+        yield text
 
 
-def send_message(message: str):
+def chunk_report(
+        report_lines: Iterable[str], limit: int = TG_MESSAGE_LIMIT
+) -> Iterator[str]:
     """
-    Sends a message to a specified Telegram chat
-    using the bot token and chat ID.
+    Packs report lines into messages of at most ``limit`` characters.
+
+    Messages are only split between lines, a single line longer
+    than ``limit`` is split on its own line breaks.
     """
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage"
-    data = {"chat_id": config("YOUR_CHAT_ID", cast=int), "text": message}
-    requests.post(url, data=data)
+    chunk = []
+    chunk_length = 0
+    for line in report_lines:
+        for part in split_text(line, limit):
+            part_length = message_length(part)
+            if chunk and chunk_length + 1 + part_length > limit:
+                yield "\n".join(chunk)
+                chunk = []
+                chunk_length = 0
+            chunk_length += part_length + (1 if chunk else 0)
+            chunk.append(part)
+    if chunk:
+        yield "\n".join(chunk)
 
 
-def send_report(report_lines: list):
+def send_report(
+        report_lines: Iterable[str],
+        filename: str = "report.txt",
+        caption: str = "",
+        send: Callable[[str], Any] = None,
+        send_file: Callable[[Any, str, str], Any] = None,
+):
     """
-    Sends a report by joining a list of report lines into
-    a single message and sending it via Telegram.
+    Sends a report via Telegram.
+
+    The lines are packed into messages that fit the Telegram limit and
+    sent in order with a pause between them. Once the report grows past
+    TG_REPORT_DOCUMENT_THRESHOLD it is written to temporary files and
+    sent as documents instead, one per TG_DOCUMENT_LIMIT bytes.
+
+    When ``send`` and ``send_file`` are given the messages or the
+    document are handed to them instead, without pauses, e.g. to queue
+    them behind a rate limiter.
     """
-    message = "\n".join(report_lines)
-    send_message(message)
+    messages = []
+    report_length = 0
+    chunks = chunk_report(report_lines)
+    for chunk in chunks:
+        messages.append(chunk)
+        report_length += message_length(chunk)
+        if report_length > TG_REPORT_DOCUMENT_THRESHOLD:
+            _send_report_document(
+                messages, chunks, filename, caption, send_file
+            )
+            return
+
+    if send is not None:
+        for message in messages:
+            send(message)
+        return
+    for number, message in enumerate(messages):
+        if number:
+            time.sleep(TG_SEND_INTERVAL)
+        send_message(message)
+
+
+def _send_report_document(
+        messages: list,
+        chunks: Iterator[str],
+        filename: str,
+        caption: str,
+        send_file: Callable[[Any, str, str], Any] = None,
+):
+    """
+    Sends the report as one document, or as numbered parts when it is
+    larger than TG_DOCUMENT_LIMIT. A part is sent once the next one is
+    started, so the parts are only numbered when there are several.
+    """
+    send_file = send_file or send_document
+    parts = _document_parts(chain(messages, chunks))
+    document = next(parts)
+    number = 1
+    for next_document in parts:
+        with document:
+            send_file(document, _part_name(filename, number), caption)
+        document = next_document
+        number += 1
+    with document:
+        if number > 1:
+            filename = _part_name(filename, number)
+        send_file(document, filename, caption)
+
+
+def _document_parts(chunks: Iterable[str]) -> Iterator[SpooledTemporaryFile]:
+    """
+    Writes the chunks, one per line, to temporary files of at most
+    TG_DOCUMENT_LIMIT bytes. Each file is yielded rewound once full.
+    """
+    document = _new_document()
+    for chunk in chunks:
+        data = chunk.encode()
+        size = document.tell()
+        if size and size + 1 + len(data) > TG_DOCUMENT_LIMIT:
+            document.seek(0)
+            yield document
+            document = _new_document()
+        elif size:
+            document.write(b"\n")
+        document.write(data)
+    document.seek(0)
+    yield document
+
+
+def _new_document() -> SpooledTemporaryFile:
+    return SpooledTemporaryFile(
+        max_size=TG_REPORT_DOCUMENT_THRESHOLD * 4, mode="w+b"
+    )
+
+
+def _part_name(filename: str, number: int) -> str:
+    name, extension = os.path.splitext(filename)
+    return f"{name}_part{number}{extension}"
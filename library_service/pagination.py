@@ -0,0 +1,97 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Pages are fetched with ``WHERE id < <cursor> ORDER BY id DESC LIMIT n``:
+    no ``COUNT(*)``, no ``OFFSET`` scan and no duplicated or skipped rows
+    when new rows are inserted while a client is paging.
+    """
+
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to ``KeysetCursorPagination``
+    when the client sends ``?pagination=cursor`` or a ``cursor``
+    taken from the ``next``/``previous`` link of a cursor page.
+
+    Cursor pages are always ordered by ``-id``, so views list the query
+    parameters that change the order (e.g. relevance search) in
+    ``cursor_incompatible_query_params``; they are rejected in cursor
+    mode instead of being silently ignored.
+    """
+
+    cursor_pagination_class = KeysetCursorPagination
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+
+    cursor_paginator = None
+
+    def use_cursor(self, request) -> bool:
+        """Check whether the request asks for cursor pagination."""
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        incompatible = [
+            param
+            for param in getattr(view, "cursor_incompatible_query_params", ())
+            if request.query_params.get(param)
+        ]
+        if incompatible:
+            raise ValidationError(
+                {
+                    param: "Cannot be combined with cursor pagination, "
+                    "use page numbers instead."
+                    for param in incompatible
+                }
+            )
+
+        self.cursor_paginator = self.cursor_pagination_class()
+        page = self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+        self.display_page_controls = (
+            self.cursor_paginator.display_page_controls
+        )
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        cursor_paginator = self.cursor_pagination_class()
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    f"Set to '{self.cursor_mode}' for keyset pagination "
+                    "without a total count."
+                ),
+                "schema": {"type": "string", "enum": [self.cursor_mode]},
+            },
+            *cursor_paginator.get_schema_operation_parameters(view),
+        ]
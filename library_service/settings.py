@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     "book",
     "borrowing",
     "payment",
+    "notification",
 ]
 
 MIDDLEWARE = [
@@ -57,7 +58,7 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": (
-        "rest_framework.pagination.PageNumberPagination"
+        "library_service.pagination.PageOrCursorPagination"
     ),
     "PAGE_SIZE": 5,
 }
@@ -164,14 +165,129 @@ AUTH_USER_MODEL = "user.User"
 
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY")
+STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", default="")
+STRIPE_CONNECT_TIMEOUT = 3
+STRIPE_READ_TIMEOUT = 10
+STRIPE_HTTP_POOL_SIZE = 10
+
+# Checkout creation is retried on transient errors with jittered
+# exponential backoff; after PAYMENT_CIRCUIT_FAILURE_THRESHOLD failures
+# in a row it fails fast for PAYMENT_CIRCUIT_RESET_TIMEOUT seconds.
+PAYMENT_RETRY_ATTEMPTS = 3
+PAYMENT_RETRY_BASE_DELAY = 0.2
+PAYMENT_RETRY_MAX_DELAY = 2.0
+PAYMENT_CIRCUIT_FAILURE_THRESHOLD = 5
+PAYMENT_CIRCUIT_RESET_TIMEOUT = 30
+
+# Dotted path of the payment.gateways.PaymentGateway implementation.
+# Tests always run against the in-process fake.
+PAYMENT_GATEWAY = config(
+    "PAYMENT_GATEWAY", default="payment.gateways.StripeGateway"
+)
+FAKE_PAYMENT_GATEWAY_LATENCY = config(
+    "FAKE_PAYMENT_GATEWAY_LATENCY", default=0.2, cast=float
+)
+FAKE_PAYMENT_GATEWAY_FAILURE_RATE = config(
+    "FAKE_PAYMENT_GATEWAY_FAILURE_RATE", default=0.0, cast=float
+)
+if TESTING:
+    PAYMENT_GATEWAY = "payment.gateways.FakeGateway"
+    FAKE_PAYMENT_GATEWAY_LATENCY = 0
+    FAKE_PAYMENT_GATEWAY_FAILURE_RATE = 0
+    PAYMENT_RETRY_BASE_DELAY = 0
 
 CELERY_BROKER_URL = "redis://redis:6379/0"
 CELERY_RESULT_BACKEND = "redis://redis:6379/0"
+CELERY_TASK_ALWAYS_EAGER = TESTING
+# Everything sent to Telegram goes through its own queue and worker,
+# so a slow Telegram never delays payment expiry and other tasks.
+CELERY_TASK_ROUTES = {
+    "notification.tasks.*": {"queue": "notifications"},
+    "borrowing.tasks.get_borrowing_report": {"queue": "notifications"},
+    "payment.tasks.daily_payment_report": {"queue": "notifications"},
+    "payment.tasks.monthly_payment_report": {"queue": "notifications"},
+}
+
+# Checkout sessions live for 24 hours, keep the copy a bit longer.
+BORROWING_RESERVATION_TIME = timedelta(hours=25)
+# Overdue days cost this many times the daily fee. New borrowings
+# keep the multiplier in force when they were created.
+BORROWING_FINE_MULTIPLIER = 2
+# Borrowings a user may hold at once, 0 for no limit.
+MAX_ACTIVE_BORROWINGS_PER_USER = config(
+    "MAX_ACTIVE_BORROWINGS_PER_USER", default=0, cast=int
+)
+
+# Pending payments wait in per-minute expiry buckets in Redis.
+PAYMENT_EXPIRY_REDIS_URL = CELERY_BROKER_URL
+
+# Telegram notifications wait in a Redis outbox per chat and are sent
+# within token buckets shared by all workers. Telegram allows about
+# 20 messages per minute in a group and 30 per second in total.
+NOTIFICATION_REDIS_URL = CELERY_BROKER_URL
+TG_CHAT_MESSAGES_PER_MINUTE = config(
+    "TG_CHAT_MESSAGES_PER_MINUTE", default=20, cast=float
+)
+TG_CHAT_BURST = config("TG_CHAT_BURST", default=3, cast=int)
+TG_MESSAGES_PER_SECOND = config("TG_MESSAGES_PER_SECOND", default=25, cast=int)
+# Messages queued for a chat beyond this are dropped.
+NOTIFICATION_QUEUE_LIMIT = config(
+    "NOTIFICATION_QUEUE_LIMIT", default=1000, cast=int
+)
+# Queued documents wait here, only their path is kept in the outbox.
+# It must be shared by the workers and is not served like the media.
+NOTIFICATION_DOCUMENT_DIR = config(
+    "NOTIFICATION_DOCUMENT_DIR",
+    default=str(BASE_DIR / "notification_documents"),
+)
+# Digest mode: borrowing and payment notifications are sent as one
+# summary per this many seconds, 0 to send each one right away.
+NOTIFICATION_DIGEST_WINDOW = config(
+    "NOTIFICATION_DIGEST_WINDOW", default=0, cast=int
+)
+# A digest is sent early once this many events are buffered.
+NOTIFICATION_DIGEST_MAX_EVENTS = config(
+    "NOTIFICATION_DIGEST_MAX_EVENTS", default=50, cast=int
+)
+
+# Responses to requests with an Idempotency-Key are replayed for a day;
+# a key still in progress after 10 minutes is considered abandoned.
+# That is well above the longest checkout: every gateway attempt timing
+# out, plus the backoff between them (under a minute by default).
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_KEY_LOCK_TIMEOUT = timedelta(minutes=10)
+
+# Number of inventory shards of a book with sharded inventory.
+BOOK_INVENTORY_SHARDS = 8
 
 CELERY_BEAT_SCHEDULE = {
+    "expire_due_payments_task": {
+        "task": "payment.tasks.expire_due_payments",
+        "schedule": crontab(minute="*")
+    },
     "expired_payment_sessions_task": {
         "task": "payment.tasks.check_stripe_sessions",
-        "schedule": crontab(minute="*/1")
+        "schedule": crontab(minute="*/30")
+    },
+    "expired_borrowing_reservations_task": {
+        "task": "borrowing.tasks.release_expired_borrowing_reservations",
+        "schedule": crontab(minute="*/10")
+    },
+    "purge_idempotency_keys_task": {
+        "task": "borrowing.tasks.purge_expired_idempotency_keys",
+        "schedule": crontab(minute=0)
+    },
+    "rebalance_inventory_shards_task": {
+        "task": "book.tasks.rebalance_book_inventory_shards",
+        "schedule": crontab(minute="*/5")
+    },
+    "drain_notifications_task": {
+        "task": "notification.tasks.drain_notifications",
+        "schedule": crontab(minute="*")
+    },
+    "flush_due_digests_task": {
+        "task": "notification.tasks.flush_due_digests",
+        "schedule": crontab(minute="*")
     },
     "borrowing_expired_task": {
         "task": "borrowing.tasks.get_borrowing_report",
@@ -0,0 +1,78 @@
+import hmac
+import time
+from hashlib import sha256
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+
+class QueryPlanTestMixin:
+    """Assertions on the query plans of the database under test."""
+
+    def assertIndexUsed(self, queryset: QuerySet, *index_names: str):
+        """
+        Assert that EXPLAIN of the queryset uses one of ``index_names``.
+
+        Sequential scans are disabled on Postgres, otherwise the planner
+        prefers them on the tiny tables of the test database.
+        """
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertTrue(
+            any(index_name in plan for index_name in index_names),
+            f"None of {index_names} is used by the query plan:\n{plan}",
+        )
+
+
+class QueryCountTestMixin:
+    """Assertions on the number of queries issued by list endpoints."""
+
+    def count_queries(self, url: str, params: dict = None) -> tuple:
+        """Return the query count and the response of a GET request."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def assertQueryCountIndependentOfPageSize(
+            self, url: str, page_sizes=(1, 5), params: dict = None
+    ):
+        """
+        Assert that a list endpoint issues the same number of queries
+        whatever the number of rows on the page, i.e. that no query
+        is made per serialized object.
+
+        Pages are requested in cursor mode, the only mode that accepts
+        a ``page_size``, so the test data should have at least
+        ``max(page_sizes)`` rows visible at ``url``.
+        """
+        counts = {}
+        for page_size in page_sizes:
+            count, response = self.count_queries(
+                url,
+                {
+                    "pagination": "cursor",
+                    "page_size": page_size,
+                    **(params or {}),
+                },
+            )
+            self.assertEqual(len(response.data["results"]), page_size)
+            counts[page_size] = count
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"Query count grows with the page size: {counts}",
+        )
+
+
+def stripe_signature(payload: str, secret: str) -> str:
+    """Return a ``Stripe-Signature`` header for a webhook payload."""
+    timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
@@ -14,6 +14,7 @@ urlpatterns = [
     path("api/books/", include("book.urls")),
     path("api/borrowings/", include("borrowing.urls")),
     path("api/payments/", include("payment.urls"), name="payment"),
+    path("api/notifications/", include("notification.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -0,0 +1,98 @@
+import json
+import time
+from collections import Counter
+
+from botSend import TG_CHAT_ID
+from notification.outbox import enqueue, get_redis
+
+# Most frequent items listed per event in a digest.
+DIGEST_TOP_ITEMS = 3
+
+
+def digest_key(chat_id: int) -> str:
+    return f"notification:digest:{chat_id}"
+
+
+def _opened_key(chat_id: int) -> str:
+    return f"notification:digest:opened:{chat_id}"
+
+
+def add_event(
+        message: str, event: str, item: str, chat_id: int = TG_CHAT_ID
+) -> int:
+    """
+    Buffer an event for the next digest of a chat.
+
+    ``event`` names the kind of event and ``item`` what it is about,
+    e.g. the borrowed book. Returns the number of buffered events.
+    """
+    payload = json.dumps({"message": message, "event": event, "item": item})
+    pipeline = get_redis().pipeline(transaction=True)
+    pipeline.rpush(digest_key(chat_id), payload)
+    # The first event of a digest records when its window opened.
+    pipeline.set(_opened_key(chat_id), time.time(), nx=True)
+    buffered, _ = pipeline.execute()
+    return buffered
+
+
+def take_events(chat_id: int = TG_CHAT_ID) -> list[dict]:
+    """Remove and return the buffered events of a chat, oldest first."""
+    pipeline = get_redis().pipeline(transaction=True)
+    pipeline.lrange(digest_key(chat_id), 0, -1)
+    pipeline.delete(digest_key(chat_id), _opened_key(chat_id))
+    events, _ = pipeline.execute()
+    return [json.loads(event) for event in events]
+
+
+def summarize(events: list[dict], top: int = DIGEST_TOP_ITEMS) -> str:
+    """
+    One message counting the events of each kind,
+    with their most frequent items.
+    """
+    items = {}
+    for event in events:
+        items.setdefault(event["event"], Counter())[event["item"]] += 1
+
+    lines = [f"📋 {len(events)} events since the last digest:"]
+    for event, counter in items.items():
+        lines.append(f"{event}: {sum(counter.values())}")
+        for item, count in counter.most_common(top):
+            lines.append(f"  • {item} × {count}")
+        if len(counter) > top:
+            lines.append(f"  • {len(counter) - top} more")
+    return "\n".join(lines)
+
+
+def flush(chat_id: int = TG_CHAT_ID) -> bool:
+    """
+    Queue the buffered events of a chat as one message to its outbox.
+
+    A single event is sent as its own message. Returns False if there
+    was nothing to send.
+    """
+    events = take_events(chat_id)
+    if not events:
+        return False
+    if len(events) == 1:
+        message = events[0]["message"]
+    else:
+        message = summarize(events)
+    enqueue(message, chat_id)
+    return True
+
+
+def flush_if_due(window: int, chat_id: int = TG_CHAT_ID) -> bool:
+    """
+    Flush the digest of a chat if its window opened over ``window``
+    seconds ago, e.g. when the flush scheduled by its first event was
+    lost. Returns False if there was nothing to send yet.
+    """
+    client = get_redis()
+    opened = client.get(_opened_key(chat_id))
+    if opened is None:
+        # Events buffered without an opening time are overdue.
+        if not client.llen(digest_key(chat_id)):
+            return False
+    elif time.time() - float(opened) < window:
+        return False
+    return flush(chat_id)
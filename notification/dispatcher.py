@@ -0,0 +1,87 @@
+from typing import BinaryIO
+
+from django.conf import settings
+from django.db import transaction
+
+from notification.digest import add_event
+from notification.outbox import enqueue, enqueue_document, store_document
+from notification.tasks import drain_notifications, flush_digest
+
+
+def notify(
+        message: str,
+        event: str = None,
+        item: str = None,
+) -> None:
+    """
+    Queue a message to the staff Telegram chat once the current
+    transaction commits, or at once outside of a transaction.
+
+    Messages wait in a Redis outbox and are sent in order by a worker
+    of the notifications queue, within the Telegram rate limits.
+    Notifications are best effort: if Redis cannot be reached the
+    message is dropped and the request carries on.
+
+    In digest mode (NOTIFICATION_DIGEST_WINDOW set) messages describing
+    an ``event`` about an ``item`` are buffered and sent as one summary
+    per window, or sooner once NOTIFICATION_DIGEST_MAX_EVENTS are
+    buffered. Messages without an event are always sent right away.
+    """
+    if event and settings.NOTIFICATION_DIGEST_WINDOW:
+        transaction.on_commit(lambda: _buffer(message, event, item))
+    else:
+        transaction.on_commit(lambda: _enqueue(message))
+
+
+def notify_document(
+        document: BinaryIO, filename: str, caption: str = ""
+) -> None:
+    """
+    Queue a document to the staff Telegram chat once the current
+    transaction commits, behind the messages already in the outbox.
+
+    The document is copied to NOTIFICATION_DOCUMENT_DIR at once, so it
+    may be closed on return, and only its path waits in Redis.
+    Documents larger than TG_DOCUMENT_LIMIT are dropped, send_report
+    splits reports into parts that fit.
+    """
+    try:
+        path = store_document(document)
+    except Exception as e:
+        print(f"Error queueing notification: {e}")
+        return
+    transaction.on_commit(
+        lambda: _enqueue_document(path, filename, caption)
+    )
+
+
+def _enqueue_document(path: str, filename: str, caption: str) -> None:
+    try:
+        if enqueue_document(path, filename, caption):
+            drain_notifications.apply_async(retry=False)
+    except Exception as e:
+        print(f"Error queueing notification: {e}")
+
+
+def _enqueue(message: str) -> None:
+    try:
+        if enqueue(message):
+            # No publish retries, a broker outage must not hold the
+            # request. The periodic drain picks the message up then.
+            drain_notifications.apply_async(retry=False)
+    except Exception as e:
+        print(f"Error queueing notification: {e}")
+
+
+def _buffer(message: str, event: str, item: str) -> None:
+    try:
+        buffered = add_event(message, event, str(item))
+        if buffered >= settings.NOTIFICATION_DIGEST_MAX_EVENTS:
+            flush_digest.apply_async(retry=False)
+        elif buffered == 1:
+            # The first event opens the window.
+            flush_digest.apply_async(
+                countdown=settings.NOTIFICATION_DIGEST_WINDOW, retry=False
+            )
+    except Exception as e:
+        print(f"Error buffering notification: {e}")
@@ -0,0 +1,230 @@
+import json
+import os
+import random
+import shutil
+import time
+import uuid
+from contextlib import suppress
+from functools import lru_cache
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Optional
+
+from django.conf import settings
+from redis import Redis
+
+from botSend import (
+    TG_CHAT_ID,
+    TG_DOCUMENT_LIMIT,
+    TelegramError,
+    send_document,
+    send_message,
+)
+from notification.ratelimit import acquire_send_slot, hold_chat
+
+DROPPED_KEY = "notification:dropped"
+# Longest a worker drains a chat before handing over to a new task.
+DRAIN_TIME_LIMIT = 30
+# Waits for a send slot up to this long are slept through, longer ones
+# reschedule the drain instead of holding the worker.
+MAX_INLINE_WAIT = 2
+MAX_SEND_ATTEMPTS = 5
+MAX_RETRY_DELAY = 60
+# Outlives a drain and its last Telegram call.
+DRAIN_LOCK_TIMEOUT = 60
+
+# Deletes the drain lock only if it is still held by the caller.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> Redis:
+    return Redis.from_url(settings.NOTIFICATION_REDIS_URL)
+
+
+def queue_key(chat_id: int) -> str:
+    return f"notification:queue:{chat_id}"
+
+
+def _attempts_key(chat_id: int) -> str:
+    return f"notification:attempts:{chat_id}"
+
+
+def _lock_key(chat_id: int) -> str:
+    return f"notification:lock:{chat_id}"
+
+
+def enqueue(message: str, chat_id: int = TG_CHAT_ID) -> bool:
+    """
+    Append a message to the outbox of a chat, shared by all workers.
+
+    Returns False if the outbox is full and the message was dropped.
+    """
+    return _push(chat_id, {"text": message})
+
+
+def store_document(document: BinaryIO) -> str:
+    """
+    Copy a document to NOTIFICATION_DOCUMENT_DIR and return its path,
+    so that the outbox only holds a reference to it.
+
+    Raises ValueError if the document is larger than Telegram accepts.
+    """
+    os.makedirs(settings.NOTIFICATION_DOCUMENT_DIR, exist_ok=True)
+    with NamedTemporaryFile(
+        dir=settings.NOTIFICATION_DOCUMENT_DIR, delete=False
+    ) as stored:
+        try:
+            shutil.copyfileobj(document, stored)
+            if stored.tell() > TG_DOCUMENT_LIMIT:
+                raise ValueError(
+                    f"Document is larger than {TG_DOCUMENT_LIMIT} bytes"
+                )
+        except BaseException:
+            stored.close()
+            remove_document(stored.name)
+            raise
+    return stored.name
+
+
+def remove_document(path: str) -> None:
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def enqueue_document(
+        path: str,
+        filename: str,
+        caption: str = "",
+        chat_id: int = TG_CHAT_ID,
+) -> bool:
+    """
+    Append a document saved by store_document to the outbox of a chat.
+    It is sent in order with the messages, within the same rate limits
+    and retries, and its file is removed once it is sent or dropped.
+
+    Returns False if the outbox is full and the document was dropped.
+    """
+    try:
+        queued = _push(
+            chat_id,
+            {"document_path": path, "filename": filename, "caption": caption},
+        )
+    except Exception:
+        remove_document(path)
+        raise
+    if not queued:
+        remove_document(path)
+    return queued
+
+
+def _push(chat_id: int, entry: dict) -> bool:
+    client = get_redis()
+    key = queue_key(chat_id)
+    length = client.rpush(key, json.dumps(entry))
+    if length > settings.NOTIFICATION_QUEUE_LIMIT:
+        # Drop the newest message so the queued ones keep their order.
+        client.ltrim(key, 0, settings.NOTIFICATION_QUEUE_LIMIT - 1)
+        client.hincrby(DROPPED_KEY, chat_id, 1)
+        print(f"Dropping notification: outbox of chat {chat_id} is full")
+        return False
+    return True
+
+
+def drain(chat_id: int = TG_CHAT_ID) -> Optional[float]:
+    """
+    Send the messages queued for a chat, oldest first, within the
+    shared rate limits.
+
+    Only one worker drains a chat at a time, so messages are sent in
+    the order they were queued. Returns the seconds after which the
+    drain should run again, or None when there is nothing left to do
+    (the outbox is empty, or another worker is draining it).
+    """
+    client = get_redis()
+    key = queue_key(chat_id)
+    lock_key = _lock_key(chat_id)
+    token = uuid.uuid4().hex
+    if not client.set(lock_key, token, nx=True, ex=DRAIN_LOCK_TIMEOUT):
+        return None
+
+    try:
+        deadline = time.monotonic() + DRAIN_TIME_LIMIT
+        while time.monotonic() < deadline:
+            entry = client.lindex(key, 0)
+            if entry is None:
+                break
+            wait = acquire_send_slot(client, chat_id)
+            if wait > MAX_INLINE_WAIT:
+                return wait
+            if wait:
+                time.sleep(wait)
+                continue
+            retry_in = _send(client, chat_id, _load(entry))
+            if retry_in is not None:
+                return retry_in
+        else:
+            return 0
+    finally:
+        client.register_script(RELEASE_LOCK_SCRIPT)(
+            keys=[lock_key], args=[token]
+        )
+
+    # A message queued while the lock was being released
+    # had its drain turned away, take it over.
+    return 0 if client.llen(key) else None
+
+
+def _load(entry: bytes) -> dict:
+    """Reads an outbox entry."""
+    return json.loads(entry)
+
+
+def _send(client: Redis, chat_id: int, entry: dict) -> Optional[float]:
+    """
+    Send the oldest message or document of the outbox and remove it,
+    unless it should be retried: then returns the seconds to wait first.
+    """
+    path = entry.get("document_path")
+    try:
+        if path:
+            with open(path, "rb") as document:
+                send_document(
+                    document, entry["filename"], entry["caption"], chat_id
+                )
+        else:
+            send_message(entry["text"], chat_id)
+    except TelegramError as exc:
+        attempts = client.incr(_attempts_key(chat_id))
+        if exc.retryable and attempts < MAX_SEND_ATTEMPTS:
+            if exc.retry_after:
+                hold_chat(client, chat_id, exc.retry_after)
+                return exc.retry_after
+            return random.uniform(0, min(MAX_RETRY_DELAY, 2 ** attempts))
+        print(f"Dropping notification: {exc}")
+        client.hincrby(DROPPED_KEY, chat_id, 1)
+    except FileNotFoundError:
+        print(f"Dropping notification: document {path} is missing")
+        client.hincrby(DROPPED_KEY, chat_id, 1)
+    if path:
+        remove_document(path)
+    client.lpop(queue_key(chat_id))
+    client.delete(_attempts_key(chat_id))
+    return None
+
+
+def queue_depth(chat_id: int = TG_CHAT_ID) -> int:
+    """Number of messages waiting in the outbox of a chat."""
+    return get_redis().llen(queue_key(chat_id))
+
+
+def dropped_counts() -> dict[int, int]:
+    """Number of messages dropped so far, per chat."""
+    return {
+        int(chat_id): int(count)
+        for chat_id, count in get_redis().hgetall(DROPPED_KEY).items()
+    }
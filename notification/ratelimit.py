@@ -0,0 +1,81 @@
+from django.conf import settings
+from redis import Redis
+
+# Takes a token from every bucket in KEYS[2:], or from none of them.
+# KEYS[1] is the cooldown key set after a 429 answer, ARGV holds the
+# rate (tokens per second) and capacity of each bucket. Returns "0"
+# when the tokens were taken, else the seconds to wait as a string
+# (numbers returned by Lua are truncated to integers).
+TOKEN_BUCKET_SCRIPT = """
+local cooldown = redis.call("PTTL", KEYS[1])
+if cooldown > 0 then
+    return tostring(cooldown / 1000)
+end
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+local tokens = {}
+for i = 2, #KEYS do
+    local rate = tonumber(ARGV[2 * i - 3])
+    local capacity = tonumber(ARGV[2 * i - 2])
+    local bucket = redis.call("HMGET", KEYS[i], "tokens", "updated")
+    local available = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    available = math.min(
+        capacity, available + math.max(now - updated, 0) * rate
+    )
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+    tokens[i] = available
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 2, #KEYS do
+    redis.call("HSET", KEYS[i], "tokens", tokens[i] - 1, "updated", now)
+    redis.call("EXPIRE", KEYS[i], 3600)
+end
+return "0"
+"""
+
+
+def chat_bucket_key(chat_id: int) -> str:
+    return f"notification:bucket:{chat_id}"
+
+
+def cooldown_key(chat_id: int) -> str:
+    return f"notification:cooldown:{chat_id}"
+
+
+GLOBAL_BUCKET_KEY = "notification:bucket"
+
+
+def acquire_send_slot(client: Redis, chat_id: int) -> float:
+    """
+    Take a send slot from the per-chat and the bot-wide token buckets
+    shared by all workers.
+
+    Returns 0 when the message may be sent now, else the seconds
+    to wait before trying again.
+    """
+    script = client.register_script(TOKEN_BUCKET_SCRIPT)
+    wait = script(
+        keys=[cooldown_key(chat_id), chat_bucket_key(chat_id),
+              GLOBAL_BUCKET_KEY],
+        args=[
+            settings.TG_CHAT_MESSAGES_PER_MINUTE / 60,
+            settings.TG_CHAT_BURST,
+            settings.TG_MESSAGES_PER_SECOND,
+            settings.TG_MESSAGES_PER_SECOND,
+        ],
+    )
+    return float(wait)
+
+
+def hold_chat(client: Redis, chat_id: int, seconds: float) -> None:
+    """
+    Stop every worker from sending to the chat for ``seconds``,
+    as asked by a 429 answer of Telegram.
+    """
+    client.set(cooldown_key(chat_id), 1, px=max(int(seconds * 1000), 1))
@@ -0,0 +1,12 @@
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework import status
+
+
+notification_metrics_view_schema = extend_schema(
+    description="Report the number of messages waiting in the Telegram outbox of the staff chat and the number of messages dropped so far (staff only).",
+    responses={
+        status.HTTP_200_OK: OpenApiResponse(description="Outbox queue depth and drop count"),
+        status.HTTP_403_FORBIDDEN: OpenApiResponse(description="Staff only"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(description="Redis is unavailable"),
+    },
+)
@@ -0,0 +1,38 @@
+from celery import shared_task
+
+from django.conf import settings
+
+from botSend import TG_CHAT_ID
+from notification.digest import flush, flush_if_due
+from notification.outbox import drain
+
+
+@shared_task(ignore_result=True)
+def drain_notifications(chat_id: int = TG_CHAT_ID):
+    """
+    Send the queued messages of a Telegram chat in order,
+    coming back later when a rate limit or an error says so.
+    """
+    retry_in = drain(chat_id)
+    if retry_in is not None:
+        drain_notifications.apply_async((chat_id,), countdown=retry_in)
+
+
+@shared_task(ignore_result=True)
+def flush_digest(chat_id: int = TG_CHAT_ID):
+    """
+    Send the events buffered for a chat as one digest message.
+    """
+    if flush(chat_id):
+        drain_notifications.delay(chat_id)
+
+
+@shared_task(ignore_result=True)
+def flush_due_digests(chat_id: int = TG_CHAT_ID):
+    """
+    Send the digests whose window is over, in case the flush
+    scheduled when the window opened never ran.
+    """
+    window = settings.NOTIFICATION_DIGEST_WINDOW
+    if window and flush_if_due(window, chat_id):
+        drain_notifications.delay(chat_id)
@@ -0,0 +1,607 @@
+import json
+import os
+import time
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, call, patch
+
+import fakeredis
+import requests
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from redis import RedisError
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+import botSend
+from botSend import TelegramError
+from notification.digest import add_event, flush, flush_if_due, summarize
+from notification.dispatcher import notify, notify_document
+from notification.outbox import (
+    DROPPED_KEY,
+    drain,
+    enqueue,
+    enqueue_document,
+    queue_key,
+    store_document,
+)
+from notification.tasks import drain_notifications, flush_due_digests
+
+
+class NotifyTests(TestCase):
+    def setUp(self):
+        enqueue = patch("notification.dispatcher.enqueue", return_value=True)
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+        apply_async = patch(
+            "notification.tasks.drain_notifications.apply_async"
+        )
+        self.apply_async = apply_async.start()
+        self.addCleanup(apply_async.stop)
+
+    def test_message_is_queued_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            notify("Book borrowed")
+            self.enqueue.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        self.enqueue.assert_called_once_with("Book borrowed")
+        self.apply_async.assert_called_once_with(retry=False)
+
+    def test_document_is_stored_and_queued_after_commit(self):
+        with TemporaryDirectory() as directory, override_settings(
+            NOTIFICATION_DOCUMENT_DIR=directory
+        ), patch(
+            "notification.dispatcher.enqueue_document", return_value=True
+        ) as enqueue_document:
+            with self.captureOnCommitCallbacks(execute=True):
+                with BytesIO(b"1. Dune") as document:
+                    notify_document(document, "report.txt", "Report")
+                enqueue_document.assert_not_called()
+
+            path, filename, caption = enqueue_document.call_args.args
+            self.assertEqual(os.path.dirname(path), directory)
+            with open(path, "rb") as stored:
+                self.assertEqual(stored.read(), b"1. Dune")
+
+        self.assertEqual((filename, caption), ("report.txt", "Report"))
+        self.apply_async.assert_called_once_with(retry=False)
+
+    def test_too_large_document_is_dropped(self):
+        with TemporaryDirectory() as directory, override_settings(
+            NOTIFICATION_DOCUMENT_DIR=directory
+        ), patch("notification.outbox.TG_DOCUMENT_LIMIT", 3), patch(
+            "notification.dispatcher.enqueue_document"
+        ) as enqueue_document:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                notify_document(BytesIO(b"1. Dune"), "report.txt")
+
+            self.assertEqual(os.listdir(directory), [])
+
+        self.assertEqual(callbacks, [])
+        enqueue_document.assert_not_called()
+
+    def test_message_is_dropped_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            notify("Book borrowed")
+
+        self.enqueue.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_redis_error_does_not_fail_the_caller(self):
+        self.enqueue.side_effect = ConnectionError("redis down")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify("Book borrowed")
+
+        self.apply_async.assert_not_called()
+
+    def test_full_outbox_is_not_drained_again(self):
+        self.enqueue.return_value = False
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify("Book borrowed")
+
+        self.apply_async.assert_not_called()
+
+
+@override_settings(
+    NOTIFICATION_DIGEST_WINDOW=60, NOTIFICATION_DIGEST_MAX_EVENTS=3
+)
+class DigestModeTests(TestCase):
+    def setUp(self):
+        add_event = patch("notification.dispatcher.add_event")
+        self.add_event = add_event.start()
+        self.addCleanup(add_event.stop)
+        enqueue = patch("notification.dispatcher.enqueue", return_value=True)
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+        flush_digest = patch(
+            "notification.tasks.flush_digest.apply_async"
+        )
+        self.flush_digest = flush_digest.start()
+        self.addCleanup(flush_digest.stop)
+        drain = patch("notification.tasks.drain_notifications.apply_async")
+        drain.start()
+        self.addCleanup(drain.stop)
+
+    def notify_event(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify("Borrowed", event="New borrowings", item="Dune", **kwargs)
+
+    def test_first_event_opens_the_window(self):
+        self.add_event.return_value = 1
+
+        self.notify_event()
+
+        self.add_event.assert_called_once_with(
+            "Borrowed", "New borrowings", "Dune"
+        )
+        self.enqueue.assert_not_called()
+        self.flush_digest.assert_called_once_with(countdown=60, retry=False)
+
+    def test_events_within_the_window_are_buffered(self):
+        self.add_event.return_value = 2
+
+        self.notify_event()
+
+        self.flush_digest.assert_not_called()
+
+    def test_full_buffer_is_flushed_at_once(self):
+        self.add_event.return_value = 3
+
+        self.notify_event()
+
+        self.flush_digest.assert_called_once_with(retry=False)
+
+    @override_settings(NOTIFICATION_DIGEST_WINDOW=0)
+    def test_digest_mode_is_off_by_default(self):
+        self.notify_event()
+
+        self.add_event.assert_not_called()
+        self.enqueue.assert_called_once_with("Borrowed")
+
+
+@override_settings(
+    NOTIFICATION_DIGEST_WINDOW=60, NOTIFICATION_DIGEST_MAX_EVENTS=10
+)
+class DueDigestTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        get_redis = patch(
+            "notification.digest.get_redis", return_value=self.redis
+        )
+        get_redis.start()
+        self.addCleanup(get_redis.stop)
+        enqueue = patch("notification.digest.enqueue")
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+        drain = patch("notification.tasks.drain_notifications.delay")
+        self.drain = drain.start()
+        self.addCleanup(drain.stop)
+
+    def open_window(self, seconds_ago):
+        self.redis.set(
+            "notification:digest:opened:42", time.time() - seconds_ago
+        )
+
+    def test_lost_flush_is_sent_by_the_periodic_task(self):
+        with patch(
+            "notification.tasks.flush_digest.apply_async",
+            side_effect=ConnectionError("broker down"),
+        ) as apply_async, patch(
+            "notification.dispatcher.add_event",
+            side_effect=lambda *args: add_event(*args, chat_id=42),
+        ):
+            notify("Borrowed", event="New borrowings", item="Dune")
+            notify("Borrowed", event="New borrowings", item="Emma")
+        apply_async.assert_called_once()
+
+        flush_due_digests.run(42)
+        self.enqueue.assert_not_called()
+
+        self.open_window(61)
+        flush_due_digests.run(42)
+
+        message, chat_id = self.enqueue.call_args.args
+        self.assertTrue(message.startswith("📋 2 events"))
+        self.assertEqual(chat_id, 42)
+        self.drain.assert_called_once_with(42)
+        self.assertFalse(self.redis.exists("notification:digest:opened:42"))
+
+    def test_window_opens_with_the_first_event(self):
+        add_event("Borrowed", "New borrowings", "Dune", chat_id=42)
+        self.open_window(30)
+        add_event("Borrowed", "New borrowings", "Emma", chat_id=42)
+
+        self.assertFalse(flush_if_due(60, 42))
+        self.open_window(60)
+        self.assertTrue(flush_if_due(60, 42))
+
+    def test_events_without_opening_time_are_overdue(self):
+        self.redis.rpush(
+            "notification:digest:42",
+            '{"message": "Paid", "event": "Payments", "item": "Fine"}',
+        )
+
+        self.assertTrue(flush_if_due(60, 42))
+
+        self.enqueue.assert_called_once_with("Paid", 42)
+
+    def test_empty_digest_is_not_due(self):
+        self.assertFalse(flush_if_due(60, 42))
+
+    @override_settings(NOTIFICATION_DIGEST_WINDOW=0)
+    def test_nothing_is_flushed_outside_of_digest_mode(self):
+        with patch("notification.tasks.flush_if_due") as flush_due:
+            flush_due_digests.run(42)
+
+        flush_due.assert_not_called()
+
+
+class DigestTests(SimpleTestCase):
+    def setUp(self):
+        take_events = patch("notification.digest.take_events")
+        self.take_events = take_events.start()
+        self.addCleanup(take_events.stop)
+        enqueue = patch("notification.digest.enqueue")
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+
+    def events(self, event, *items):
+        return [
+            {"message": f"{event}: {item}", "event": event, "item": item}
+            for item in items
+        ]
+
+    def test_summary_counts_events_and_top_items(self):
+        events = self.events(
+            "New borrowings", "Dune", "Emma", "Dune", "Ulysses", "Dune",
+            "Emma", "Walden",
+        ) + self.events("Payments", "Payment", "Fine", "Payment")
+
+        self.assertEqual(
+            summarize(events),
+            "📋 10 events since the last digest:\n"
+            "New borrowings: 7\n"
+            "  • Dune × 3\n"
+            "  • Emma × 2\n"
+            "  • Ulysses × 1\n"
+            "  • 1 more\n"
+            "Payments: 3\n"
+            "  • Payment × 2\n"
+            "  • Fine × 1",
+        )
+
+    def test_flush_queues_one_summary(self):
+        self.take_events.return_value = self.events("Payments", "A", "B")
+
+        self.assertTrue(flush(42))
+
+        self.enqueue.assert_called_once()
+        message, chat_id = self.enqueue.call_args.args
+        self.assertTrue(message.startswith("📋 2 events"))
+        self.assertEqual(chat_id, 42)
+
+    def test_single_event_is_sent_as_is(self):
+        self.take_events.return_value = self.events("Payments", "A")
+
+        flush(42)
+
+        self.enqueue.assert_called_once_with("Payments: A", 42)
+
+    def test_empty_buffer_sends_nothing(self):
+        self.take_events.return_value = []
+
+        self.assertFalse(flush(42))
+
+        self.enqueue.assert_not_called()
+
+
+@override_settings(NOTIFICATION_QUEUE_LIMIT=2)
+class OutboxTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.set.return_value = True
+        self.redis.llen.return_value = 0
+        get_redis = patch(
+            "notification.outbox.get_redis", return_value=self.redis
+        )
+        get_redis.start()
+        self.addCleanup(get_redis.stop)
+        acquire = patch(
+            "notification.outbox.acquire_send_slot", return_value=0
+        )
+        self.acquire = acquire.start()
+        self.addCleanup(acquire.stop)
+        send_message = patch("notification.outbox.send_message")
+        self.send_message = send_message.start()
+        self.addCleanup(send_message.stop)
+        send_document = patch("notification.outbox.send_document")
+        self.send_document = send_document.start()
+        self.addCleanup(send_document.stop)
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        document_dir = override_settings(
+            NOTIFICATION_DOCUMENT_DIR=directory.name
+        )
+        document_dir.enable()
+        self.addCleanup(document_dir.disable)
+
+    def store(self, content):
+        path = store_document(BytesIO(content))
+        return {"document_path": path, "filename": "report.txt",
+                "caption": "Report"}
+
+    def queue(self, *entries):
+        self.redis.lindex.side_effect = [
+            json.dumps(
+                {"text": entry} if isinstance(entry, str) else entry
+            ).encode()
+            for entry in entries
+        ] + [None]
+
+    def test_enqueue_appends_to_chat_outbox(self):
+        self.redis.rpush.return_value = 2
+
+        self.assertTrue(enqueue("Paid", chat_id=42))
+
+        self.redis.rpush.assert_called_once_with(
+            queue_key(42), json.dumps({"text": "Paid"})
+        )
+        self.redis.ltrim.assert_not_called()
+
+    def test_enqueue_document_appends_its_path_to_chat_outbox(self):
+        self.redis.rpush.return_value = 1
+        document = self.store(b"1. Dune")
+
+        self.assertTrue(
+            enqueue_document(
+                document["document_path"], "report.txt", "Report", chat_id=42
+            )
+        )
+
+        key, entry = self.redis.rpush.call_args.args
+        self.assertEqual(key, queue_key(42))
+        self.assertEqual(json.loads(entry), document)
+        self.assertTrue(os.path.exists(document["document_path"]))
+
+    def test_full_outbox_removes_the_dropped_document(self):
+        self.redis.rpush.return_value = 3
+        path = self.store(b"1. Dune")["document_path"]
+
+        self.assertFalse(enqueue_document(path, "report.txt", chat_id=42))
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_full_outbox_drops_and_counts_the_message(self):
+        self.redis.rpush.return_value = 3
+
+        self.assertFalse(enqueue("Paid", chat_id=42))
+
+        self.redis.ltrim.assert_called_once_with(queue_key(42), 0, 1)
+        self.redis.hincrby.assert_called_once_with(DROPPED_KEY, 42, 1)
+
+    def test_messages_are_sent_in_order(self):
+        self.queue("first", "second")
+
+        self.assertIsNone(drain(42))
+
+        self.assertEqual(
+            self.send_message.call_args_list,
+            [call("first", 42), call("second", 42)],
+        )
+        self.assertEqual(self.redis.lpop.call_count, 2)
+
+    def test_documents_are_sent_in_order_with_messages(self):
+        documents = []
+        self.send_document.side_effect = (
+            lambda document, filename, caption, chat_id: documents.append(
+                (document.read().decode(), filename, caption, chat_id)
+            )
+        )
+        document = self.store(b"1. Dune")
+        self.queue("first", document)
+
+        self.assertIsNone(drain(42))
+
+        self.send_message.assert_called_once_with("first", 42)
+        self.assertEqual(
+            documents, [("1. Dune", "report.txt", "Report", 42)]
+        )
+        self.assertEqual(self.acquire.call_count, 2)
+        self.assertEqual(self.redis.lpop.call_count, 2)
+        self.assertFalse(os.path.exists(document["document_path"]))
+
+    def test_missing_document_is_dropped(self):
+        document = self.store(b"1. Dune")
+        os.remove(document["document_path"])
+        self.queue(document, "second")
+
+        self.assertIsNone(drain(42))
+
+        self.send_document.assert_not_called()
+        self.send_message.assert_called_once_with("second", 42)
+        self.redis.hincrby.assert_called_once_with(DROPPED_KEY, 42, 1)
+        self.assertEqual(self.redis.lpop.call_count, 2)
+
+    def test_retry_after_keeps_the_document(self):
+        self.send_document.side_effect = TelegramError(
+            "Too Many Requests", retryable=True, retry_after=5
+        )
+        self.redis.incr.return_value = 1
+        document = self.store(b"1. Dune")
+        self.queue(document)
+
+        self.assertEqual(drain(42), 5)
+        self.assertTrue(os.path.exists(document["document_path"]))
+
+        self.redis.set.assert_called_with(
+            "notification:cooldown:42", 1, px=5000
+        )
+        self.redis.lpop.assert_not_called()
+
+    def test_other_worker_draining_the_chat_is_left_alone(self):
+        self.redis.set.return_value = False
+        self.queue("first")
+
+        self.assertIsNone(drain(42))
+
+        self.send_message.assert_not_called()
+
+    def test_long_rate_limit_wait_reschedules_the_drain(self):
+        self.acquire.return_value = 12.5
+        self.queue("first")
+
+        self.assertEqual(drain(42), 12.5)
+
+        self.send_message.assert_not_called()
+        self.redis.lpop.assert_not_called()
+
+    def test_retry_after_holds_the_chat_and_keeps_the_message(self):
+        self.send_message.side_effect = TelegramError(
+            "Too Many Requests", retryable=True, retry_after=5
+        )
+        self.redis.incr.return_value = 1
+        self.queue("first", "second")
+
+        self.assertEqual(drain(42), 5)
+
+        self.redis.set.assert_called_with(
+            "notification:cooldown:42", 1, px=5000
+        )
+        self.send_message.assert_called_once_with("first", 42)
+        self.redis.lpop.assert_not_called()
+
+    def test_permanent_error_drops_and_counts_the_message(self):
+        self.send_message.side_effect = [
+            TelegramError("Bad Request: message is too long"), None
+        ]
+        self.redis.incr.return_value = 1
+        self.queue("first", "second")
+
+        self.assertIsNone(drain(42))
+
+        self.redis.hincrby.assert_called_once_with(DROPPED_KEY, 42, 1)
+        self.assertEqual(self.redis.lpop.call_count, 2)
+
+    def test_message_queued_during_release_is_picked_up(self):
+        self.redis.llen.return_value = 1
+        self.queue()
+
+        self.assertEqual(drain(42), 0)
+
+    def test_drain_task_reschedules_itself(self):
+        with patch(
+            "notification.tasks.drain", return_value=3
+        ), patch(
+            "notification.tasks.drain_notifications.apply_async"
+        ) as apply_async:
+            drain_notifications.run(42)
+
+        apply_async.assert_called_once_with((42,), countdown=3)
+
+
+class NotificationMetricsViewTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("notification:notification-metrics")
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_reports_queue_depth_and_drops(self):
+        with patch(
+            "notification.views.queue_depth", return_value=4
+        ), patch(
+            "notification.views.dropped_counts",
+            return_value={botSend.TG_CHAT_ID: 2},
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["queue_depth"], 4)
+        self.assertEqual(response.data["dropped"], 2)
+
+    def test_redis_outage_is_reported(self):
+        with patch(
+            "notification.views.queue_depth", side_effect=RedisError
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_staff_only(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="password"
+        )
+        self.client.force_authenticate(user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TelegramClientTests(SimpleTestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        get_session = patch("botSend.get_session", return_value=self.session)
+        get_session.start()
+        self.addCleanup(get_session.stop)
+
+    def response(self, status_code, body):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = body.encode()
+        return response
+
+    def test_message_is_posted_with_timeouts(self):
+        self.session.post.return_value = self.response(
+            200, '{"ok": true, "result": {"message_id": 1}}'
+        )
+
+        self.assertEqual(botSend.send_message("Hi"), {"message_id": 1})
+        _, kwargs = self.session.post.call_args
+        self.assertEqual(
+            kwargs["timeout"],
+            (botSend.TG_CONNECT_TIMEOUT, botSend.TG_READ_TIMEOUT),
+        )
+        self.assertEqual(kwargs["data"]["text"], "Hi")
+
+    def test_rate_limit_is_retryable(self):
+        self.session.post.return_value = self.response(
+            429,
+            '{"ok": false, "description": "Too Many Requests",'
+            ' "parameters": {"retry_after": 5}}',
+        )
+
+        with self.assertRaises(TelegramError) as cm:
+            botSend.send_message("Hi")
+
+        self.assertTrue(cm.exception.retryable)
+        self.assertEqual(cm.exception.retry_after, 5)
+
+    def test_bad_request_is_not_retryable(self):
+        self.session.post.return_value = self.response(
+            400, '{"ok": false, "description": "Bad Request"}'
+        )
+
+        with self.assertRaises(TelegramError) as cm:
+            botSend.send_message("Hi")
+
+        self.assertFalse(cm.exception.retryable)
+
+    def test_network_error_does_not_leak_the_token(self):
+        self.session.post.side_effect = requests.ConnectionError(
+            f"Max retries exceeded with url: {botSend.TG_API_URL}/sendMessage"
+        )
+
+        with self.assertRaises(TelegramError) as cm:
+            botSend.send_message("Hi")
+
+        self.assertTrue(cm.exception.retryable)
+        self.assertNotIn(botSend.TG_BOT_TOKEN, str(cm.exception))
+        self.assertIsNone(cm.exception.__cause__)
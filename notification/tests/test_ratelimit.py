@@ -0,0 +1,85 @@
+import time
+
+import fakeredis
+from django.test import SimpleTestCase, override_settings
+
+from notification.ratelimit import (
+    GLOBAL_BUCKET_KEY,
+    acquire_send_slot,
+    chat_bucket_key,
+    hold_chat,
+)
+
+
+@override_settings(
+    TG_CHAT_MESSAGES_PER_MINUTE=60,
+    TG_CHAT_BURST=3,
+    TG_MESSAGES_PER_SECOND=30,
+)
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+
+    def tokens(self, key):
+        return float(self.redis.hget(key, "tokens"))
+
+    def test_burst_up_to_capacity_then_wait(self):
+        waits = [acquire_send_slot(self.redis, 42) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+        self.assertLessEqual(waits[3], 1)
+
+    def test_tokens_refill_over_time(self):
+        for _ in range(3):
+            acquire_send_slot(self.redis, 42)
+        self.assertGreater(acquire_send_slot(self.redis, 42), 0)
+
+        # Two seconds pass at one message per second.
+        updated = float(self.redis.hget(chat_bucket_key(42), "updated"))
+        self.redis.hset(chat_bucket_key(42), "updated", updated - 2)
+
+        self.assertEqual(acquire_send_slot(self.redis, 42), 0)
+        self.assertEqual(acquire_send_slot(self.redis, 42), 0)
+        self.assertGreater(acquire_send_slot(self.redis, 42), 0)
+
+    def test_refill_is_capped_at_capacity(self):
+        acquire_send_slot(self.redis, 42)
+        self.redis.hset(chat_bucket_key(42), "updated", time.time() - 3600)
+
+        waits = [acquire_send_slot(self.redis, 42) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+
+    def test_cooldown_takes_precedence(self):
+        hold_chat(self.redis, 42, 5)
+
+        wait = acquire_send_slot(self.redis, 42)
+
+        self.assertGreater(wait, 4)
+        self.assertLessEqual(wait, 5)
+        self.assertFalse(self.redis.exists(chat_bucket_key(42)))
+        self.assertFalse(self.redis.exists(GLOBAL_BUCKET_KEY))
+
+    def test_cooldown_is_per_chat(self):
+        hold_chat(self.redis, 42, 5)
+
+        self.assertEqual(acquire_send_slot(self.redis, 7), 0)
+
+    @override_settings(TG_MESSAGES_PER_SECOND=2)
+    def test_tokens_are_taken_from_all_buckets_or_none(self):
+        self.assertEqual(acquire_send_slot(self.redis, 42), 0)
+        self.assertEqual(acquire_send_slot(self.redis, 42), 0)
+
+        # The chat has tokens left but the bot-wide bucket is empty.
+        self.assertGreater(acquire_send_slot(self.redis, 7), 0)
+        self.assertFalse(self.redis.exists(chat_bucket_key(7)))
+        self.assertLess(self.tokens(GLOBAL_BUCKET_KEY), 1)
+
+        # The bot-wide bucket refills to two tokens, the chat takes its
+        # last one and is turned away without using the other.
+        self.redis.hset(GLOBAL_BUCKET_KEY, "updated", time.time() - 1)
+        self.assertEqual(acquire_send_slot(self.redis, 42), 0)
+        self.assertGreater(acquire_send_slot(self.redis, 42), 0)
+        self.assertGreaterEqual(self.tokens(GLOBAL_BUCKET_KEY), 1)
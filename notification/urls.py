@@ -0,0 +1,13 @@
+from django.urls import path
+
+from notification.views import NotificationMetricsView
+
+urlpatterns = [
+    path(
+        "metrics/",
+        NotificationMetricsView.as_view(),
+        name="notification-metrics",
+    ),
+]
+
+app_name = "notification"
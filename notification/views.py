@@ -0,0 +1,32 @@
+from redis import RedisError
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from botSend import TG_CHAT_ID
+from notification.outbox import dropped_counts, queue_depth
+from notification.schemas import notification_metrics_view_schema
+
+
+@notification_metrics_view_schema
+class NotificationMetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Report the queue depth and drop count of the staff chat outbox.
+        """
+        try:
+            metrics = {
+                "chat_id": TG_CHAT_ID,
+                "queue_depth": queue_depth(TG_CHAT_ID),
+                "dropped": dropped_counts().get(TG_CHAT_ID, 0),
+            }
+        except RedisError:
+            return Response(
+                {"detail": "Notification outbox is unavailable."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(metrics, status=status.HTTP_200_OK)
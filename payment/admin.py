@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Payment
+from .money import format_cents
 
 
 @admin.register(Payment)
@@ -12,6 +13,11 @@ class PaymentAdmin(admin.ModelAdmin):
         "money_to_pay",
         "session_url",
         "session_id",
+        "refund_due",
     )
-    list_filter = ("status", "payment_type")
+    list_filter = ("status", "payment_type", "refund_due")
     search_fields = ("borrowing_id", "session_id")
+
+    @admin.display(description="Money to pay", ordering="money_to_pay_cents")
+    def money_to_pay(self, obj):
+        return format_cents(obj.money_to_pay_cents)
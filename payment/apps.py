@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "payment"
+
+    def ready(self):
+        """
+        Imports the receivers module to register
+        the signal handlers for the Payment app.
+        """
+        import payment.receivers
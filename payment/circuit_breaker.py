@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from payment.gateways import PaymentGatewayError
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open, the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker of one process.
+
+    After ``failure_threshold`` consecutive failures the circuit opens
+    and calls fail fast for ``reset_timeout`` seconds. Then it is
+    half-open: a single probe call is let through, its success closes
+    the circuit, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int,
+            reset_timeout: float,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "rejected": 0,
+            "retries": 0,
+            "opened": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and self.clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Reserve a call, or return False if it must fail fast."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                allowed = True
+            elif state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                allowed = True
+            else:
+                allowed = False
+            self.counters["calls" if allowed else "rejected"] += 1
+            return allowed
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.counters["successes"] += 1
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    self.counters["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self._probing = False
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def snapshot(self) -> dict:
+        """Current state and counters, for the metrics endpoint."""
+        with self._lock:
+            state = self._current_state()
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "open_for": (
+                    round(self.clock() - self._opened_at, 3)
+                    if state == self.OPEN
+                    else None
+                ),
+                **self.counters,
+            }
+
+
+def call_with_retries(
+        func: Callable[[], T],
+        breaker: CircuitBreaker,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Call ``func`` through the breaker, retrying transient gateway errors
+    up to ``attempts`` times in total with full-jitter exponential backoff.
+
+    Raises CircuitOpenError when the breaker rejects an attempt and the
+    last PaymentGatewayError when the attempts are exhausted.
+    """
+    for attempt in range(attempts):
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit {breaker.name} is open")
+        try:
+            result = func()
+        except PaymentGatewayError as exc:
+            if not exc.retryable:
+                # The provider answered, the request itself is wrong.
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                raise
+            breaker.record_retry()
+            backoff = min(max_delay, base_delay * 2 ** attempt)
+            sleep(random.uniform(0, backoff))
+        else:
+            breaker.record_success()
+            return result
+
+
+@lru_cache(maxsize=None)
+def get_checkout_breaker() -> CircuitBreaker:
+    """Breaker around checkout session creation, one per process."""
+    return CircuitBreaker(
+        "checkout",
+        failure_threshold=settings.PAYMENT_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.PAYMENT_CIRCUIT_RESET_TIMEOUT,
+    )
+
+
+@receiver(setting_changed, dispatch_uid="reset_checkout_breaker")
+def reset_checkout_breaker(setting, **kwargs):
+    if setting.startswith("PAYMENT_CIRCUIT_"):
+        get_checkout_breaker.cache_clear()
@@ -0,0 +1,12 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PaymentsUnavailable(APIException):
+    """The payment provider is failing, checkout is switched off for now."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = (
+        "Payments are temporarily unavailable, please try again later."
+    )
+    default_code = "payments_unavailable"
@@ -0,0 +1,87 @@
+import math
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterator
+
+from django.conf import settings
+from django.db import transaction
+from redis import Redis
+
+# Payments expiring in the same minute share a Redis set, keyed by the
+# minute their sessions are over. Due minutes are drained in order,
+# from the minute after the cursor.
+CURSOR_KEY = "payment:expiry:cursor"
+LOCK_KEY = "payment:expiry:lock"
+# Outlives a drain of the due buckets.
+LOCK_TIMEOUT = 300
+# Buckets further back than this are left to the safety sweep,
+# e.g. when the cursor was lost.
+MAX_CATCH_UP_MINUTES = 60
+# Undrained buckets are removed by Redis after a day.
+BUCKET_GRACE = 24 * 60 * 60
+EXPIRY_BATCH_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> Redis:
+    return Redis.from_url(settings.PAYMENT_EXPIRY_REDIS_URL)
+
+
+def bucket_key(minute: int) -> str:
+    return f"payment:expiry:{minute}"
+
+
+def schedule_expiry(payment_id: int, session_expiry: datetime) -> None:
+    """
+    Put a pending payment in the bucket of the minute its session is
+    over, once the current transaction commits.
+
+    Best effort: a payment that could not be scheduled is expired by
+    the safety sweep instead.
+    """
+    transaction.on_commit(lambda: _schedule(payment_id, session_expiry))
+
+
+def _schedule(payment_id: int, session_expiry: datetime) -> None:
+    # Never in a minute already drained.
+    minute = max(
+        math.ceil(session_expiry.timestamp() / 60), _current_minute() + 1
+    )
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.sadd(bucket_key(minute), payment_id)
+        pipeline.expireat(bucket_key(minute), minute * 60 + BUCKET_GRACE)
+        pipeline.execute()
+    except Exception as e:
+        print(f"Error scheduling payment expiry: {e}")
+
+
+def _current_minute() -> int:
+    return int(time.time() // 60)
+
+
+def take_due_payments(
+        batch_size: int = EXPIRY_BATCH_SIZE,
+) -> Iterator[list[int]]:
+    """
+    Yield the ids of the payments whose sessions are over, in batches
+    taken out of their buckets, oldest minute first.
+
+    Only one worker drains the buckets at a time, others get nothing.
+    """
+    client = get_redis()
+    if not client.set(LOCK_KEY, 1, nx=True, ex=LOCK_TIMEOUT):
+        return
+    try:
+        now = _current_minute()
+        cursor = client.get(CURSOR_KEY)
+        start = now - MAX_CATCH_UP_MINUTES
+        if cursor is not None:
+            start = max(start, int(cursor) + 1)
+        for minute in range(start, now + 1):
+            while payment_ids := client.spop(bucket_key(minute), batch_size):
+                yield [int(payment_id) for payment_id in payment_ids]
+            client.set(CURSOR_KEY, minute)
+    finally:
+        client.delete(LOCK_KEY)
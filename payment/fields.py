@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from payment.money import from_cents, to_cents
+
+
+class CentsField(serializers.DecimalField):
+    """
+    Decimal API field for an amount stored as integer cents.
+    """
+
+    def __init__(self, max_digits=14, decimal_places=2, **kwargs):
+        super().__init__(max_digits, decimal_places, **kwargs)
+
+    def to_representation(self, value):
+        return super().to_representation(from_cents(value))
+
+    def to_internal_value(self, data):
+        return to_cents(super().to_internal_value(data))
@@ -0,0 +1,214 @@
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+
+class PaymentGatewayError(Exception):
+    """
+    The payment provider could not be reached or refused the request.
+
+    ``retryable`` errors (timeouts, connection errors, rate limits and
+    server errors) may succeed when the same request is sent again.
+    """
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class InvalidWebhookEvent(Exception):
+    """A webhook payload is malformed or its signature does not match."""
+
+
+@dataclass(frozen=True)
+class CheckoutSession:
+    """A hosted checkout page created by the payment provider."""
+
+    id: str
+    url: str
+
+
+class PaymentGateway(ABC):
+    """Interface of the payment provider used by the payment services."""
+
+    @abstractmethod
+    def create_checkout_session(
+            self,
+            *,
+            name: str,
+            amount_cents: int,
+            success_url: str,
+            cancel_url: str,
+            currency: str = "usd",
+            idempotency_key: str = None,
+    ) -> CheckoutSession:
+        """
+        Create a checkout page for a single item of ``amount_cents``
+        minor units of ``currency``. Requests repeated with
+        the same ``idempotency_key`` return the same session.
+
+        Raises PaymentGatewayError if the session could not be created.
+        """
+
+    def construct_event(self, payload: bytes, signature: str) -> dict:
+        """
+        Verify a Stripe-style signed webhook payload and return the event.
+
+        The signature is checked locally with STRIPE_WEBHOOK_SECRET,
+        no request is made to the provider.
+        """
+        try:
+            return stripe.Webhook.construct_event(
+                payload, signature, settings.STRIPE_WEBHOOK_SECRET
+            )
+        except (ValueError, stripe.SignatureVerificationError) as exc:
+            raise InvalidWebhookEvent(str(exc)) from exc
+
+
+class StripeGateway(PaymentGateway):
+    """
+    Stripe Checkout through a ``StripeClient`` that keeps one pooled
+    HTTP session per process, with strict connect and read timeouts.
+    """
+
+    def __init__(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.STRIPE_HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            max_network_retries=0,
+            http_client=stripe.RequestsClient(
+                timeout=(
+                    settings.STRIPE_CONNECT_TIMEOUT,
+                    settings.STRIPE_READ_TIMEOUT,
+                ),
+                session=session,
+            ),
+        )
+
+    def create_checkout_session(
+            self,
+            *,
+            name: str,
+            amount_cents: int,
+            success_url: str,
+            cancel_url: str,
+            currency: str = "usd",
+            idempotency_key: str = None,
+    ) -> CheckoutSession:
+        try:
+            session = self.client.checkout.sessions.create(
+                params={
+                    "payment_method_types": ["card"],
+                    "line_items": [
+                        {
+                            "price_data": {
+                                "currency": currency,
+                                "product_data": {"name": name},
+                                "unit_amount": amount_cents,
+                            },
+                            "quantity": 1,
+                        }
+                    ],
+                    "mode": "payment",
+                    "success_url": success_url,
+                    "cancel_url": cancel_url,
+                },
+                options=(
+                    {"idempotency_key": idempotency_key}
+                    if idempotency_key
+                    else {}
+                ),
+            )
+        except stripe.StripeError as exc:
+            raise PaymentGatewayError(
+                str(exc), retryable=self.is_retryable(exc)
+            ) from exc
+        return CheckoutSession(id=session.id, url=session.url)
+
+    @staticmethod
+    def is_retryable(exc: stripe.StripeError) -> bool:
+        return isinstance(
+            exc, (stripe.APIConnectionError, stripe.RateLimitError)
+        ) or (exc.http_status or 0) >= 500
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-process stand-in for Stripe, for tests and load tests
+    on machines without network access.
+
+    Every call sleeps for a random time up to FAKE_PAYMENT_GATEWAY_LATENCY
+    seconds and fails with probability FAKE_PAYMENT_GATEWAY_FAILURE_RATE.
+    Calls with an idempotency key already used return the same session.
+    """
+
+    url = "https://checkout.fake.local/pay/"
+
+    def __init__(self, latency: float = None, failure_rate: float = None):
+        self.latency = (
+            settings.FAKE_PAYMENT_GATEWAY_LATENCY
+            if latency is None
+            else latency
+        )
+        self.failure_rate = (
+            settings.FAKE_PAYMENT_GATEWAY_FAILURE_RATE
+            if failure_rate is None
+            else failure_rate
+        )
+        self.sessions = {}
+
+    def create_checkout_session(
+            self,
+            *,
+            name: str,
+            amount_cents: int,
+            success_url: str,
+            cancel_url: str,
+            currency: str = "usd",
+            idempotency_key: str = None,
+    ) -> CheckoutSession:
+        if self.latency:
+            time.sleep(random.uniform(0, self.latency))
+        if random.random() < self.failure_rate:
+            raise PaymentGatewayError(
+                "Simulated payment gateway failure", retryable=True
+            )
+        if idempotency_key in self.sessions:
+            return self.sessions[idempotency_key]
+        session_id = f"cs_fake_{uuid.uuid4().hex}"
+        session = CheckoutSession(
+            id=session_id, url=f"{self.url}{session_id}"
+        )
+        if idempotency_key:
+            self.sessions[idempotency_key] = session
+        return session
+
+
+@lru_cache(maxsize=None)
+def get_payment_gateway() -> PaymentGateway:
+    """Return the gateway configured by PAYMENT_GATEWAY, one per process."""
+    return import_string(settings.PAYMENT_GATEWAY)()
+
+
+@receiver(setting_changed, dispatch_uid="reset_payment_gateway")
+def reset_payment_gateway(setting, **kwargs):
+    if setting in (
+        "PAYMENT_GATEWAY",
+        "STRIPE_SECRET_KEY",
+        "FAKE_PAYMENT_GATEWAY_LATENCY",
+        "FAKE_PAYMENT_GATEWAY_FAILURE_RATE",
+    ):
+        get_payment_gateway.cache_clear()
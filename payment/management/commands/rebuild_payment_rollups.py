@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management import BaseCommand, CommandError
+
+from payment.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Django command to recompute the daily payment rollup"""
+
+    help = (
+        "Recompute the daily payment rollup from the payments, "
+        "for all days or the days from --from to --to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=date.fromisoformat,
+            help="First day to recompute (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=date.fromisoformat,
+            help="Last day to recompute (YYYY-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start and end and start > end:
+            raise CommandError("--from must not be after --to.")
+        rows = rebuild_rollups(start, end)
+        self.stdout.write(
+            self.style.SUCCESS(f"{rows} payment rollup rows written.")
+        )
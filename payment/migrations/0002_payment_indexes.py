@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0004_borrowing_indexes"),
+        ("payment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "session_expiry"], name="payment_status_expiry_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "created_at"], name="payment_status_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                fields=("session_id",), name="payment_session_id_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:33
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Payment = apps.get_model("payment", "Payment")
+    PaymentDailyRollup = apps.get_model("payment", "PaymentDailyRollup")
+    totals = (
+        Payment.objects.annotate(day=TruncDate("created_at"))
+        .values("day", "payment_type", "status")
+        .annotate(count=Count("id"), amount=Sum("money_to_pay"))
+        .order_by()
+    )
+    PaymentDailyRollup.objects.bulk_create(
+        PaymentDailyRollup(**row) for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payment", "0002_payment_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "payment_type",
+                    models.CharField(
+                        choices=[("PAYMENT", "Payment"), ("FINE", "Fine")], max_length=7
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("PAID", "Paid"),
+                            ("EXPIRED", "Expired"),
+                        ],
+                        max_length=7,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "payment_type", "status"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="paymentdailyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "payment_type", "status"), name="payment_rollup_unique"
+            ),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
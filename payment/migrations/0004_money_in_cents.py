@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:02
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Cast, Round
+
+CONVERSIONS = (
+    ("Payment", "money_to_pay", "money_to_pay_cents"),
+    ("PaymentDailyRollup", "amount", "amount_cents"),
+)
+
+
+def decimals_to_cents(apps, schema_editor):
+    # One UPDATE per table, rows never go through Python.
+    for model_name, amount, cents in CONVERSIONS:
+        apps.get_model("payment", model_name).objects.update(
+            **{
+                cents: Cast(
+                    Round(F(amount) * 100), models.BigIntegerField()
+                )
+            }
+        )
+
+
+def cents_to_decimals(apps, schema_editor):
+    for model_name, amount, cents in CONVERSIONS:
+        apps.get_model("payment", model_name).objects.update(
+            **{
+                amount: ExpressionWrapper(
+                    F(cents) * Value(Decimal("0.01")),
+                    output_field=models.DecimalField(
+                        max_digits=14, decimal_places=2
+                    ),
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payment", "0003_paymentdailyrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="money_to_pay_cents",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="paymentdailyrollup",
+            name="amount_cents",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(decimals_to_cents, cents_to_decimals),
+        migrations.RemoveField(
+            model_name="payment",
+            name="money_to_pay",
+        ),
+        migrations.RemoveField(
+            model_name="paymentdailyrollup",
+            name="amount",
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_borrowing_users(apps, schema_editor):
+    Borrowing = apps.get_model("borrowing", "Borrowing")
+    Payment = apps.get_model("payment", "Payment")
+    Payment.objects.update(
+        user_id=Subquery(
+            Borrowing.objects.filter(pk=OuterRef("borrowing_id")).values(
+                "user_id"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0007_userborrowingstate"),
+        ("payment", "0004_money_in_cents"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(copy_borrowing_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "-id"], name="payment_user_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payment", "0005_payment_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="refund_due",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,11 +1,22 @@
 from datetime import timedelta
+from typing import Optional
 
+from django.conf import settings
 from django.db import models
-from decimal import Decimal
 
 from django.utils import timezone
 
 from borrowing.models import Borrowing
+from payment.money import format_cents
+
+
+# How long a checkout session can be paid.
+SESSION_LIFETIME = timedelta(hours=24)
+
+# Fields placing a payment in its daily rollup row.
+ROLLUP_FIELDS = ("payment_type", "status", "money_to_pay_cents", "created_at")
+# Fields of a payment counted in the borrowing state of its user.
+STATE_FIELDS = ("user_id", "status", "borrowing_id_id")
 
 
 class Payment(models.Model):
@@ -28,21 +39,110 @@ class Payment(models.Model):
     borrowing_id = models.ForeignKey(
         Borrowing, on_delete=models.CASCADE, related_name="payments"
     )
+    # Copy of borrowing_id.user, so payments of a user are listed
+    # without joining the borrowings.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="payments",
+    )
     session_url = models.URLField(max_length=500, blank=True, null=True)
     session_id = models.CharField(max_length=500, blank=True, null=True)
-    money_to_pay = models.DecimalField(
-        max_digits=10, decimal_places=2, default=Decimal("0.00")
-    )
+    money_to_pay_cents = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     session_expiry = models.DateTimeField()
+    # Paid after its borrowing was cancelled, with no copy of the book
+    # left to reserve again: staff must refund it.
+    refund_due = models.BooleanField(default=False)
 
     def save(self, *args, **kwargs):
         if not self.id:
-            self.session_expiry = timezone.now() + timedelta(hours=24)
+            self.session_expiry = timezone.now() + SESSION_LIFETIME
+            if self.user_id is None:
+                self.user_id = self.borrowing_id.user_id
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        payment = super().from_db(db, field_names, values)
+        payment.loaded_rollup_values = payment.rollup_values()
+        payment.loaded_state_values = payment.state_values()
+        return payment
+
+    def rollup_values(self) -> Optional[dict]:
+        """
+        The values of ROLLUP_FIELDS, or None if some are not loaded.
+        Compared on save to move changed payments between rollup rows.
+        """
+        if self.get_deferred_fields().intersection(ROLLUP_FIELDS):
+            return None
+        return {field: getattr(self, field) for field in ROLLUP_FIELDS}
+
+    def state_values(self) -> Optional[dict]:
+        """
+        The values of STATE_FIELDS, or None if some are not loaded.
+        Compared on save to refresh the borrowing state of the user.
+        """
+        if self.get_deferred_fields().intersection(STATE_FIELDS):
+            return None
+        return {field: getattr(self, field) for field in STATE_FIELDS}
+
     def __str__(self):
-        return f"{self.payment_type} - {self.status} - {self.money_to_pay}"
+        return (
+            f"{self.payment_type} - {self.status} - "
+            f"{format_cents(self.money_to_pay_cents)}"
+        )
 
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["status", "session_expiry"],
+                name="payment_status_expiry_idx",
+            ),
+            models.Index(
+                fields=["status", "created_at"],
+                name="payment_status_created_idx",
+            ),
+            models.Index(fields=["user", "-id"], name="payment_user_id_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session_id"], name="payment_session_id_unique"
+            ),
+        ]
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    Number and amount of the payments created on ``day``,
+    by payment type and current status.
+
+    Kept up to date by the payment services on every status change,
+    so reports read one row per day instead of every payment.
+    """
+
+    day = models.DateField()
+    payment_type = models.CharField(
+        max_length=7, choices=Payment.PaymentType.choices
+    )
+    status = models.CharField(
+        max_length=7, choices=Payment.PaymentStatus.choices
+    )
+    count = models.IntegerField(default=0)
+    amount_cents = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return (
+            f"{self.day} {self.payment_type} {self.status}: "
+            f"{self.count} - {format_cents(self.amount_cents)}"
+        )
+
+    class Meta:
+        ordering = ["day", "payment_type", "status"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "payment_type", "status"],
+                name="payment_rollup_unique",
+            ),
+        ]
@@ -0,0 +1,28 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+# Money is kept as integer cents from the calculator to the database,
+# the Stripe payload and the reports. Decimals only appear at the API
+# and message edges.
+CENTS_PER_UNIT = 100
+_CENT = Decimal("0.01")
+
+
+def to_cents(amount: Decimal) -> int:
+    """Converts a decimal amount to cents, rounding half up."""
+    return int(
+        (Decimal(amount) * CENTS_PER_UNIT).quantize(
+            Decimal(1), rounding=ROUND_HALF_UP
+        )
+    )
+
+
+def from_cents(cents: int) -> Decimal:
+    """Converts cents to a decimal amount with two decimal places."""
+    return (Decimal(cents) / CENTS_PER_UNIT).quantize(_CENT)
+
+
+def format_cents(cents: int) -> str:
+    """Formats cents for messages, e.g. ``1050`` as ``10.50``."""
+    sign = "-" if cents < 0 else ""
+    units, cents = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{sign}{units}.{cents:02d}"
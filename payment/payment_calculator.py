@@ -1,25 +1,86 @@
-from decimal import Decimal
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Iterator, Optional, Union
+
+from django.db.models import QuerySet
+from django.utils import timezone
 
 from borrowing.models import Borrowing
 
+QUOTE_CHUNK_SIZE = 2000
+
 
-def calculate_total_price(borrowing: Borrowing) -> Decimal:
+def calculate_total_price(borrowing: Borrowing) -> int:
     """
-    Calculate the total price for borrowing a book.
+    Calculate the total price in cents for borrowing a book
+    at the daily fee of the book when it was borrowed.
     """
     delta = borrowing.expected_return_date - borrowing.borrow_date
     days_borrowed = delta.days
-    total_price = days_borrowed * borrowing.book.daily_fee
-    return Decimal(total_price)
+    return days_borrowed * borrowing.daily_fee_cents
 
 
-def calculate_fine(borrowing: Borrowing) -> Decimal:
+def calculate_fine(borrowing: Borrowing) -> int:
     """
-    Calculate the fine for overdue borrowing of a book.
+    Calculate the fine in cents for overdue borrowing of a book
+    with the fee and fine multiplier stored on the borrowing.
     """
-    fine_multiplier = 2
     days_overdue = (borrowing.actual_return_date
                     - borrowing.expected_return_date).days
-    daily_fee = borrowing.book.daily_fee
-    fine_amount = days_overdue * daily_fee * fine_multiplier
-    return Decimal(fine_amount)
+    return (
+        days_overdue * borrowing.daily_fee_cents * borrowing.fine_multiplier
+    )
+
+
+@dataclass(frozen=True)
+class BorrowingQuote:
+    """Price of a borrowing and its fine in cents, returned or projected."""
+
+    borrowing_id: int
+    total_price_cents: int
+    overdue_days: int
+    fine_cents: int
+
+
+def quote_borrowings(
+        borrowings: Union[QuerySet, Iterable[Borrowing]],
+        as_of: Optional[date] = None,
+) -> Iterator[BorrowingQuote]:
+    """
+    Quote the price and fine of many borrowings.
+
+    The dates, fees and fine multipliers stored on the borrowings are
+    read in one query, in chunks, without building model instances.
+    Borrowings not returned yet are quoted with the fine they would owe
+    if returned on ``as_of`` (today by default). Amounts are exact
+    integer cents.
+    """
+    as_of = as_of or timezone.localdate()
+    if not isinstance(borrowings, QuerySet):
+        borrowings = Borrowing.objects.filter(
+            pk__in=[borrowing.pk for borrowing in borrowings]
+        )
+    rows = borrowings.values_list(
+        "id",
+        "borrow_date",
+        "expected_return_date",
+        "actual_return_date",
+        "daily_fee_cents",
+        "fine_multiplier",
+    ).iterator(chunk_size=QUOTE_CHUNK_SIZE)
+
+    for (
+        borrowing_id,
+        borrowed,
+        expected,
+        returned,
+        daily_fee_cents,
+        fine_multiplier,
+    ) in rows:
+        overdue_days = max(((returned or as_of) - expected).days, 0)
+        yield BorrowingQuote(
+            borrowing_id=borrowing_id,
+            total_price_cents=(expected - borrowed).days * daily_fee_cents,
+            overdue_days=overdue_days,
+            fine_cents=overdue_days * daily_fee_cents * fine_multiplier,
+        )
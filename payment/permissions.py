@@ -9,4 +9,4 @@ class IsAdminOrOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user and request.user.is_staff:
             return True
-        return obj.borrowing_id.user == request.user
+        return obj.user_id == request.user.id
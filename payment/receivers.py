@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from payment.expiry import schedule_expiry
+from payment.models import Payment
+from payment.rollups import (
+    record_payment_created,
+    record_payment_deleted,
+    record_payment_saved,
+)
+
+
+@receiver(
+    post_save, sender=Payment, dispatch_uid="add_payment_to_rollup"
+)
+def add_payment_to_rollup(sender, instance, created, raw=False, **kwargs):
+    """
+    Counts a new payment in the daily rollup, or moves a saved payment
+    whose status, type or amount changed. Status changes made with
+    ``QuerySet.update()`` are recorded by the payment services.
+    """
+    if raw:
+        return
+    if created:
+        record_payment_created(instance)
+    else:
+        record_payment_saved(
+            instance, getattr(instance, "loaded_rollup_values", None)
+        )
+    instance.loaded_rollup_values = instance.rollup_values()
+
+
+@receiver(
+    post_save, sender=Payment, dispatch_uid="schedule_payment_expiry"
+)
+def schedule_payment_expiry(sender, instance, created, raw=False, **kwargs):
+    """
+    Puts a new pending payment in the bucket of the minute its session
+    is over, drained by ``payment.tasks.expire_due_payments``.
+    """
+    pending = instance.status == Payment.PaymentStatus.PENDING
+    if created and not raw and pending:
+        schedule_expiry(instance.pk, instance.session_expiry)
+
+
+@receiver(
+    post_delete, sender=Payment, dispatch_uid="remove_payment_from_rollup"
+)
+def remove_payment_from_rollup(sender, instance, **kwargs):
+    record_payment_deleted(instance)
@@ -0,0 +1,209 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from payment.models import Payment, PaymentDailyRollup
+
+GRANULARITY_DAY = "day"
+GRANULARITY_MONTH = "month"
+GRANULARITIES = (GRANULARITY_DAY, GRANULARITY_MONTH)
+
+
+def rollup_day(payment: Payment) -> date:
+    """The day of the rollup row a payment is counted in."""
+    return timezone.localdate(payment.created_at)
+
+
+def _add_on_commit(
+        day: date,
+        payment_type: str,
+        status: str,
+        count: int,
+        amount_cents: int,
+) -> None:
+    """
+    Applies a rollup change once the current transaction commits.
+
+    The rollup row is then updated in its own short transaction, so
+    concurrent payment transactions never wait on the shared row.
+    A failure leaves the rollup off until it is rebuilt, it never
+    fails the payment change.
+    """
+    transaction.on_commit(
+        lambda: _add(day, payment_type, status, count, amount_cents),
+        robust=True,
+    )
+
+
+def _add(
+        day: date,
+        payment_type: str,
+        status: str,
+        count: int,
+        amount_cents: int,
+) -> None:
+    """
+    Adds ``count`` payments of ``amount_cents`` in total to a rollup row.
+    """
+    key = {"day": day, "payment_type": payment_type, "status": status}
+    for _ in range(2):
+        if PaymentDailyRollup.objects.filter(**key).update(
+            count=F("count") + count,
+            amount_cents=F("amount_cents") + amount_cents,
+        ):
+            return
+        try:
+            with transaction.atomic():
+                PaymentDailyRollup.objects.create(
+                    **key, count=count, amount_cents=amount_cents
+                )
+            return
+        except IntegrityError:
+            # Created by a concurrent transaction, update it instead.
+            continue
+    raise IntegrityError(f"Could not update the payment rollup of {key}")
+
+
+def record_payment_created(payment: Payment) -> None:
+    _add_on_commit(
+        rollup_day(payment),
+        payment.payment_type,
+        payment.status,
+        1,
+        payment.money_to_pay_cents,
+    )
+
+
+def record_payment_deleted(payment: Payment) -> None:
+    _add_on_commit(
+        rollup_day(payment),
+        payment.payment_type,
+        payment.status,
+        -1,
+        -payment.money_to_pay_cents,
+    )
+
+
+def record_status_change(
+        payment: Payment, old_status: str, new_status: str
+) -> None:
+    """
+    Moves a payment from the rollup row of its old status to the one
+    of its new status once the transaction changing the status commits.
+    For status changes made with ``QuerySet.update()``, changes saved
+    on the model are followed by ``record_payment_saved``.
+    """
+    day = rollup_day(payment)
+    amount_cents = payment.money_to_pay_cents
+    _add_on_commit(day, payment.payment_type, old_status, -1, -amount_cents)
+    _add_on_commit(day, payment.payment_type, new_status, 1, amount_cents)
+
+
+def record_status_changes(
+        payments: list, old_status: str, new_status: str
+) -> None:
+    """
+    ``record_status_change`` for many payments, with one change
+    per rollup row.
+    """
+    totals = {}
+    for payment in payments:
+        key = (rollup_day(payment), payment.payment_type)
+        count, amount_cents = totals.get(key, (0, 0))
+        totals[key] = (count + 1, amount_cents + payment.money_to_pay_cents)
+    for (day, payment_type), (count, amount_cents) in totals.items():
+        _add_on_commit(day, payment_type, old_status, -count, -amount_cents)
+        _add_on_commit(day, payment_type, new_status, count, amount_cents)
+
+
+def record_payment_saved(
+        payment: Payment, old_values: Optional[dict]
+) -> None:
+    """
+    Moves a saved payment to another rollup row if its status, type,
+    amount or day changed since it was loaded with ``old_values``
+    (e.g. when edited in the admin).
+    """
+    new_values = payment.rollup_values()
+    if old_values is None or new_values is None:
+        return
+    if old_values == new_values:
+        return
+    record_payment_deleted(Payment(**old_values))
+    record_payment_created(payment)
+
+
+def rebuild_rollups(
+        start: Optional[date] = None, end: Optional[date] = None
+) -> int:
+    """
+    Recomputes the rollup rows of the days from ``start`` to ``end``
+    (both included, all days by default) from the payments.
+
+    Returns the number of rollup rows written.
+    """
+    payments = Payment.objects.all()
+    rollups = PaymentDailyRollup.objects.all()
+    if start:
+        payments = payments.filter(created_at__gte=_day_start(start))
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        payments = payments.filter(
+            created_at__lt=_day_start(end + timedelta(days=1))
+        )
+        rollups = rollups.filter(day__lte=end)
+
+    totals = (
+        payments.annotate(day=TruncDate("created_at"))
+        .values("day", "payment_type", "status")
+        .annotate(
+            count=Count("id"), amount_cents=Sum("money_to_pay_cents")
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = PaymentDailyRollup.objects.bulk_create(
+            PaymentDailyRollup(**row) for row in totals
+        )
+    return len(created)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def paid_totals(start: date, end: date) -> tuple[int, int]:
+    """
+    Number and amount in cents of the paid payments
+    created from start to end.
+    """
+    totals = PaymentDailyRollup.objects.filter(
+        status=Payment.PaymentStatus.PAID, day__gte=start, day__lte=end
+    ).aggregate(count=Sum("count"), amount_cents=Sum("amount_cents"))
+    return totals["count"] or 0, totals["amount_cents"] or 0
+
+
+def payment_stats(
+        start: date, end: date, granularity: str = GRANULARITY_DAY
+) -> list[dict]:
+    """
+    Number and amount in cents of the payments created from ``start``
+    to ``end`` per day or month, payment type and status.
+    """
+    rollups = PaymentDailyRollup.objects.filter(
+        day__gte=start, day__lte=end
+    ).exclude(count=0)
+    if granularity == GRANULARITY_MONTH:
+        rollups = rollups.annotate(period=TruncMonth("day"))
+    else:
+        rollups = rollups.annotate(period=F("day"))
+    return list(
+        rollups.values("period", "payment_type", "status")
+        .annotate(count=Sum("count"), amount_cents=Sum("amount_cents"))
+        .order_by("period", "payment_type", "status")
+    )
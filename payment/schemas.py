@@ -1,14 +1,19 @@
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
+    inline_serializer,
     OpenApiParameter,
     OpenApiResponse,
 )
 from payment.serializers import (
     PaymentSerializer,
     PaymentListSerializer,
+    PaymentStatsSerializer,
+    PaymentQuoteRequestSerializer,
+    BorrowingQuoteSerializer,
 )
-from rest_framework import status
+from rest_framework import serializers, status
 
 
 payment_list_create_view_schema = extend_schema_view(
@@ -50,11 +55,23 @@ payment_detail_view_schema = extend_schema_view(
     )
 )
 
+payment_session_view_schema = extend_schema(
+    description="Create a new checkout session for an unpaid fine of the user, e.g. when none could be created on return, and redirect to it.",
+    request=None,
+    responses={
+        status.HTTP_303_SEE_OTHER: OpenApiResponse(description="Redirect to the checkout session"),
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Payment already has a checkout session or it could not be created"),
+        status.HTTP_404_NOT_FOUND: OpenApiResponse(description="Payment not found"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(description="Payments are temporarily unavailable"),
+    },
+)
+
 payment_success_view_schema = extend_schema(
-    description="Verify payment status and update the payment record.",
+    description="Report the state of the payment of a checkout session, as recorded by the Stripe webhook.",
     responses={
         status.HTTP_200_OK: OpenApiResponse(description="Payment was successful"),
-        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Bad request or payment failed"),
+        status.HTTP_202_ACCEPTED: OpenApiResponse(description="Payment is being processed"),
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="No session ID provided or payment session has expired"),
         status.HTTP_404_NOT_FOUND: OpenApiResponse(description="Payment not found"),
     },
 )
@@ -65,3 +82,88 @@ payment_cancel_view_schema = extend_schema(
         status.HTTP_200_OK: OpenApiResponse(description="Payment canceled"),
     },
 )
+
+payment_webhook_view_schema = extend_schema(
+    description="Receive signed Stripe events. checkout.session.completed marks the payment as paid, checkout.session.expired as expired.",
+    request=None,
+    parameters=[
+        OpenApiParameter(
+            name="Stripe-Signature",
+            description="Signature of the event computed by Stripe",
+            required=True,
+            type=str,
+            location=OpenApiParameter.HEADER
+        ),
+    ],
+    responses={
+        status.HTTP_200_OK: OpenApiResponse(description="Event received"),
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Invalid payload or signature"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(description="Webhook secret is not configured"),
+    },
+)
+
+payment_metrics_view_schema = extend_schema(
+    description="Report the state and counters of the checkout circuit breaker of the serving process (staff only).",
+    responses={
+        status.HTTP_200_OK: OpenApiResponse(description="Circuit breaker state"),
+        status.HTTP_403_FORBIDDEN: OpenApiResponse(description="Staff only"),
+    },
+)
+
+payment_stats_view_schema = extend_schema(
+    description="Number and amount of payments per day or month, payment type and status, read from the daily payment rollup (staff only).",
+    parameters=[
+        OpenApiParameter(
+            name="from",
+            description="First day of the period (YYYY-MM-DD), 29 days before `to` by default",
+            required=False,
+            type=OpenApiTypes.DATE,
+        ),
+        OpenApiParameter(
+            name="to",
+            description="Last day of the period (YYYY-MM-DD), today by default",
+            required=False,
+            type=OpenApiTypes.DATE,
+        ),
+        OpenApiParameter(
+            name="granularity",
+            description="Group the stats by day or month",
+            required=False,
+            type=str,
+            enum=["day", "month"],
+            default="day",
+        ),
+    ],
+    responses={
+        status.HTTP_200_OK: inline_serializer(
+            name="PaymentStatsResponse",
+            fields={
+                "from": serializers.DateField(),
+                "to": serializers.DateField(),
+                "granularity": serializers.CharField(),
+                "results": PaymentStatsSerializer(many=True),
+            },
+        ),
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Invalid period or granularity"),
+        status.HTTP_403_FORBIDDEN: OpenApiResponse(description="Staff only"),
+    },
+)
+
+payment_quote_view_schema = extend_schema(
+    description="Quote the price and fine of borrowings listed by id, or of all active borrowings. Borrowings not returned yet are quoted with the fine they would owe if returned on `as_of` (today by default). `totals_only` omits the per-borrowing results and is required when quoting all active borrowings; per-borrowing results are returned for at most 10000 listed ids (staff only).",
+    request=PaymentQuoteRequestSerializer,
+    responses={
+        status.HTTP_200_OK: inline_serializer(
+            name="PaymentQuoteResponse",
+            fields={
+                "as_of": serializers.DateField(),
+                "count": serializers.IntegerField(),
+                "total_price": serializers.DecimalField(max_digits=14, decimal_places=2),
+                "total_fine": serializers.DecimalField(max_digits=14, decimal_places=2),
+                "results": BorrowingQuoteSerializer(many=True, required=False),
+            },
+        ),
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="No borrowings selected or invalid data"),
+        status.HTTP_403_FORBIDDEN: OpenApiResponse(description="Staff only"),
+    },
+)
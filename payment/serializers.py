@@ -1,9 +1,20 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
+from payment.fields import CentsField
 from payment.models import Payment
+from payment.rollups import GRANULARITIES, GRANULARITY_DAY
+
+QUOTE_MAX_BORROWING_IDS = 10000
 
 
 class PaymentSerializer(serializers.ModelSerializer):
+    money_to_pay = CentsField(
+        source="money_to_pay_cents", max_digits=10, read_only=True
+    )
+
     class Meta:
         model = Payment
         fields = [
@@ -14,10 +25,15 @@ class PaymentSerializer(serializers.ModelSerializer):
             "session_url",
             "session_id",
             "money_to_pay",
+            "refund_due",
         ]
 
 
 class PaymentListSerializer(serializers.ModelSerializer):
+    money_to_pay = CentsField(
+        source="money_to_pay_cents", max_digits=10, read_only=True
+    )
+
     class Meta:
         model = Payment
         fields = [
@@ -27,3 +43,77 @@ class PaymentListSerializer(serializers.ModelSerializer):
             "money_to_pay",
             "session_url"
         ]
+
+
+class PaymentStatsQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the payment stats, the last 30 days by default.
+    """
+
+    from_ = serializers.DateField(required=False)
+    to = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(
+        choices=GRANULARITIES, default=GRANULARITY_DAY
+    )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = fields.pop("from_")
+        return fields
+
+    def validate(self, attrs):
+        attrs.setdefault("to", timezone.localdate())
+        attrs.setdefault("from", attrs["to"] - timedelta(days=29))
+        if attrs["from"] > attrs["to"]:
+            raise serializers.ValidationError(
+                {"from": "Must not be after the end of the period."}
+            )
+        return attrs
+
+
+class PaymentStatsSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    payment_type = serializers.ChoiceField(
+        choices=Payment.PaymentType.choices
+    )
+    status = serializers.ChoiceField(choices=Payment.PaymentStatus.choices)
+    count = serializers.IntegerField()
+    amount = CentsField(source="amount_cents")
+
+
+class PaymentQuoteRequestSerializer(serializers.Serializer):
+    """Borrowings to quote: listed by id, or all active ones."""
+
+    borrowing_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=QUOTE_MAX_BORROWING_IDS,
+    )
+    active = serializers.BooleanField(default=False)
+    as_of = serializers.DateField(required=False)
+    totals_only = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs.get("borrowing_ids") and not attrs["active"]:
+            raise serializers.ValidationError(
+                "Provide borrowing_ids or set active to true."
+            )
+        # Per-borrowing results are only returned for listed ids, which
+        # are capped, never for every active borrowing of the library.
+        if not attrs.get("borrowing_ids") and not attrs["totals_only"]:
+            raise serializers.ValidationError(
+                {
+                    "totals_only": "Must be true unless borrowing_ids "
+                    "are provided."
+                }
+            )
+        attrs.setdefault("as_of", timezone.localdate())
+        return attrs
+
+
+class BorrowingQuoteSerializer(serializers.Serializer):
+    borrowing_id = serializers.IntegerField()
+    total_price = CentsField(source="total_price_cents")
+    overdue_days = serializers.IntegerField()
+    fine = CentsField(source="fine_cents")
@@ -1,65 +1,356 @@
-from decimal import Decimal
+import uuid
 from typing import Optional
 
-import stripe
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.request import Request
 from rest_framework.reverse import reverse
-from stripe.api_resources.checkout import Session
 
 from borrowing.models import Borrowing
-from payment.models import Payment
+from borrowing.services import (
+    confirm_borrowing,
+    lock_borrowing_state,
+    refresh_borrowing_state,
+    reinstate_borrowing,
+)
+from notification.dispatcher import notify
+from payment.circuit_breaker import (
+    CircuitOpenError,
+    call_with_retries,
+    get_checkout_breaker,
+)
+from payment.exceptions import PaymentsUnavailable
+from payment.expiry import EXPIRY_BATCH_SIZE, schedule_expiry
+from payment.gateways import (
+    CheckoutSession,
+    PaymentGatewayError,
+    get_payment_gateway,
+)
+from payment.models import SESSION_LIFETIME, Payment
+from payment.money import format_cents
+from payment.rollups import record_status_change, record_status_changes
+from payment.signals import payment_expired
 
 
 def create_stripe_session_for_borrowing(
         borrowing: Borrowing,
         request: Request,
-        total_price: Decimal,
+        total_price_cents: int,
         payment_type: str
-) -> Optional[Session]:
+) -> Optional[CheckoutSession]:
     """
-    Create a Stripe session and Payment for borrowing a book.
+    Create a checkout session and Payment for borrowing a book
+    with the configured payment gateway.
+
+    Transient gateway errors are retried with jittered backoff under
+    one Stripe idempotency key, so a retry never creates a second
+    session. Returns None if the session could not be created and
+    raises PaymentsUnavailable while the checkout circuit is open.
     """
-    stripe.api_key = settings.STRIPE_SECRET_KEY
+    session = _create_checkout_session(borrowing, request, total_price_cents)
+    if session is None:
+        return None
 
-    try:
-        success_url = request.build_absolute_uri(
-            reverse("payment:payment-success")
-        )
-        cancel_url = request.build_absolute_uri(
-            reverse("payment:payment-cancel")
-        )
+    Payment.objects.create(
+        status=Payment.PaymentStatus.PENDING,
+        payment_type=payment_type,
+        borrowing_id=borrowing,
+        session_url=session.url,
+        session_id=session.id,
+        money_to_pay_cents=total_price_cents,
+        user_id=borrowing.user_id,
+    )
 
-        session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=[
-                {
-                    "price_data": {
-                        "currency": "usd",
-                        "product_data": {
-                            "name": borrowing.book.title,
-                        },
-                        "unit_amount": int(total_price * 100),
-                    },
-                    "quantity": 1,
-                }
-            ],
-            mode="payment",
-            success_url=f"{success_url}?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{cancel_url}?borrowing_id={borrowing.id}",
-        )
+    return session
+
+
+def record_fine(borrowing: Borrowing, fine_cents: int) -> Payment:
+    """
+    Record the fine of a late return as a pending payment without
+    a checkout session. Call it in the transaction of the return, so
+    the fine is owed even if no session can be created afterwards.
+    """
+    return Payment.objects.create(
+        status=Payment.PaymentStatus.PENDING,
+        payment_type=Payment.PaymentType.FINE,
+        borrowing_id=borrowing,
+        money_to_pay_cents=fine_cents,
+        user_id=borrowing.user_id,
+    )
+
+
+def can_start_session(payment: Payment) -> bool:
+    """
+    A fine without a checkout session, or whose session expired,
+    can get a new one.
+    """
+    if payment.payment_type != Payment.PaymentType.FINE:
+        return False
+    if payment.status == Payment.PaymentStatus.EXPIRED:
+        return True
+    return (
+        payment.status == Payment.PaymentStatus.PENDING
+        and not payment.session_id
+    )
+
+
+def start_payment_session(
+        payment: Payment, request: Request
+) -> Optional[CheckoutSession]:
+    """
+    Create a checkout session for a recorded payment, see
+    ``can_start_session``, and make the payment pending on it.
 
-        Payment.objects.create(
+    Returns None if the session could not be created or the payment
+    changed meanwhile, and raises PaymentsUnavailable while the
+    checkout circuit is open.
+    """
+    session = _create_checkout_session(
+        payment.borrowing_id, request, payment.money_to_pay_cents
+    )
+    if session is None:
+        return None
+
+    session_expiry = timezone.now() + SESSION_LIFETIME
+    with transaction.atomic():
+        started = Payment.objects.filter(
+            pk=payment.pk,
+            status=payment.status,
+            session_id=payment.session_id,
+        ).update(
             status=Payment.PaymentStatus.PENDING,
-            payment_type=payment_type,
-            borrowing_id=borrowing,
             session_url=session.url,
             session_id=session.id,
-            money_to_pay=total_price,
+            session_expiry=session_expiry,
         )
+        if not started:
+            return None
+        schedule_expiry(payment.pk, session_expiry)
+        if payment.status != Payment.PaymentStatus.PENDING:
+            record_status_change(
+                payment, payment.status, Payment.PaymentStatus.PENDING
+            )
+    return session
+
 
-        return session
+def _create_checkout_session(
+        borrowing: Borrowing, request: Request, amount_cents: int
+) -> Optional[CheckoutSession]:
+    success_url = request.build_absolute_uri(
+        reverse("payment:payment-success")
+    )
+    cancel_url = request.build_absolute_uri(
+        reverse("payment:payment-cancel")
+    )
+    idempotency_key = f"checkout-{borrowing.id}-{uuid.uuid4().hex}"
+
+    def create_session():
+        return get_payment_gateway().create_checkout_session(
+            name=borrowing.book.title,
+            amount_cents=amount_cents,
+            success_url=f"{success_url}?session_id={{CHECKOUT_SESSION_ID}}",
+            cancel_url=f"{cancel_url}?borrowing_id={borrowing.id}",
+            idempotency_key=idempotency_key,
+        )
 
-    except Exception as e:
-        print(f"Error creating Stripe session: {e}")
+    try:
+        session = call_with_retries(
+            create_session,
+            get_checkout_breaker(),
+            attempts=settings.PAYMENT_RETRY_ATTEMPTS,
+            base_delay=settings.PAYMENT_RETRY_BASE_DELAY,
+            max_delay=settings.PAYMENT_RETRY_MAX_DELAY,
+        )
+    except CircuitOpenError:
+        raise PaymentsUnavailable()
+    except PaymentGatewayError as e:
+        print(f"Error creating payment session: {e}")
         return None
+    return session
+
+
+def mark_payment_paid(session_id: str) -> bool:
+    """
+    Mark the payment of a completed checkout session as paid
+    and activate its borrowing.
+
+    A borrowing cancelled because the payment came too late is
+    reinstated if a copy of the book is left, else the payment is
+    flagged for a refund. The update is conditional, so replayed or
+    out of order events change nothing. Returns False if no payment
+    was updated.
+    """
+    with transaction.atomic():
+        payment = (
+            Payment.objects.select_for_update(of=("self",))
+            .select_related("borrowing_id__user")
+            .filter(
+                session_id=session_id,
+                status__in=(
+                    Payment.PaymentStatus.PENDING,
+                    Payment.PaymentStatus.EXPIRED,
+                ),
+            )
+            .first()
+        )
+        if payment is None:
+            return False
+        paid = Payment.objects.filter(
+            pk=payment.pk, status=payment.status
+        ).update(status=Payment.PaymentStatus.PAID)
+        if not paid:
+            return False
+        record_status_change(
+            payment, payment.status, Payment.PaymentStatus.PAID
+        )
+        lock_borrowing_state(payment.user_id)
+
+        refund_due = False
+        if payment.payment_type == Payment.PaymentType.PAYMENT:
+            if payment.borrowing_id.status == (
+                Borrowing.BorrowingStatus.CANCELLED
+            ):
+                refund_due = not reinstate_borrowing(payment.borrowing_id_id)
+            else:
+                confirm_borrowing(payment.borrowing_id_id)
+        if refund_due:
+            Payment.objects.filter(pk=payment.pk).update(refund_due=True)
+        refresh_borrowing_state(payment.user_id)
+
+        message = (
+            f"💸 Payment (ID: {payment.id}) was successful\n"
+            f"Borrowing ID: {payment.borrowing_id_id}\n"
+            f"User: {payment.borrowing_id.user}\n"
+            f"Money: {format_cents(payment.money_to_pay_cents)}$"
+        )
+        if refund_due:
+            # Sent right away, staff has to act on it.
+            notify(
+                f"{message}\n"
+                "⚠️ Its borrowing was cancelled and no copy is left, "
+                "refund it."
+            )
+        else:
+            notify(
+                message,
+                event="Payments",
+                item=payment.get_payment_type_display(),
+            )
+    return True
+
+
+def _expire(**filters) -> int:
+    """
+    Mark the pending payments matching ``filters`` as expired with one
+    UPDATE and send ``payment_expired`` for each of them once the change
+    is committed. Returns the number of expired payments.
+    """
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update()
+            .filter(status=Payment.PaymentStatus.PENDING, **filters)
+            .only(
+                "payment_type", "money_to_pay_cents", "created_at", "user_id"
+            )
+            .order_by("pk")
+        )
+        if not payments:
+            return 0
+        payment_ids = [payment.pk for payment in payments]
+        Payment.objects.filter(pk__in=payment_ids).update(
+            status=Payment.PaymentStatus.EXPIRED
+        )
+        record_status_changes(
+            payments,
+            Payment.PaymentStatus.PENDING,
+            Payment.PaymentStatus.EXPIRED,
+        )
+        for user_id in sorted({payment.user_id for payment in payments}):
+            refresh_borrowing_state(user_id)
+        transaction.on_commit(lambda: _send_payments_expired(payment_ids))
+    return len(payments)
+
+
+def _send_payments_expired(payment_ids: list[int]) -> None:
+    payments = Payment.objects.select_related("borrowing_id").filter(
+        pk__in=payment_ids
+    )
+    for payment in payments:
+        # One failing receiver must not keep the other payments.
+        for _, result in payment_expired.send_robust(
+                sender=Payment, payment=payment
+        ):
+            if isinstance(result, Exception):
+                print(f"Error handling expired payment {payment.pk}: {result}")
+
+
+def expire_payment(payment_id: int) -> bool:
+    """
+    Expire a pending payment if its session expiry time has passed.
+    """
+    return bool(expire_payments([payment_id]))
+
+
+def expire_payments(payment_ids: list[int]) -> int:
+    """
+    Expire the given pending payments whose session expiry time
+    has passed, e.g. a batch taken from the expiry buckets.
+    """
+    return _expire(pk__in=payment_ids, session_expiry__lte=timezone.now())
+
+
+def expire_overdue_payments(batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """
+    Expire every pending payment whose session expiry time has passed,
+    in batches read from the (status, session_expiry) index.
+    """
+    expired = 0
+    while True:
+        payment_ids = list(
+            Payment.objects.filter(
+                status=Payment.PaymentStatus.PENDING,
+                session_expiry__lte=timezone.now(),
+            )
+            .order_by("session_expiry")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not payment_ids:
+            return expired
+        expired += expire_payments(payment_ids)
+
+
+def mark_payment_expired(session_id: str) -> bool:
+    """
+    Mark the payment of an expired checkout session as expired,
+    unless it was paid already.
+    """
+    return bool(_expire(session_id=session_id))
+
+
+PAID_EVENTS = (
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+)
+EXPIRED_EVENTS = (
+    "checkout.session.expired",
+    "checkout.session.async_payment_failed",
+)
+
+
+def handle_stripe_event(event: dict) -> bool:
+    """
+    Apply a verified Stripe webhook event to the local payments.
+
+    Returns True if a payment was updated.
+    """
+    session = event["data"]["object"]
+    if event["type"] in PAID_EVENTS:
+        # Delayed payment methods complete the session before
+        # the money arrives and send async_payment_succeeded later.
+        if session.get("payment_status") == "unpaid":
+            return False
+        return mark_payment_paid(session["id"])
+    if event["type"] in EXPIRED_EVENTS:
+        return mark_payment_expired(session["id"])
+    return False
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent once the transaction that expired a pending payment commits,
+# with the expired ``payment``.
+payment_expired = Signal()
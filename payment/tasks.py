@@ -1,86 +1,68 @@
 from datetime import timedelta
-from decimal import Decimal
 
 from celery import shared_task
-from django.db.models import Sum, Count
 from django.utils import timezone
-from payment.models import Payment
-from botSend import send_message
+from payment.money import format_cents
+from payment.rollups import paid_totals
+from payment.expiry import take_due_payments
+from payment.services import expire_overdue_payments, expire_payments
+from notification.dispatcher import notify
 
 
 @shared_task
-def check_stripe_sessions():
+def expire_due_payments():
     """
-    Update the status of expired Stripe payment sessions.
+    Expire the pending payments whose Stripe session is over, from the
+    expiry buckets of the past minutes, with one UPDATE per batch.
     """
-    now = timezone.now()
-    Payment.objects.filter(
-        status=Payment.PaymentStatus.PENDING, session_expiry__lt=now
-    ).update(status=Payment.PaymentStatus.EXPIRED)
+    for payment_ids in take_due_payments():
+        expire_payments(payment_ids)
 
 
 @shared_task
-def daily_payment_report():
+def check_stripe_sessions():
     """
-    Retrieve payments created today, calculate the total amount and count,
-    and return a formatted string.
+    Safety sweep expiring the pending payments whose Stripe session
+    is over but which were missed by the expiry buckets, e.g. when
+    Redis was unavailable. Reads the (status, session_expiry) index.
     """
-    today = timezone.now().date()
+    expire_overdue_payments()
 
-    aggregate_data = Payment.objects.filter(
-        status=Payment.PaymentStatus.PAID, created_at__date=today
-    ).aggregate(total=Sum("money_to_pay"), count=Count("id"))
 
-    total_amount = Decimal(aggregate_data.get("total", "0.00")).quantize(
-        Decimal("0.01")
-    )
-
-    total_count = aggregate_data.get("count", 0)
+@shared_task
+def daily_payment_report():
+    """
+    Send the number and amount of the paid payments created today
+    to the Telegram bot, read from the daily payment rollup.
+    """
+    today = timezone.localdate()
+    total_count, total_cents = paid_totals(today, today)
     message = (
-        f"Payments per day: {Decimal(total_count, )}\n"
-        f"Amount: {total_amount} $\n"
+        f"Payments per day: {total_count}\n"
+        f"Amount: {format_cents(total_cents)} $\n"
         f"{today}"
     )
-    send_message(message)
+    notify(message)
 
 
 @shared_task
 def monthly_payment_report():
     """
-    Retrieve payments created in the previous month,
-    calculate the total amount and count,
-    send a message to the Telegram bot.
+    Send the number and amount of the paid payments created
+    in the previous month to the Telegram bot,
+    read from the daily payment rollup.
     """
-    # Get the first day of the previous month
-    today = timezone.now()
-    previous_month = today.replace(day=1) - timedelta(days=1)
-    previous_month_start = previous_month.replace(day=1)
-
-    # Get the last day of the previous month
-    if previous_month.month == 12:
-        previous_month_end = previous_month.replace(day=31)
-    else:
-        previous_month_end = previous_month.replace(
-            month=previous_month.month + 1, day=1
-        ) - timedelta(days=1)
-
-    # Retrieve payments created in the previous month
-    payments_previous_month = Payment.objects.filter(
-        status=Payment.PaymentStatus.PAID,
-        created_at__gte=previous_month_start,
-        created_at__lte=previous_month_end,
+    previous_month_end = timezone.localdate().replace(day=1) - timedelta(
+        days=1
     )
-
-    # Calculate the total amount and count of payments
-    total_payments = payments_previous_month.count()
-    total_amount = sum(
-        payment.money_to_pay for payment in payments_previous_month
+    previous_month_start = previous_month_end.replace(day=1)
+    total_count, total_cents = paid_totals(
+        previous_month_start, previous_month_end
     )
 
-    # Send a message to the Telegram bot
     message = (
-        f"Monthly report for {previous_month.strftime('%B %Y')}\n"
-        f"Payments per month: {total_payments}\n"
-        f"Amount: {total_amount} $"
+        f"Monthly report for {previous_month_end.strftime('%B %Y')}\n"
+        f"Payments per month: {total_count}\n"
+        f"Amount: {format_cents(total_cents)} $"
     )
-    send_message(message)
+    notify(message)
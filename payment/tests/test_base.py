@@ -0,0 +1,70 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import fakeredis
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from borrowing.models import Borrowing
+from payment.models import Payment
+
+User = get_user_model()
+
+
+class PaymentFixtureMixin:
+    """
+    A user with a borrowing awaiting payment. Notifications are patched
+    out and the payment expiry buckets live in a fake Redis.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Patched first: creating the borrowing notifies on commit.
+        notify = patch("payment.services.notify")
+        self.notify = notify.start()
+        self.addCleanup(notify.stop)
+        borrowing_notify = patch("borrowing.signals.notify")
+        borrowing_notify.start()
+        self.addCleanup(borrowing_notify.stop)
+        self.redis = fakeredis.FakeRedis()
+        get_redis = patch(
+            "payment.expiry.get_redis", return_value=self.redis
+        )
+        get_redis.start()
+        self.addCleanup(get_redis.stop)
+
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password"
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover=Book.Covers.HARD,
+            inventory=10,
+            daily_fee=Decimal("1.00"),
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date="2024-01-10",
+            status=Borrowing.BorrowingStatus.AWAITING_PAYMENT,
+        )
+
+    def create_payment(
+            self,
+            amount_cents: int = 1000,
+            payment_type: str = Payment.PaymentType.PAYMENT,
+            **kwargs
+    ) -> Payment:
+        kwargs.setdefault("session_id", f"cs_test_{Payment.objects.count()}")
+        return Payment.objects.create(
+            payment_type=payment_type,
+            borrowing_id=self.borrowing,
+            money_to_pay_cents=amount_cents,
+            **kwargs
+        )
+
+
+class BasePaymentTest(PaymentFixtureMixin, APITestCase):
+    pass
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from borrowing.models import Borrowing
+from payment.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    call_with_retries,
+    get_checkout_breaker,
+)
+from payment.gateways import PaymentGatewayError
+
+User = get_user_model()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "test", failure_threshold=2, reset_timeout=10, clock=self.clock
+        )
+        self.sleeps = []
+
+    def fail(self, retryable=True):
+        raise PaymentGatewayError("failure", retryable=retryable)
+
+    def call(self, func, attempts=1):
+        return call_with_retries(
+            func,
+            self.breaker,
+            attempts=attempts,
+            base_delay=0.1,
+            max_delay=0.3,
+            sleep=self.sleeps.append,
+        )
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        for _ in range(2):
+            with self.assertRaises(PaymentGatewayError):
+                self.call(self.fail)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        func = MagicMock()
+        with self.assertRaises(CircuitOpenError):
+            self.call(func)
+        func.assert_not_called()
+        self.assertEqual(self.breaker.snapshot()["rejected"], 1)
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(2):
+            self.breaker.allow_request()
+            self.breaker.record_failure()
+        self.clock.now = 10
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        with self.assertRaises(PaymentGatewayError):
+            self.call(self.fail)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()["opened"], 2)
+
+    def test_retries_are_bounded_with_jittered_backoff(self):
+        breaker = CircuitBreaker("test", failure_threshold=10, reset_timeout=1)
+        self.breaker = breaker
+        func = MagicMock(
+            side_effect=PaymentGatewayError("failure", retryable=True)
+        )
+        with self.assertRaises(PaymentGatewayError):
+            self.call(func, attempts=4)
+
+        self.assertEqual(func.call_count, 4)
+        self.assertEqual(len(self.sleeps), 3)
+        for attempt, delay in enumerate(self.sleeps):
+            self.assertLessEqual(delay, min(0.3, 0.1 * 2 ** attempt))
+        self.assertEqual(breaker.snapshot()["retries"], 3)
+
+    def test_retry_succeeds(self):
+        func = MagicMock(
+            side_effect=[PaymentGatewayError("timeout", retryable=True), "ok"]
+        )
+        self.assertEqual(self.call(func, attempts=3), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_permanent_errors_are_not_retried(self):
+        func = MagicMock(
+            side_effect=PaymentGatewayError("bad request", retryable=False)
+        )
+        with self.assertRaises(PaymentGatewayError):
+            self.call(func, attempts=3)
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(self.breaker.snapshot()["consecutive_failures"], 0)
+
+
+@override_settings(
+    FAKE_PAYMENT_GATEWAY_FAILURE_RATE=1,
+    PAYMENT_CIRCUIT_FAILURE_THRESHOLD=3,
+)
+class CheckoutCircuitBreakerTests(APITestCase):
+
+    def setUp(self):
+        get_checkout_breaker.cache_clear()
+        self.addCleanup(get_checkout_breaker.cache_clear)
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password"
+        )
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover=Book.Covers.HARD,
+            inventory=10,
+            daily_fee=Decimal("1.00"),
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_borrowing(self):
+        return self.client.post(
+            reverse("borrowing-list-create"),
+            {
+                "book": self.book.id,
+                "expected_return_date": (
+                    timezone.now() + timedelta(days=7)
+                ).date(),
+            },
+            format="json",
+        )
+
+    def test_open_circuit_fails_fast_with_503(self):
+        response = self.create_borrowing()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch(
+            "payment.gateways.FakeGateway.create_checkout_session"
+        ) as create:
+            response = self.create_borrowing()
+        create.assert_not_called()
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(response.data["detail"].code, "payments_unavailable")
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 10)
+        self.assertFalse(
+            Borrowing.objects.exclude(
+                status=Borrowing.BorrowingStatus.CANCELLED
+            ).exists()
+        )
+
+    def test_metrics_report_breaker_state(self):
+        self.create_borrowing()
+
+        response = self.client.get(reverse("payment:payment-metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin_user)
+        response = self.client.get(reverse("payment:payment-metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        breaker = response.data["checkout_circuit_breaker"]
+        self.assertEqual(breaker["state"], CircuitBreaker.OPEN)
+        self.assertEqual(breaker["failures"], 3)
+        self.assertEqual(breaker["retries"], 2)
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from payment.fields import CentsField
+from payment.money import format_cents, from_cents, to_cents
+
+
+class MoneyTests(SimpleTestCase):
+
+    def test_to_cents_rounds_half_up(self):
+        self.assertEqual(to_cents(Decimal("10.50")), 1050)
+        self.assertEqual(to_cents(Decimal("0.295")), 30)
+        self.assertEqual(to_cents(Decimal("0.294")), 29)
+        # int(amount * 100) used to truncate this to 1.14.
+        self.assertEqual(to_cents(Decimal("1.145")), 115)
+
+    def test_from_cents(self):
+        self.assertEqual(from_cents(1050), Decimal("10.50"))
+        self.assertEqual(str(from_cents(7)), "0.07")
+
+    def test_format_cents(self):
+        self.assertEqual(format_cents(0), "0.00")
+        self.assertEqual(format_cents(1050), "10.50")
+        self.assertEqual(format_cents(-5), "-0.05")
+
+    def test_cents_field(self):
+        class AmountSerializer(serializers.Serializer):
+            amount = CentsField(source="amount_cents")
+
+        self.assertEqual(
+            AmountSerializer({"amount_cents": 1234}).data["amount"], "12.34"
+        )
+        serializer = AmountSerializer(data={"amount": "12.34"})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data["amount_cents"], 1234)
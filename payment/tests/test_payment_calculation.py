@@ -1,7 +1,11 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from decimal import Decimal
 from borrowing.models import Book, Borrowing
-from payment.payment_calculator import calculate_total_price, calculate_fine
+from payment.payment_calculator import (
+    calculate_total_price,
+    calculate_fine,
+    quote_borrowings,
+)
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
 
@@ -31,7 +35,7 @@ class PaymentCalculatorTests(TestCase):
 
     def test_calculate_total_price(self):
         total_price = calculate_total_price(self.borrowing)
-        expected_price = Decimal("7.00")
+        expected_price = 700
         self.assertEqual(total_price, expected_price)
 
     def test_calculate_fine(self):
@@ -39,5 +43,84 @@ class PaymentCalculatorTests(TestCase):
             self.borrowing.expected_return_date + timedelta(days=3)
         )
         fine = calculate_fine(self.borrowing)
-        expected_fine = Decimal("6.00")
+        expected_fine = 600
         self.assertEqual(fine, expected_fine)
+
+    def test_quote_borrowings(self):
+        returned = Borrowing.objects.create(
+            user=self.user,
+            book=Book.objects.create(
+                title="Other Book",
+                author="Test Author",
+                cover="SOFT",
+                inventory=10,
+                daily_fee=Decimal("0.35"),
+            ),
+            expected_return_date=date.today() + timedelta(days=3),
+        )
+        returned.actual_return_date = date.today() + timedelta(days=5)
+        returned.save()
+        as_of = self.borrowing.expected_return_date + timedelta(days=4)
+
+        with self.assertNumQueries(1):
+            quotes = list(
+                quote_borrowings(
+                    Borrowing.objects.order_by("id"), as_of=as_of
+                )
+            )
+
+        self.assertEqual(
+            [
+                (quote.total_price_cents, quote.overdue_days, quote.fine_cents)
+                for quote in quotes
+            ],
+            [
+                (700, 4, 800),
+                (105, 2, 140),
+            ],
+        )
+
+    def test_quote_matches_single_calculation(self):
+        self.borrowing.actual_return_date = (
+            self.borrowing.expected_return_date + timedelta(days=3)
+        )
+        self.borrowing.save()
+
+        (quote,) = quote_borrowings([self.borrowing])
+
+        self.assertEqual(
+            quote.total_price_cents, calculate_total_price(self.borrowing)
+        )
+        self.assertEqual(quote.fine_cents, calculate_fine(self.borrowing))
+
+    def test_quote_of_borrowing_not_overdue_has_no_fine(self):
+        (quote,) = quote_borrowings([self.borrowing])
+
+        self.assertEqual(quote.overdue_days, 0)
+        self.assertEqual(quote.fine_cents, 0)
+
+    def test_fee_is_kept_from_borrowing_creation(self):
+        self.book.daily_fee = Decimal("5.00")
+        self.book.save()
+        borrowing = Borrowing.objects.get(pk=self.borrowing.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(calculate_total_price(borrowing), 700)
+            borrowing.actual_return_date = (
+                borrowing.expected_return_date + timedelta(days=3)
+            )
+            self.assertEqual(calculate_fine(borrowing), 600)
+
+    @override_settings(BORROWING_FINE_MULTIPLIER=3)
+    def test_fine_multiplier_is_kept_from_borrowing_creation(self):
+        borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=date.today() + timedelta(days=1),
+        )
+        borrowing.actual_return_date = (
+            borrowing.expected_return_date + timedelta(days=2)
+        )
+
+        with self.settings(BORROWING_FINE_MULTIPLIER=2):
+            self.assertEqual(calculate_fine(borrowing), 600)
@@ -0,0 +1,149 @@
+import math
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from borrowing.models import Borrowing
+from library_service.testing import QueryPlanTestMixin
+from payment.expiry import CURSOR_KEY, LOCK_KEY, bucket_key
+from payment.models import Payment
+from payment.services import expire_overdue_payments, expire_payment
+from payment.signals import payment_expired
+from payment.tasks import check_stripe_sessions, expire_due_payments
+from payment.tests.test_base import BasePaymentTest
+
+
+class PaymentExpiryTests(QueryPlanTestMixin, BasePaymentTest):
+
+    def current_minute(self) -> int:
+        return int(time.time() // 60)
+
+    def make_overdue(self, payment: Payment) -> None:
+        Payment.objects.filter(pk=payment.pk).update(
+            session_expiry=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_new_payment_is_put_in_its_expiry_bucket(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = self.create_payment()
+
+        minute = math.ceil(payment.session_expiry.timestamp() / 60)
+        self.assertEqual(
+            self.redis.smembers(bucket_key(minute)),
+            {str(payment.id).encode()},
+        )
+
+    def test_due_bucket_is_expired_with_one_update(self):
+        payments = [self.create_payment() for _ in range(3)]
+        for payment in payments:
+            self.make_overdue(payment)
+        minute = self.current_minute() - 1
+        self.redis.sadd(
+            bucket_key(minute), *[payment.id for payment in payments]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            expire_due_payments()
+
+        updates = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "payment_payment"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            set(Payment.objects.values_list("status", flat=True)),
+            {Payment.PaymentStatus.EXPIRED},
+        )
+        self.assertFalse(self.redis.exists(bucket_key(minute)))
+        self.assertEqual(
+            int(self.redis.get(CURSOR_KEY)), self.current_minute()
+        )
+
+    def test_future_bucket_is_left_alone(self):
+        payment = self.create_payment()
+        minute = self.current_minute() + 5
+        self.redis.sadd(bucket_key(minute), payment.id)
+
+        expire_due_payments()
+
+        self.assertTrue(self.redis.sismember(bucket_key(minute), payment.id))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.PENDING)
+
+    def test_buckets_are_drained_by_one_worker(self):
+        payment = self.create_payment()
+        self.make_overdue(payment)
+        self.redis.sadd(bucket_key(self.current_minute()), payment.id)
+        self.redis.set(LOCK_KEY, 1)
+
+        expire_due_payments()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.PENDING)
+
+    def test_sweep_expires_overdue_payments(self):
+        payment = self.create_payment()
+        self.make_overdue(payment)
+
+        check_stripe_sessions()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.EXPIRED)
+
+    def test_sweep_uses_session_expiry_index(self):
+        self.assertIndexUsed(
+            Payment.objects.filter(
+                status=Payment.PaymentStatus.PENDING,
+                session_expiry__lte=timezone.now(),
+            ),
+            "payment_status_expiry_idx",
+        )
+
+    def test_early_expiry_does_nothing(self):
+        payment = self.create_payment()
+        self.assertFalse(expire_payment(payment.id))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.PENDING)
+
+    def test_expiry_releases_reservation(self):
+        payment = self.create_payment()
+        self.make_overdue(payment)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(expire_payment(payment.id))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.EXPIRED)
+        self.borrowing.refresh_from_db()
+        self.assertEqual(
+            self.borrowing.status, Borrowing.BorrowingStatus.CANCELLED
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 11)
+
+    def test_expiry_event_is_sent_once(self):
+        payment = self.create_payment()
+        self.make_overdue(payment)
+        received = []
+
+        def receiver(sender, payment, **kwargs):
+            received.append(payment.id)
+
+        payment_expired.connect(receiver)
+        self.addCleanup(payment_expired.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_payment(payment.id)
+            expire_overdue_payments()
+
+        self.assertEqual(received, [payment.id])
+
+    def test_paid_payment_is_not_expired(self):
+        payment = self.create_payment(status=Payment.PaymentStatus.PAID)
+        self.make_overdue(payment)
+
+        self.assertEqual(expire_overdue_payments(), 0)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.PAID)
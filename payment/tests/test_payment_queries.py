@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from borrowing.models import Borrowing
+from library_service.testing import QueryCountTestMixin
+from payment.models import Payment
+
+User = get_user_model()
+
+
+class PaymentQueryCountTests(QueryCountTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password"
+        )
+        self.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="password"
+        )
+        book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover=Book.Covers.HARD,
+            inventory=10,
+            daily_fee=Decimal("1.00"),
+        )
+        self.payments = []
+        for _ in range(6):
+            borrowing = Borrowing.objects.create(
+                user=self.user, book=book, expected_return_date="2024-01-10"
+            )
+            self.payments.append(
+                Payment.objects.create(
+                    payment_type=Payment.PaymentType.PAYMENT,
+                    borrowing_id=borrowing,
+                    money_to_pay_cents=1000,
+                )
+            )
+        self.list_url = reverse("payment:payment-list")
+
+    def test_list_as_user(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryCountIndependentOfPageSize(self.list_url)
+
+    def test_list_as_admin(self):
+        self.client.force_authenticate(self.admin_user)
+        self.assertQueryCountIndependentOfPageSize(self.list_url)
+
+    def test_detail_checks_owner_without_extra_queries(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("payment:payment-detail", args=[self.payments[0].id])
+            )
+        self.assertEqual(response.data["id"], self.payments[0].id)
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from borrowing.models import Borrowing
+
+User = get_user_model()
+
+
+class PaymentQuoteViewTests(APITestCase):
+
+    def setUp(self):
+        self.url = reverse("payment:payment-quote")
+        self.user = User.objects.create_user(
+            email="user@example.com", password="password"
+        )
+        staff = User.objects.create_user(
+            email="admin@example.com", password="password", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            cover=Book.Covers.HARD,
+            inventory=10,
+            daily_fee=Decimal("1.50"),
+        )
+        self.due = date.today() + timedelta(days=2)
+        self.borrowings = [
+            Borrowing.objects.create(
+                user=self.user, book=book, expected_return_date=self.due
+            )
+            for _ in range(3)
+        ]
+        self.borrowings[2].actual_return_date = date.today()
+        self.borrowings[2].save()
+        Borrowing.objects.create(
+            user=self.user,
+            book=book,
+            expected_return_date=self.due,
+            status=Borrowing.BorrowingStatus.CANCELLED,
+        )
+
+    def test_quote_active_borrowings(self):
+        as_of = self.due + timedelta(days=1)
+
+        response = self.client.post(
+            self.url,
+            {"active": True, "as_of": as_of, "totals_only": True},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["total_price"], "6.00")
+        self.assertEqual(response.data["total_fine"], "6.00")
+        self.assertNotIn("results", response.data)
+
+    def test_quote_listed_active_borrowings(self):
+        response = self.client.post(
+            self.url,
+            {
+                "borrowing_ids": [b.id for b in self.borrowings],
+                "active": True,
+                "as_of": self.due + timedelta(days=1),
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [quote["borrowing_id"] for quote in response.data["results"]],
+            [borrowing.id for borrowing in self.borrowings[:2]],
+        )
+        self.assertEqual(response.data["results"][0]["fine"], "3.00")
+
+    def test_all_active_borrowings_require_totals_only(self):
+        response = self.client.post(self.url, {"active": True}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("totals_only", response.data)
+
+    def test_quote_listed_borrowings_totals_only(self):
+        response = self.client.post(
+            self.url,
+            {
+                "borrowing_ids": [self.borrowings[2].id],
+                "as_of": self.due + timedelta(days=10),
+                "totals_only": True,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["total_fine"], "0.00")
+        self.assertNotIn("results", response.data)
+
+    def test_query_count_does_not_depend_on_borrowings(self):
+        with self.assertNumQueries(1):
+            self.client.post(
+                self.url, {"active": True, "totals_only": True}, format="json"
+            )
+
+    def test_nothing_to_quote(self):
+        response = self.client.post(self.url, {}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_quote_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(self.url, {"active": True}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
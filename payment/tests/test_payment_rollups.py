@@ -0,0 +1,287 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from django.db import transaction
+from rest_framework.test import APITransactionTestCase
+
+from payment.models import Payment, PaymentDailyRollup
+from payment.rollups import rebuild_rollups
+from payment.services import expire_payment, mark_payment_paid
+from payment.tasks import daily_payment_report, monthly_payment_report
+from payment.tests.test_base import PaymentFixtureMixin
+
+User = get_user_model()
+
+PAYMENT = Payment.PaymentType.PAYMENT
+FINE = Payment.PaymentType.FINE
+PENDING = Payment.PaymentStatus.PENDING
+PAID = Payment.PaymentStatus.PAID
+EXPIRED = Payment.PaymentStatus.EXPIRED
+
+
+class PaymentRollupTestCase(PaymentFixtureMixin, APITransactionTestCase):
+    # Rollup rows are updated once the payment changes commit.
+
+    def create_payment(
+            self, amount_cents=1000, payment_type=PAYMENT, created_at=None
+    ) -> Payment:
+        payment = super().create_payment(amount_cents, payment_type)
+        if created_at:
+            Payment.objects.filter(pk=payment.pk).update(
+                created_at=created_at
+            )
+            payment.refresh_from_db()
+        return payment
+
+    def rollup(self) -> dict:
+        return {
+            (row.day, row.payment_type, row.status): (
+                row.count, row.amount_cents
+            )
+            for row in PaymentDailyRollup.objects.exclude(count=0)
+        }
+
+
+class PaymentRollupTests(PaymentRollupTestCase):
+
+    def test_payment_creation_is_counted(self):
+        self.create_payment(1000)
+        self.create_payment(250, payment_type=FINE)
+
+        today = timezone.localdate()
+        self.assertEqual(
+            self.rollup(),
+            {
+                (today, PAYMENT, PENDING): (1, 1000),
+                (today, FINE, PENDING): (1, 250),
+            },
+        )
+
+    def test_status_changes_move_payments_between_rows(self):
+        paid = self.create_payment(1000)
+        expired = self.create_payment(400)
+        Payment.objects.filter(pk=expired.pk).update(
+            session_expiry=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertTrue(mark_payment_paid(paid.session_id))
+        self.assertFalse(mark_payment_paid(paid.session_id))
+        self.assertTrue(expire_payment(expired.id))
+
+        today = timezone.localdate()
+        self.assertEqual(
+            self.rollup(),
+            {
+                (today, PAYMENT, PAID): (1, 1000),
+                (today, PAYMENT, EXPIRED): (1, 400),
+            },
+        )
+
+    def test_late_payment_of_expired_session_is_moved(self):
+        payment = self.create_payment(1000)
+        Payment.objects.filter(pk=payment.pk).update(
+            session_expiry=timezone.now() - timedelta(minutes=1)
+        )
+        expire_payment(payment.id)
+
+        mark_payment_paid(payment.session_id)
+
+        self.assertEqual(
+            self.rollup(),
+            {(timezone.localdate(), PAYMENT, PAID): (1, 1000)},
+        )
+
+    def test_payment_deletion_is_subtracted(self):
+        self.create_payment(1000)
+        self.create_payment(500).delete()
+
+        self.assertEqual(
+            self.rollup(),
+            {(timezone.localdate(), PAYMENT, PENDING): (1, 1000)},
+        )
+
+    def test_rollup_waits_for_commit(self):
+        with transaction.atomic():
+            self.create_payment(1000)
+            self.assertEqual(self.rollup(), {})
+
+        self.assertEqual(
+            self.rollup(),
+            {(timezone.localdate(), PAYMENT, PENDING): (1, 1000)},
+        )
+
+    def test_rolled_back_payment_is_not_counted(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create_payment(1000)
+            raise RuntimeError
+
+        self.assertEqual(self.rollup(), {})
+
+    def test_saved_changes_move_payment_between_rows(self):
+        payment = Payment.objects.get(pk=self.create_payment(1000).pk)
+        payment.status = PAID
+        payment.money_to_pay_cents = 1200
+        payment.save()
+        payment.payment_type = FINE
+        payment.save()
+
+        self.assertEqual(
+            self.rollup(),
+            {(timezone.localdate(), FINE, PAID): (1, 1200)},
+        )
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.create_payment(1000)
+        mark_payment_paid(self.create_payment(300).session_id)
+        self.create_payment(100, payment_type=FINE)
+        incremental = self.rollup()
+
+        PaymentDailyRollup.objects.all().delete()
+        call_command("rebuild_payment_rollups", stdout=StringIO())
+
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_rebuild_of_period_keeps_other_days(self):
+        self.create_payment(1000)
+        old = self.create_payment(
+            700, created_at=timezone.now() - timedelta(days=40)
+        )
+        # The changed created_at is not followed incrementally.
+        today = timezone.localdate()
+        old_day = timezone.localdate(old.created_at)
+
+        rebuild_rollups(old_day, old_day)
+
+        self.assertEqual(
+            self.rollup(),
+            {
+                (today, PAYMENT, PENDING): (2, 1700),
+                (old_day, PAYMENT, PENDING): (1, 700),
+            },
+        )
+
+
+class PaymentReportTests(PaymentRollupTestCase):
+
+    def test_daily_report_reads_rollup(self):
+        mark_payment_paid(self.create_payment(1000).session_id)
+        mark_payment_paid(self.create_payment(250).session_id)
+        self.create_payment(9900)
+
+        with patch("payment.tasks.notify") as notify:
+            with self.assertNumQueries(1):
+                daily_payment_report()
+
+        notify.assert_called_once_with(
+            "Payments per day: 2\n"
+            "Amount: 12.50 $\n"
+            f"{timezone.localdate()}"
+        )
+
+    def test_monthly_report_covers_previous_month(self):
+        first_of_month = timezone.localdate().replace(day=1)
+        last_month = first_of_month - timedelta(days=1)
+        for day, amount_cents in (
+            (last_month.replace(day=1), 1000),
+            (last_month, 500),
+            (first_of_month, 10000),
+        ):
+            payment = self.create_payment(
+                amount_cents,
+                created_at=timezone.make_aware(
+                    datetime.combine(day, datetime.min.time())
+                ),
+            )
+            Payment.objects.filter(pk=payment.pk).update(status=PAID)
+        rebuild_rollups()
+
+        with patch("payment.tasks.notify") as notify:
+            with self.assertNumQueries(1):
+                monthly_payment_report()
+
+        notify.assert_called_once_with(
+            f"Monthly report for {last_month.strftime('%B %Y')}\n"
+            "Payments per month: 2\n"
+            "Amount: 15.00 $"
+        )
+
+
+class PaymentStatsViewTests(PaymentRollupTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("payment:payment-stats")
+        staff = User.objects.create_user(
+            email="admin@example.com", password="password", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        PaymentDailyRollup.objects.bulk_create(
+            PaymentDailyRollup(
+                day=day,
+                payment_type=PAYMENT,
+                status=PAID,
+                count=count,
+                amount_cents=amount_cents,
+            )
+            for day, count, amount_cents in (
+                (date(2024, 1, 30), 1, 1000),
+                (date(2024, 1, 31), 2, 2000),
+                (date(2024, 2, 1), 3, 3000),
+            )
+        )
+
+    def test_stats_per_day(self):
+        response = self.client.get(
+            self.url, {"from": "2024-01-31", "to": "2024-02-01"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["granularity"], "day")
+        self.assertEqual(
+            [
+                (row["period"], row["count"], row["amount"])
+                for row in response.data["results"]
+            ],
+            [("2024-01-31", 2, "20.00"), ("2024-02-01", 3, "30.00")],
+        )
+
+    def test_stats_per_month(self):
+        response = self.client.get(
+            self.url,
+            {"from": "2024-01-01", "to": "2024-02-29", "granularity": "month"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row["period"], row["count"], row["amount"])
+                for row in response.data["results"]
+            ],
+            [("2024-01-01", 3, "30.00"), ("2024-02-01", 3, "30.00")],
+        )
+
+    def test_stats_query_count_does_not_depend_on_payments(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {"from": "2024-01-01"})
+
+    def test_invalid_period(self):
+        response = self.client.get(
+            self.url, {"from": "2024-02-01", "to": "2024-01-01"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {"granularity": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_are_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,13 +1,20 @@
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
 
-from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIRequestFactory, APITestCase
 
 from book.models import Book
 from borrowing.models import Borrowing
+from payment.circuit_breaker import get_checkout_breaker
+from payment.gateways import (
+    FakeGateway,
+    PaymentGatewayError,
+    StripeGateway,
+    get_payment_gateway,
+)
 from payment.models import Payment
 from payment.services import create_stripe_session_for_borrowing
 
@@ -36,51 +43,97 @@ class CreateStripeSessionForBorrowingTests(APITestCase):
         self.factory = APIRequestFactory()
         self.request = self.factory.get(reverse("borrowing-list-create"))
         self.request.user = self.user
+        self.addCleanup(get_checkout_breaker.cache_clear)
 
-        settings.STRIPE_SECRET_KEY = "sk_test_4eC39HqLyjWDarjtT1zdp7dc"
-
-    @patch("stripe.checkout.Session.create")
-    def test_create_stripe_session_for_borrowing_success(
-        self, mock_stripe_session_create
-    ):
-        mock_stripe_session_create.return_value = MagicMock(
-            id="session_123", url="https://checkout.stripe.com/pay/session_123"
-        )
-
-        total_price = Decimal("10.00")
+    def test_create_stripe_session_for_borrowing_success(self):
+        total_price_cents = 1000
         payment_type = Payment.PaymentType.PAYMENT
         session = create_stripe_session_for_borrowing(
-            self.borrowing, self.request, total_price, payment_type
+            self.borrowing, self.request, total_price_cents, payment_type
         )
 
         self.assertIsNotNone(session)
-        self.assertEqual(session.id, "session_123")
-        self.assertEqual(session.url, "https://checkout.stripe.com/pay/session_123")
+        self.assertTrue(session.id.startswith("cs_fake_"))
+        self.assertEqual(session.url, FakeGateway.url + session.id)
 
         payment = Payment.objects.get(borrowing_id=self.borrowing)
         self.assertEqual(payment.status, Payment.PaymentStatus.PENDING)
         self.assertEqual(payment.payment_type, payment_type)
-        self.assertEqual(payment.session_id, "session_123")
-        self.assertEqual(
-            payment.session_url, "https://checkout.stripe.com/pay/session_123"
-        )
-        self.assertEqual(payment.money_to_pay, total_price)
-
-    @patch("stripe.checkout.Session.create")
-    def test_create_stripe_session_for_borrowing_failure(
-        self, mock_stripe_session_create
-    ):
-        mock_stripe_session_create.side_effect = Exception(
-            "Stripe session creation failed"
-        )
+        self.assertEqual(payment.session_id, session.id)
+        self.assertEqual(payment.session_url, session.url)
+        self.assertEqual(payment.money_to_pay_cents, total_price_cents)
 
-        total_price = Decimal("10.00")
+    @override_settings(FAKE_PAYMENT_GATEWAY_FAILURE_RATE=1)
+    def test_create_stripe_session_for_borrowing_failure(self):
+        total_price_cents = 1000
         payment_type = Payment.PaymentType.PAYMENT
         session = create_stripe_session_for_borrowing(
-            self.borrowing, self.request, total_price, payment_type
+            self.borrowing, self.request, total_price_cents, payment_type
         )
 
         self.assertIsNone(session)
 
         payments = Payment.objects.filter(borrowing_id=self.borrowing)
         self.assertEqual(payments.count(), 0)
+
+
+class PaymentGatewayTests(SimpleTestCase):
+
+    @override_settings(
+        PAYMENT_GATEWAY="payment.gateways.StripeGateway",
+        STRIPE_SECRET_KEY="sk_test_123",
+    )
+    def test_gateway_is_configurable_and_shared(self):
+        gateway = get_payment_gateway()
+        self.assertIsInstance(gateway, StripeGateway)
+        self.assertIs(get_payment_gateway(), gateway)
+
+    @override_settings(STRIPE_SECRET_KEY="sk_test_123")
+    def test_stripe_gateway_creates_session(self):
+        gateway = StripeGateway()
+        with patch.object(
+            gateway.client.checkout.sessions,
+            "create",
+            return_value=MagicMock(
+                id="session_123",
+                url="https://checkout.stripe.com/pay/session_123",
+            ),
+        ) as create:
+            session = gateway.create_checkout_session(
+                name="Test Book",
+                amount_cents=1050,
+                success_url="https://example.com/success",
+                cancel_url="https://example.com/cancel",
+            )
+
+        self.assertEqual(session.id, "session_123")
+        params = create.call_args.kwargs["params"]
+        self.assertEqual(
+            params["line_items"][0]["price_data"]["unit_amount"], 1050
+        )
+
+    @override_settings(STRIPE_SECRET_KEY="sk_test_123")
+    def test_stripe_gateway_uses_pooled_client_with_timeouts(self):
+        with patch("payment.gateways.stripe.RequestsClient") as client:
+            StripeGateway()
+        self.assertEqual(client.call_args.kwargs["timeout"], (3, 10))
+        self.assertIsNotNone(client.call_args.kwargs["session"])
+
+    def test_fake_gateway_simulates_latency(self):
+        with patch("payment.gateways.time.sleep") as sleep:
+            FakeGateway(latency=0.5).create_checkout_session(
+                name="Test Book",
+                amount_cents=100,
+                success_url="https://example.com/success",
+                cancel_url="https://example.com/cancel",
+            )
+        self.assertLessEqual(sleep.call_args.args[0], 0.5)
+
+    def test_fake_gateway_simulates_failures(self):
+        with self.assertRaises(PaymentGatewayError):
+            FakeGateway(failure_rate=1).create_checkout_session(
+                name="Test Book",
+                amount_cents=100,
+                success_url="https://example.com/success",
+                cancel_url="https://example.com/cancel",
+            )
@@ -1,8 +1,8 @@
+import json
 from decimal import Decimal
-from types import SimpleNamespace
-from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
@@ -10,6 +10,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from book.models import Book
 from borrowing.models import Borrowing
+from library_service.testing import stripe_signature
 from payment.models import Payment
 
 User = get_user_model()
@@ -44,7 +45,7 @@ class PaymentViewsTests(APITestCase):
             borrowing_id=self.borrowing,
             session_url="https://example.com/session",
             session_id="session123",
-            money_to_pay=Decimal("10.00"),
+            money_to_pay_cents=1000,
         )
 
         self.user_token = RefreshToken.for_user(self.user).access_token
@@ -68,25 +69,35 @@ class PaymentViewsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], self.payment.id)
 
-    @patch("stripe.checkout.Session.retrieve")
-    @patch("stripe.PaymentIntent.retrieve")
-    def test_payment_success_view(
-        self, mock_retrieve_payment_intent, mock_retrieve_session
-    ):
-        mock_retrieve_session.return_value = SimpleNamespace(payment_intent="pi_12345")
-        mock_retrieve_payment_intent.return_value = SimpleNamespace(status="succeeded")
+    @override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+    def test_payment_success_view(self):
+        payload = json.dumps(
+            {
+                "id": "evt_123",
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {
+                    "object": {
+                        "id": self.payment.session_id,
+                        "object": "checkout.session",
+                        "payment_status": "paid",
+                    }
+                },
+            }
+        )
+        response = self.client.post(
+            reverse("payment:payment-webhook"),
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=stripe_signature(payload, "whsec_test"),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.user_token}")
 
         url = reverse("payment:payment-success")
-        print(f"URL: {url}")
-        print(f"Session ID: {self.payment.session_id}")
-
         response = self.client.get(url, {"session_id": self.payment.session_id})
 
-        print(f"Response status code: {response.status_code}")
-        print(f"Response data: {response.data}")
-
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["status"], "Payment was successful")
 
@@ -0,0 +1,161 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework.views import APIView
+
+from book.models import Book
+from borrowing.models import Borrowing
+from borrowing.services import release_reservation
+from library_service.testing import stripe_signature
+from payment.models import Payment
+from payment.tests.test_base import BasePaymentTest
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(BasePaymentTest):
+
+    def setUp(self):
+        super().setUp()
+        self.payment = self.create_payment()
+        self.url = reverse("payment:payment-webhook")
+
+    def send_event(self, event_type, secret=WEBHOOK_SECRET, **session):
+        payload = json.dumps(
+            {
+                "id": "evt_1",
+                "object": "event",
+                "type": event_type,
+                "data": {
+                    "object": {
+                        "id": self.payment.session_id,
+                        "object": "checkout.session",
+                        **session,
+                    }
+                },
+            }
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                self.url,
+                payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE=stripe_signature(payload, secret),
+            )
+
+    def test_completed_session_marks_payment_paid(self):
+        response = self.send_event(
+            "checkout.session.completed", payment_status="paid"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PAID)
+        self.borrowing.refresh_from_db()
+        self.assertEqual(
+            self.borrowing.status, Borrowing.BorrowingStatus.ACTIVE
+        )
+        self.notify.assert_called_once()
+
+    def test_replayed_event_is_applied_once(self):
+        self.send_event("checkout.session.completed", payment_status="paid")
+        response = self.send_event(
+            "checkout.session.completed", payment_status="paid"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.notify.assert_called_once()
+
+    def test_unpaid_completed_session_stays_pending(self):
+        self.send_event("checkout.session.completed", payment_status="unpaid")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PENDING)
+
+        self.send_event("checkout.session.async_payment_succeeded")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PAID)
+
+    def test_expired_session_marks_payment_expired(self):
+        self.send_event("checkout.session.expired")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.EXPIRED)
+
+    def test_expired_event_does_not_undo_payment(self):
+        self.send_event("checkout.session.completed", payment_status="paid")
+        self.send_event("checkout.session.expired")
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PAID)
+
+    def test_late_payment_reinstates_cancelled_borrowing(self):
+        release_reservation(self.borrowing)
+        self.send_event("checkout.session.expired")
+
+        self.send_event("checkout.session.completed", payment_status="paid")
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PAID)
+        self.assertFalse(self.payment.refund_due)
+        self.borrowing.refresh_from_db()
+        self.assertEqual(
+            self.borrowing.status, Borrowing.BorrowingStatus.ACTIVE
+        )
+        self.assertIsNone(self.borrowing.actual_return_date)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 10)
+
+    def test_late_payment_without_copy_is_flagged_for_refund(self):
+        release_reservation(self.borrowing)
+        self.send_event("checkout.session.expired")
+        Book.objects.filter(pk=self.book.pk).update(inventory=0)
+
+        self.send_event("checkout.session.completed", payment_status="paid")
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PAID)
+        self.assertTrue(self.payment.refund_due)
+        self.borrowing.refresh_from_db()
+        self.assertEqual(
+            self.borrowing.status, Borrowing.BorrowingStatus.CANCELLED
+        )
+        self.assertIn("refund", self.notify.call_args.args[0])
+
+    def test_webhook_is_not_throttled(self):
+        # Throttling as configured outside of tests, at a lower rate.
+        self.addCleanup(cache.clear)
+        with patch.object(
+            APIView, "throttle_classes", [AnonRateThrottle]
+        ), patch.object(
+            AnonRateThrottle, "THROTTLE_RATES", {"anon": "1/minute"}
+        ):
+            for _ in range(3):
+                response = self.send_event("checkout.session.expired")
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.send_event(
+            "checkout.session.completed", secret="whsec_other"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PENDING)
+
+    @override_settings(STRIPE_WEBHOOK_SECRET="")
+    def test_unconfigured_webhook_is_rejected(self):
+        response = self.send_event("checkout.session.completed")
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_success_view_reads_local_state(self):
+        success_url = reverse("payment:payment-success")
+        with patch("stripe.checkout.Session.retrieve") as retrieve:
+            response = self.client.get(
+                success_url, {"session_id": self.payment.session_id}
+            )
+        retrieve.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
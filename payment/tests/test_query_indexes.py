@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from library_service.testing import QueryPlanTestMixin
+from payment.models import Payment
+
+
+class PaymentQueryIndexTests(QueryPlanTestMixin, TestCase):
+    def test_expired_sessions(self):
+        self.assertIndexUsed(
+            Payment.objects.filter(
+                status=Payment.PaymentStatus.PENDING,
+                session_expiry__lt=timezone.now(),
+            ),
+            "payment_status_expiry_idx",
+        )
+
+    def test_payment_by_session_id(self):
+        self.assertIndexUsed(
+            Payment.objects.filter(session_id="cs_test_123"),
+            "payment_session_id_unique",
+            # SQLite names the index of a unique table constraint itself.
+            "sqlite_autoindex_payment_payment",
+        )
+
+    def test_paid_payments_of_period(self):
+        now = timezone.now()
+        self.assertIndexUsed(
+            Payment.objects.filter(
+                status=Payment.PaymentStatus.PAID,
+                created_at__gte=now - timedelta(days=1),
+                created_at__lt=now,
+            ),
+            "payment_status_created_idx",
+        )
+
+    def test_payments_of_user(self):
+        self.assertIndexUsed(
+            Payment.objects.filter(user_id=1).order_by("-id")[:20],
+            "payment_user_id_idx",
+        )
@@ -4,14 +4,28 @@ from payment.views import (
     PaymentDetailView,
     PaymentSuccessView,
     PaymentCancelView,
+    StripeWebhookView,
+    PaymentMetricsView,
+    PaymentStatsView,
+    PaymentQuoteView,
+    PaymentSessionView,
 )
 
 
 urlpatterns = [
     path("", PaymentListView.as_view(), name="payment-list"),
     path("<int:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
+    path(
+        "<int:pk>/session/",
+        PaymentSessionView.as_view(),
+        name="payment-session",
+    ),
     path("success/", PaymentSuccessView.as_view(), name="payment-success"),
     path("cancel/", PaymentCancelView.as_view(), name="payment-cancel"),
+    path("webhook/", StripeWebhookView.as_view(), name="payment-webhook"),
+    path("metrics/", PaymentMetricsView.as_view(), name="payment-metrics"),
+    path("stats/", PaymentStatsView.as_view(), name="payment-stats"),
+    path("quote/", PaymentQuoteView.as_view(), name="payment-quote"),
 ]
 
 app_name = "payment"
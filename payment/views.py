@@ -1,21 +1,47 @@
-import stripe
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.shortcuts import get_object_or_404, redirect
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from botSend import send_message
+from borrowing.models import Borrowing
+from payment.circuit_breaker import get_checkout_breaker
+from payment.gateways import InvalidWebhookEvent, get_payment_gateway
+from payment.fields import CentsField
 from payment.models import Payment
+from payment.payment_calculator import quote_borrowings
 from payment.permissions import IsAdminOrOwner
-from payment.serializers import PaymentSerializer, PaymentListSerializer
+from payment.rollups import payment_stats
+from payment.serializers import (
+    BorrowingQuoteSerializer,
+    PaymentQuoteRequestSerializer,
+    PaymentSerializer,
+    PaymentListSerializer,
+    PaymentStatsQuerySerializer,
+    PaymentStatsSerializer,
+)
+from payment.services import (
+    can_start_session,
+    handle_stripe_event,
+    start_payment_session,
+)
 
 from payment.schemas import (
     payment_list_create_view_schema,
     payment_detail_view_schema,
     payment_success_view_schema,
     payment_cancel_view_schema,
+    payment_webhook_view_schema,
+    payment_metrics_view_schema,
+    payment_stats_view_schema,
+    payment_quote_view_schema,
+    payment_session_view_schema,
 )
 
 
@@ -26,9 +52,10 @@ class PaymentListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Payment.objects.all()
         if user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(borrowing_id__user=user)
+            return queryset
+        return queryset.filter(user=user)
 
 
 @payment_detail_view_schema
@@ -38,9 +65,39 @@ class PaymentDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Payment.objects.all()
         if user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(borrowing_id__user=user)
+            return queryset
+        return queryset.filter(user=user)
+
+
+@payment_session_view_schema
+class PaymentSessionView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request, pk: int, *args, **kwargs) -> Response:
+        """
+        Create a new checkout session for an unpaid fine of the user,
+        e.g. when none could be created on return, and redirect to it.
+        """
+        payment = get_object_or_404(
+            Payment.objects.select_related("borrowing_id__book"),
+            pk=pk,
+            user=request.user,
+        )
+        if not can_start_session(payment):
+            return Response(
+                {"error": "Payment already has a checkout session"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        session = start_payment_session(payment, request)
+        if session is None:
+            return Response(
+                {"error": "Error creating payment session"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return redirect(session.url, code=303)
 
 
 @payment_success_view_schema
@@ -49,7 +106,10 @@ class PaymentSuccessView(APIView):
 
     def get(self, request: Request, *args, **kwargs) -> Response:
         """
-        Verify payment status and update the payment record.
+        Report the state of the payment of a checkout session.
+
+        The payment is marked as paid by the Stripe webhook, this view
+        only reads the local payment record.
         """
 
         session_id = request.query_params.get("session_id")
@@ -59,37 +119,64 @@ class PaymentSuccessView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            session = stripe.checkout.Session.retrieve(session_id)
-            payment_intent = stripe.PaymentIntent.retrieve(
-                session.payment_intent
-            )
-        except Exception as e:
+        payment = get_object_or_404(Payment, session_id=session_id)
+        if payment.status == Payment.PaymentStatus.PAID:
             return Response(
-                {"error": str(e)},
-                status=status.HTTP_400_BAD_REQUEST
+                {
+                    "status": "Payment was successful",
+                    "payment": PaymentSerializer(payment).data,
+                },
+                status=status.HTTP_200_OK,
             )
-
-        payment = get_object_or_404(Payment, session_id=session_id)
-        if payment_intent.status == "succeeded":
-            payment.status = Payment.PaymentStatus.PAID
-            send_message(
-                f"💸 Payment (ID: {payment.id}) was successful\n"
-                f"Borrowing ID: {payment.borrowing_id_id}\n"
-                f"User: {self.request.user}\n"
-                f"Money: {payment.money_to_pay}$"
+        if payment.status == Payment.PaymentStatus.PENDING:
+            return Response(
+                {
+                    "status": "Payment is being processed",
+                    "payment": PaymentSerializer(payment).data,
+                },
+                status=status.HTTP_202_ACCEPTED,
             )
-            payment.save()
-
         return Response(
             {
-                "status": "Payment was successful",
+                "error": "Payment session has expired",
                 "payment": PaymentSerializer(payment).data,
             },
-            status=status.HTTP_200_OK,
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
 
+@payment_webhook_view_schema
+class StripeWebhookView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    # Stripe retries throttled deliveries with backoff, which would
+    # mark payments late, often after their session expired.
+    throttle_classes = ()
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Apply a signed Stripe event to the payment of its checkout session.
+        """
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            return Response(
+                {"error": "Stripe webhook is not configured"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            event = get_payment_gateway().construct_event(
+                request.body, request.headers.get("Stripe-Signature", "")
+            )
+        except InvalidWebhookEvent:
+            return Response(
+                {"error": "Invalid Stripe event"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        handle_stripe_event(event)
+        return Response({"received": True}, status=status.HTTP_200_OK)
+
+
 @payment_cancel_view_schema
 class PaymentCancelView(APIView):
     permission_classes = (AllowAny,)
@@ -106,3 +193,90 @@ class PaymentCancelView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+@payment_metrics_view_schema
+class PaymentMetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Report the state of the checkout circuit breaker of this process.
+        """
+        return Response(
+            {"checkout_circuit_breaker": get_checkout_breaker().snapshot()},
+            status=status.HTTP_200_OK,
+        )
+
+
+@payment_stats_view_schema
+class PaymentStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Report the number and amount of payments per day or month,
+        payment type and status, read from the daily payment rollup.
+        """
+        query = PaymentStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        period = query.validated_data
+        stats = payment_stats(
+            period["from"], period["to"], period["granularity"]
+        )
+        return Response(
+            {
+                "from": period["from"],
+                "to": period["to"],
+                "granularity": period["granularity"],
+                "results": PaymentStatsSerializer(stats, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+@payment_quote_view_schema
+class PaymentQuoteView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Quote the price and fine of many borrowings at once. Borrowings
+        not returned yet are quoted with the fine they would owe
+        if returned on ``as_of``.
+        """
+        query = PaymentQuoteRequestSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        borrowings = Borrowing.objects.order_by("id")
+        if params["active"]:
+            borrowings = borrowings.filter(
+                status=Borrowing.BorrowingStatus.ACTIVE,
+                actual_return_date__isnull=True,
+            )
+        if params.get("borrowing_ids"):
+            borrowings = borrowings.filter(id__in=params["borrowing_ids"])
+
+        quotes = []
+        count = total_price_cents = total_fine_cents = 0
+        for quote in quote_borrowings(borrowings, params["as_of"]):
+            count += 1
+            total_price_cents += quote.total_price_cents
+            total_fine_cents += quote.fine_cents
+            if not params["totals_only"]:
+                quotes.append(quote)
+
+        data = {
+            "as_of": params["as_of"],
+            "count": count,
+            "total_price": CentsField().to_representation(
+                total_price_cents
+            ),
+            "total_fine": CentsField().to_representation(total_fine_cents),
+        }
+        if not params["totals_only"]:
+            data["results"] = BorrowingQuoteSerializer(
+                quotes, many=True
+            ).data
+        return Response(data, status=status.HTTP_200_OK)